@@ -0,0 +1,182 @@
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from api_integration.data_models import PersistedAsset
+import threading
+import random
+import time
+
+
+@dataclass
+class PendingAsset:
+    """Handle for an uploaded asset that Contentful is still processing."""
+
+    id: str
+    future: "Future[PersistedAsset]" = field(default_factory=Future)
+
+    def result(self, timeout: Optional[float] = None) -> PersistedAsset:
+        """
+        Waits for the asset to be processed and published.
+
+        Args:
+            timeout (float, optional): Max seconds to wait.
+
+        Returns:
+            PersistedAsset: The published asset.
+        """
+        return self.future.result(timeout=timeout)
+
+
+@dataclass
+class _Watch:
+    pending: PendingAsset
+    started_at: float
+    next_poll_at: float
+    attempt: int = 0
+
+
+class AssetProcessingPoller:
+    """
+    Waits for submitted assets to finish processing, then publishes them.
+
+    A single background thread polls every due asset with one batched status
+    query. Each asset is re-polled with exponential backoff and jitter, and
+    fails with a TimeoutError once `timeout_seconds` have passed.
+    """
+
+    MAX_IDS_PER_QUERY = 100
+
+    def __init__(
+        self,
+        find_assets: Callable[[List[str]], List[Any]],
+        initial_delay_seconds: float = 0.5,
+        max_delay_seconds: float = 10,
+        timeout_seconds: float = 300,
+    ) -> None:
+        """
+        Initializes the poller.
+
+        Args:
+            find_assets (Callable[[List[str]], List[Any]]): Fetches contentful_management assets by ID.
+            initial_delay_seconds (float, optional): Delay before the first poll.
+            max_delay_seconds (float, optional): Upper bound of the backoff delay.
+            timeout_seconds (float, optional): Give up on an asset after this long.
+        """
+        self._find_assets = find_assets
+        self._initial_delay_seconds = initial_delay_seconds
+        self._max_delay_seconds = max_delay_seconds
+        self._timeout_seconds = timeout_seconds
+        self._watches: Dict[str, _Watch] = {}
+        self._changed = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def watch(self, asset_id: str) -> PendingAsset:
+        """
+        Starts watching an asset whose processing has been requested.
+
+        Args:
+            asset_id (str): ID of the asset.
+
+        Returns:
+            PendingAsset: Handle resolved once the asset is published (the existing
+                one if the asset is already watched).
+        """
+        now = time.monotonic()
+        with self._changed:
+            assert not self._closed, "Poller is closed."
+            if asset_id in self._watches:
+                return self._watches[asset_id].pending
+            pending = PendingAsset(id=asset_id)
+            self._watches[asset_id] = _Watch(
+                pending=pending,
+                started_at=now,
+                next_poll_at=now + self._jitter(self._initial_delay_seconds),
+            )
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._changed.notify()
+        return pending
+
+    def close(self) -> None:
+        """Stops polling; assets still pending fail with a RuntimeError."""
+        with self._changed:
+            self._closed = True
+            for watch in self._watches.values():
+                watch.pending.future.set_exception(RuntimeError("Poller closed."))
+            self._watches.clear()
+            self._changed.notify()
+
+    def _run(self) -> None:
+        """Polls due assets until closed."""
+        while True:
+            with self._changed:
+                while not self._closed and not self._due():
+                    next_poll_at = min(
+                        (x.next_poll_at for x in self._watches.values()), default=None
+                    )
+                    self._changed.wait(
+                        None if next_poll_at is None else next_poll_at - time.monotonic()
+                    )
+                if self._closed:
+                    return
+                # Also take assets due shortly, so nearby polls share one query
+                due = self._due(slack_seconds=self._initial_delay_seconds)
+            for i in range(0, len(due), self.MAX_IDS_PER_QUERY):
+                self._poll(due[i : i + self.MAX_IDS_PER_QUERY])
+
+    def _due(self, slack_seconds: float = 0.0) -> List[str]:
+        """IDs of the assets whose next poll is due (within `slack_seconds`)."""
+        now = time.monotonic()
+        return [
+            x for x, y in self._watches.items() if y.next_poll_at <= now + slack_seconds
+        ]
+
+    def _poll(self, asset_ids: List[str]) -> None:
+        """Checks a batch of assets and publishes the processed ones."""
+        try:
+            processed = {
+                x.id: x
+                for x in self._find_assets(asset_ids)
+                if x.fields().get("file", {}).get("url")
+            }
+        except Exception as e:
+            print(f"Error polling asset processing: {e}")
+            processed = {}
+        now = time.monotonic()
+        for asset_id in asset_ids:
+            with self._changed:
+                watch = self._watches.get(asset_id)
+                if watch is None:
+                    continue
+                if asset_id not in processed:
+                    if now - watch.started_at > self._timeout_seconds:
+                        del self._watches[asset_id]
+                        watch.pending.future.set_exception(
+                            TimeoutError(f"Asset {asset_id} was not processed in time.")
+                        )
+                    else:
+                        watch.attempt += 1
+                        watch.next_poll_at = now + self._jitter(
+                            min(
+                                self._initial_delay_seconds * 2**watch.attempt,
+                                self._max_delay_seconds,
+                            )
+                        )
+                    continue
+                del self._watches[asset_id]
+            asset = processed[asset_id]
+            try:
+                asset.publish()
+            except Exception as e:
+                watch.pending.future.set_exception(e)
+            else:
+                watch.pending.future.set_result(
+                    PersistedAsset(id=asset.id, url=f"https:{asset.fields()['file']['url']}")
+                )
+
+    @staticmethod
+    def _jitter(delay: float) -> float:
+        """Spreads polls out so assets submitted together are not polled in lockstep."""
+        return delay * random.uniform(0.5, 1.5)
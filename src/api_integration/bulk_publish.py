@@ -0,0 +1,282 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+from api_integration.data_models import (
+    PersistedAsset,
+    PersistedCategory,
+    PersistedNewsArticle,
+)
+from api_integration.asset_processing import PendingAsset
+from api_integration.image_encoding import EncodedImage
+from api_integration.rate_limit import AdaptiveRateLimiter
+from api_integration.upload import UploadAPI
+import functools
+import threading
+import hashlib
+import time
+import re
+
+
+@dataclass
+class BulkArticle:
+    """News article to publish in a batch, with its header image and categories."""
+
+    key: str  # caller's ID of the article, used in the report and for the entity IDs
+    title: str
+    content: str
+    published_date: datetime
+    image: Union[EncodedImage, PersistedAsset]  # a PersistedAsset is linked as is
+    category_titles: List[str]
+
+
+@dataclass
+class BulkPublishReport:
+    """Outcome of a batch: what was published, what failed and how fast."""
+
+    published: Dict[str, PersistedNewsArticle] = field(default_factory=dict)
+    failed: Dict[str, Exception] = field(default_factory=dict)
+    categories: Dict[str, PersistedCategory] = field(default_factory=dict)  # created, by title
+    categories_created: int = 0
+    assets_uploaded: int = 0
+    elapsed_seconds: float = 0.0
+    rate_limit: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def entities_published(self) -> int:
+        return self.categories_created + self.assets_uploaded + len(self.published)
+
+    @property
+    def entities_per_second(self) -> float:
+        return self.entities_published / max(self.elapsed_seconds, 1e-9)
+
+    def __str__(self) -> str:
+        lines = [
+            f"Published {len(self.published)} articles, {self.assets_uploaded} assets"
+            f" and {self.categories_created} categories in {self.elapsed_seconds:.1f}s"
+            f" ({self.entities_per_second:.2f} entities/s), {len(self.failed)} failed."
+        ]
+        if self.rate_limit:
+            lines.append(
+                f"Rate limit: {self.rate_limit['requests']} requests,"
+                f" {self.rate_limit['throttled']} throttled (429),"
+                f" {self.rate_limit['waited_seconds']:.1f}s waited (all workers),"
+                f" {self.rate_limit['rate_per_second']:g} requests/s allowed."
+            )
+        return "\n".join(lines)
+
+
+class BulkPublisher:
+    """
+    Publishes a batch of news articles, their header images and any missing
+    categories concurrently.
+
+    Every entity is a task on a thread pool that starts once the entities it
+    links are published: a category and an asset are submitted right away,
+    an article is created and published only after its asset has been
+    processed and published and its categories exist. No worker blocks on a
+    dependency, so the pool stays busy up to the connection's rate limit.
+
+    The asset and entry IDs are derived from the article's key, so
+    publishing a batch again resumes what was uploaded before instead of
+    creating duplicates.
+    """
+
+    def __init__(
+        self,
+        upload_api: UploadAPI,
+        workers: int = 8,
+        rate_limiter: Optional[AdaptiveRateLimiter] = None,
+    ) -> None:
+        """
+        Initializes the publisher.
+
+        Args:
+            upload_api (UploadAPI): API the entities are uploaded with.
+            workers (int, optional): Requests in flight at once.
+            rate_limiter (AdaptiveRateLimiter, optional): Limiter of the upload API's connection, reported on.
+        """
+        self._upload_api = upload_api
+        self._workers = workers
+        self._rate_limiter = rate_limiter
+
+    def publish(
+        self,
+        articles: List[BulkArticle],
+        categories: Dict[str, PersistedCategory],
+        on_published: Optional[Callable[[str, PersistedNewsArticle], None]] = None,
+    ) -> BulkPublishReport:
+        """
+        Publishes the articles, uploading their images and creating missing categories.
+
+        Args:
+            articles (List[BulkArticle]): Articles to publish.
+            categories (Dict[str, PersistedCategory]): Existing categories by title.
+            on_published (Callable[[str, PersistedNewsArticle], None], optional): Called with the key
+                and the published article as soon as each article is published.
+
+        Returns:
+            BulkPublishReport: Published and failed articles by key, counts and throughput.
+        """
+        report = BulkPublishReport()
+        limiter_before = self._rate_limiter.stats() if self._rate_limiter else None
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            category_futures: Dict[str, "Future[PersistedCategory]"] = {}
+            for title in dict.fromkeys(x for y in articles for x in y.category_titles):
+                if title in categories:
+                    category_futures[title] = _completed(categories[title])
+                else:
+                    category_futures[title] = executor.submit(
+                        self._upload_api.upload_category, title
+                    )
+            asset_futures = {
+                x.key: _completed(x.image)
+                if isinstance(x.image, PersistedAsset)
+                else _published_asset(
+                    executor.submit(
+                        self._upload_api.submit_asset, x.image, asset_id=_entity_id(x.key)
+                    )
+                )
+                for x in articles
+            }
+            article_futures = {
+                x.key: _after(
+                    executor,
+                    [asset_futures[x.key]] + [category_futures[y] for y in x.category_titles],
+                    self._publish_article_task(x),
+                )
+                for x in articles
+            }
+            if on_published:
+                for key, future in article_futures.items():
+                    future.add_done_callback(functools.partial(_notify, on_published, key))
+            for future in article_futures.values():
+                future.exception()  # waits without raising
+        report.elapsed_seconds = time.monotonic() - started_at
+        for key, future in article_futures.items():
+            if future.exception() is not None:
+                report.failed[key] = future.exception()
+                print(f"Error publishing '{key}': {future.exception()}")
+            else:
+                report.published[key] = future.result()
+        report.categories = {
+            title: future.result()
+            for title, future in category_futures.items()
+            if title not in categories and future.exception() is None
+        }
+        report.categories_created = len(report.categories)
+        report.assets_uploaded = sum(
+            1
+            for x in articles
+            if not isinstance(x.image, PersistedAsset)
+            and asset_futures[x.key].exception() is None
+        )
+        if self._rate_limiter is not None:
+            limiter_after = self._rate_limiter.stats()
+            report.rate_limit = {
+                x: limiter_after[x] - limiter_before[x]
+                for x in ("requests", "throttled", "waited_seconds")
+            }
+            report.rate_limit["rate_per_second"] = limiter_after["rate_per_second"]
+        return report
+
+    def _publish_article_task(
+        self, article: BulkArticle
+    ) -> Callable[..., PersistedNewsArticle]:
+        def task(asset: PersistedAsset, *categories: PersistedCategory) -> PersistedNewsArticle:
+            return self._upload_api.upload_news_article(
+                title=article.title,
+                content=article.content,
+                publishedDate=article.published_date,
+                featuredImage=asset,
+                categories=list(categories),
+                entry_id=_entity_id(article.key),
+            )
+
+        return task
+
+
+def _entity_id(key: str) -> str:
+    """Contentful ID of an article's entities (the key itself if it is a valid ID)."""
+    if re.fullmatch(r"[A-Za-z0-9._-]{1,64}", key):
+        return key
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def _notify(
+    on_published: Callable[[str, PersistedNewsArticle], None],
+    key: str,
+    future: "Future[PersistedNewsArticle]",
+) -> None:
+    if future.exception() is None:
+        on_published(key, future.result())
+
+
+def _completed(value: Any) -> Future:
+    future: Future = Future()
+    future.set_result(value)
+    return future
+
+
+def _published_asset(submitted: "Future[PendingAsset]") -> "Future[PersistedAsset]":
+    """Future of the published asset, given the future of its submission."""
+    published: Future = Future()
+
+    def on_submitted(f: "Future[PendingAsset]") -> None:
+        if f.exception() is not None:
+            published.set_exception(f.exception())
+        else:
+            _copy_when_done(f.result().future, published)
+
+    submitted.add_done_callback(on_submitted)
+    return published
+
+
+def _after(
+    executor: ThreadPoolExecutor, dependencies: List[Future], fn: Callable[..., Any]
+) -> Future:
+    """
+    Runs `fn(*results)` on the executor once every dependency has succeeded.
+
+    Args:
+        executor (ThreadPoolExecutor): Executor the function runs on.
+        dependencies (List[Future]): Futures whose results are passed to the function.
+        fn (Callable[..., Any]): The function.
+
+    Returns:
+        Future: Result of the function, or the first failed dependency's exception.
+    """
+    result: Future = Future()
+    remaining = [len(dependencies)]
+    lock = threading.Lock()
+
+    def on_dependency_done(_: Future) -> None:
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] > 0:
+                return
+        failed = next((x for x in dependencies if x.exception() is not None), None)
+        if failed is not None:
+            result.set_exception(failed.exception())
+            return
+        try:
+            submitted = executor.submit(fn, *[x.result() for x in dependencies])
+        except RuntimeError as e:  # executor shut down
+            result.set_exception(e)
+            return
+        _copy_when_done(submitted, result)
+
+    for dependency in dependencies:
+        dependency.add_done_callback(on_dependency_done)
+    return result
+
+
+def _copy_when_done(source: Future, target: Future) -> None:
+    def copy(f: Future) -> None:
+        if f.exception() is not None:
+            target.set_exception(f.exception())
+        else:
+            target.set_result(f.result())
+
+    source.add_done_callback(copy)
@@ -0,0 +1,152 @@
+from collections import Counter
+from typing import Any, Dict, Optional
+from requests.adapters import HTTPAdapter
+from contentful_management.errors import RateLimitExceededError
+from api_integration.rate_limit import AdaptiveRateLimiter
+import contentful_management
+import threading
+import requests
+
+
+class _PooledClient(contentful_management.Client):
+    """
+    Contentful management client that sends every request through a shared
+    session, paced by a shared rate limiter.
+    """
+
+    def __init__(
+        self,
+        access_token: Optional[str],
+        session: requests.Session,
+        on_request: Any,
+        rate_limiter: AdaptiveRateLimiter,
+        **client_kwargs: Any,
+    ) -> None:
+        super().__init__(access_token, **client_kwargs)
+        self._session = session
+        self._on_request = on_request
+        self._rate_limiter = rate_limiter
+
+    def _http_request(self, method: str, url: str, request_kwargs: Any = None) -> Any:
+        # Mirrors contentful_management.Client._http_request, but keeps connections
+        # alive and waits for the rate limiter (429s are retried by the client)
+        kwargs = request_kwargs if request_kwargs is not None else {}
+        headers = self._request_headers()
+        headers.update(self.additional_headers)
+        headers.update(kwargs.get("headers", {}))
+        kwargs["headers"] = headers
+        if self._has_proxy():
+            kwargs["proxies"] = self._proxy_parameters()
+        request_url = self._url(url, file_upload=kwargs.pop("file_upload", False))
+        self._rate_limiter.acquire()
+        self._on_request(method)
+        response = self._session.request(method, request_url, **kwargs)
+        response.encoding = "utf-8"
+        self._rate_limiter.observe(response.status_code, response.headers)
+        if response.status_code == 429:
+            raise RateLimitExceededError(response)
+        return response
+
+
+class ContentfulConnection:
+    """
+    Contentful client shared between the fetch and upload APIs.
+
+    Requests go through one keep-alive `requests.Session`, the space /
+    environment handle is resolved once and cached until `invalidate()` is
+    called, and every HTTP request is counted. All requests share one
+    `AdaptiveRateLimiter`, so concurrent uploads stay under Contentful's
+    rate limit instead of running into 429s.
+    """
+
+    def __init__(
+        self,
+        management_api_token: Optional[str],
+        space_id: Optional[str] = None,
+        environment_id: Optional[str] = None,
+        pool_maxsize: int = 10,
+        rate_limit_per_second: float = 7,
+        max_rate_limit_retries: int = 5,
+        api_url: str = "api.contentful.com",
+        uploads_api_url: str = "upload.contentful.com",
+        https: bool = True,
+    ) -> None:
+        """
+        Initializes the pooled Contentful client.
+
+        Args:
+            management_api_token (str): The Contentful management API token.
+            space_id (str): The ID of the space to use.
+            environment_id (str): The ID of the environment to use.
+            pool_maxsize (int, optional): Max keep-alive connections per host.
+            rate_limit_per_second (float, optional): Request rate until Contentful reports its limit.
+            max_rate_limit_retries (int, optional): Retries of a request answered with 429.
+            api_url (str, optional): Management API host (e.g. a local fake server).
+            uploads_api_url (str, optional): Upload API host.
+            https (bool, optional): Use HTTPS (False for a local fake server).
+        """
+        self.space_id = space_id
+        self.environment_id = environment_id
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+        self._request_counts: "Counter[str]" = Counter()
+        self._counts_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._environment: Optional[Any] = None
+        self.rate_limiter = AdaptiveRateLimiter(
+            rate_per_second=rate_limit_per_second, burst=rate_limit_per_second
+        )
+        self.client = _PooledClient(
+            management_api_token,
+            self._session,
+            on_request=self._count_request,
+            rate_limiter=self.rate_limiter,
+            api_url=api_url,
+            uploads_api_url=uploads_api_url,
+            https=https,
+            max_rate_limit_retries=max_rate_limit_retries,
+        )
+
+    def environment(self) -> Any:
+        """
+        Returns the cached environment handle, resolving it on first use.
+
+        Returns:
+            Any: The contentful_management Environment.
+        """
+        with self._lock:
+            if self._environment is None:
+                space = self.client.spaces().find(self.space_id)
+                self._environment = space.environments().find(self.environment_id)
+            return self._environment
+
+    def invalidate(self) -> None:
+        """Drops the cached environment handle (e.g. after the environment changed)."""
+        with self._lock:
+            self._environment = None
+
+    def request_counts(self) -> Dict[str, int]:
+        """
+        Returns the number of HTTP requests sent so far, by method.
+
+        Returns:
+            Dict[str, int]: Request count per HTTP method plus a "total" key.
+        """
+        with self._counts_lock:
+            counts = dict(self._request_counts)
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def close(self) -> None:
+        """Closes pooled connections."""
+        self._session.close()
+
+    def unload(self) -> None:
+        self.close()
+
+    def _count_request(self, method: str) -> None:
+        """Counts an outgoing HTTP request."""
+        with self._counts_lock:
+            self._request_counts[method.lower()] += 1
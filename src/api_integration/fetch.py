@@ -1,11 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Any, Dict, Iterator, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
 from api_integration.data_models import (
     PersistedAsset,
     PersistedCategory,
     PersistedNewsArticle,
 )
-import contentful_management
+from api_integration.contentful_connection import ContentfulConnection
 
 
 class FetchAPI(ABC):
@@ -34,6 +35,16 @@ class FetchAPI(ABC):
         """
         pass
 
+    @abstractmethod
+    def iter_assets(self) -> Iterator[PersistedAsset]:
+        """
+        Lazily iterates over all assets, one page at a time.
+
+        Yields:
+            PersistedAsset: The fetched assets.
+        """
+        pass
+
     @abstractmethod
     def fetch_category_by_id(self, category_id: str) -> PersistedCategory:
         """
@@ -57,6 +68,16 @@ class FetchAPI(ABC):
         """
         pass
 
+    @abstractmethod
+    def iter_categories(self) -> Iterator[PersistedCategory]:
+        """
+        Lazily iterates over all categories, one page at a time.
+
+        Yields:
+            PersistedCategory: The fetched categories.
+        """
+        pass
+
     @abstractmethod
     def fetch_news_article_by_id(self, news_article_id: str) -> PersistedNewsArticle:
         """
@@ -80,13 +101,27 @@ class FetchAPI(ABC):
         """
         pass
 
+    @abstractmethod
+    def iter_news_articles(self) -> Iterator[PersistedNewsArticle]:
+        """
+        Lazily iterates over all news articles, one page at a time.
+
+        Yields:
+            PersistedNewsArticle: The fetched news articles.
+        """
+        pass
+
 
 class ContentfulFetchAPI(FetchAPI):
+    MAX_IDS_PER_QUERY = 100  # keeps `sys.id[in]` query URLs well under Contentful's length limit
+
     def __init__(
         self,
         management_api_token: Optional[str],
         space_id: Optional[str] = None,
         environment_id: Optional[str] = None,
+        connection: Optional[ContentfulConnection] = None,
+        page_size: int = 100,
     ) -> None:
         """
         Initializes the Contentful API client.
@@ -95,70 +130,121 @@ class ContentfulFetchAPI(FetchAPI):
             management_api_token (str): The Contentful management API token.
             space_id (str): The ID of the space to upload the asset to.
             environment_id (str): The ID of the environment to upload the asset to.
+            connection (ContentfulConnection, optional): Shared pooled connection to use instead of a new one.
+            page_size (int, optional): Number of items requested per page (Contentful max is 1000).
         """
-        self._management_api_token = management_api_token
-        self._space_id = space_id
-        self._environment_id = environment_id
-        self._client = contentful_management.Client(self._management_api_token)
+        self._connection = connection or ContentfulConnection(
+            management_api_token, space_id, environment_id
+        )
+        self._page_size = page_size
 
     def fetch_asset_by_id(self, asset_id: str) -> PersistedAsset:
-        space = self._client.spaces().find(self._space_id)
-        environment = space.environments().find(self._environment_id)
+        environment = self._connection.environment()
         asset = environment.assets().find(asset_id)
         return PersistedAsset(asset.id, asset.fields()["file"]["url"])
 
     def fetch_assets(self) -> List[PersistedAsset]:
-        # TODO: Implement pagination
-        space = self._client.spaces().find(self._space_id)
-        environment = space.environments().find(self._environment_id)
-        assets = environment.assets().all()
-        return [PersistedAsset(x.id, x.fields()["file"]["url"]) for x in assets]
+        return list(self.iter_assets())
+
+    def iter_assets(self) -> Iterator[PersistedAsset]:
+        environment = self._connection.environment()
+        for page in self._iter_pages(environment.assets(), {}):
+            yield from (PersistedAsset(x.id, x.fields()["file"]["url"]) for x in page)
 
     def fetch_category_by_id(self, category_id: str) -> PersistedCategory:
-        space = self._client.spaces().find(self._space_id)
-        environment = space.environments().find(self._environment_id)
+        environment = self._connection.environment()
         entry = environment.entries().find(category_id)
         return PersistedCategory(entry.id, entry.fields()["title"])
 
     def fetch_categories(self) -> List[PersistedCategory]:
-        # TODO: Implement pagination
-        space = self._client.spaces().find(self._space_id)
-        environment = space.environments().find(self._environment_id)
-        entries = environment.entries().all({"content_type": "category"})
-        return [PersistedCategory(x.id, x.fields()["title"]) for x in entries]
+        return list(self.iter_categories())
+
+    def iter_categories(self) -> Iterator[PersistedCategory]:
+        environment = self._connection.environment()
+        for page in self._iter_pages(
+            environment.entries(), {"content_type": "category"}
+        ):
+            yield from (PersistedCategory(x.id, x.fields()["title"]) for x in page)
 
     def fetch_news_article_by_id(self, news_article_id: str) -> PersistedNewsArticle:
-        space = self._client.spaces().find(self._space_id)
-        environment = space.environments().find(self._environment_id)
+        environment = self._connection.environment()
         entry = environment.entries().find(news_article_id)
-        # Note: Contentful Quirk: use _ separator for camelCase fields here
-        return PersistedNewsArticle(
-            id=entry.id,
-            title=entry.fields()["title"],
-            content=entry.fields()["content"],
-            publishedDate=entry.fields()["published_date"],
-            featuredImage=self.fetch_asset_by_id(entry.fields()["featured_image"].id),
-            categories=[
-                self.fetch_category_by_id(x.id) for x in entry.fields()["categories"]
-            ],
-        )
+        return self._to_news_articles([entry])[0]
 
     def fetch_news_articles(self) -> List[PersistedNewsArticle]:
-        # TODO: Implement pagination
-        space = self._client.spaces().find(self._space_id)
-        environment = space.environments().find(self._environment_id)
-        entries = environment.entries().all({"content_type": "newsArticle"})
+        return list(self.iter_news_articles())
+
+    def iter_news_articles(self) -> Iterator[PersistedNewsArticle]:
+        environment = self._connection.environment()
+        for page in self._iter_pages(
+            environment.entries(), {"content_type": "newsArticle"}
+        ):
+            yield from self._to_news_articles(page)
+
+    def _iter_pages(self, proxy: Any, query: Dict[str, Any]) -> Iterator[List[Any]]:
+        """Walks skip/limit pages, fetching the next page while the current one is consumed."""
+
+        def fetch_page(skip: int) -> List[Any]:
+            return list(
+                proxy.all(
+                    {
+                        **query,
+                        "order": "sys.createdAt",  # stable order across pages
+                        "skip": skip,
+                        "limit": self._page_size,
+                    }
+                )
+            )
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            skip = 0
+            next_page = executor.submit(fetch_page, skip)
+            while True:
+                page = next_page.result()
+                if len(page) < self._page_size:
+                    yield page
+                    return
+                skip += len(page)
+                next_page = executor.submit(fetch_page, skip)
+                yield page
+        finally:
+            executor.shutdown(wait=False)
+
+    def _to_news_articles(self, entries: List[Any]) -> List[PersistedNewsArticle]:
+        """Builds news articles, resolving all linked assets and categories in bulk."""
+        environment = self._connection.environment()
         # Note: Contentful Quirk: use _ separator for camelCase fields here
+        asset_ids = {x.fields()["featured_image"].id for x in entries}
+        category_ids = {y.id for x in entries for y in x.fields()["categories"]}
+        assets = {
+            x.id: PersistedAsset(x.id, x.fields()["file"]["url"])
+            for x in self._find_all_by_id(environment.assets(), asset_ids)
+        }
+        categories = {
+            x.id: PersistedCategory(x.id, x.fields()["title"])
+            for x in self._find_all_by_id(environment.entries(), category_ids)
+        }
         return [
             PersistedNewsArticle(
                 id=x.id,
                 title=x.fields()["title"],
                 content=x.fields()["content"],
                 publishedDate=x.fields()["published_date"],
-                featuredImage=self.fetch_asset_by_id(x.fields()["featured_image"].id),
-                categories=[
-                    self.fetch_category_by_id(y.id) for y in x.fields()["categories"]
-                ],
+                featuredImage=assets[x.fields()["featured_image"].id],
+                categories=[categories[y.id] for y in x.fields()["categories"]],
             )
             for x in entries
         ]
+
+    @classmethod
+    def _find_all_by_id(cls, proxy: Any, ids: Set[str]) -> List[Any]:
+        """Fetches resources by ID with one `sys.id[in]` query per chunk of IDs."""
+        sorted_ids = sorted(ids)
+        resources = []
+        for i in range(0, len(sorted_ids), cls.MAX_IDS_PER_QUERY):
+            chunk = sorted_ids[i : i + cls.MAX_IDS_PER_QUERY]
+            resources.extend(
+                proxy.all({"sys.id[in]": ",".join(chunk), "limit": len(chunk)})
+            )
+        return resources
@@ -0,0 +1,149 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from PIL import Image
+import multiprocessing
+import time
+import io
+
+_FORMATS = {  # format -> (file extension, content type)
+    "PNG": ("png", "image/png"),
+    "JPEG": ("jpg", "image/jpeg"),
+    "WEBP": ("webp", "image/webp"),
+}
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """Image encoded and ready to upload."""
+
+    data: bytes
+    format: str
+    extension: str
+    content_type: str
+    encode_seconds: float
+
+    @property
+    def size_bytes(self) -> int:
+        """Bytes sent over the wire when uploading."""
+        return len(self.data)
+
+
+def encode_image(
+    pil_image: Image, format: str = "PNG", save_kwargs: Optional[Dict[str, Any]] = None
+) -> EncodedImage:
+    """
+    Encodes an image in the current process.
+
+    Args:
+        pil_image (Image): The image to encode.
+        format (str, optional): One of PNG, JPEG or WEBP.
+        save_kwargs (Dict[str, Any], optional): Extra arguments for `Image.save`.
+
+    Returns:
+        EncodedImage: The encoded image.
+    """
+    started_at = time.perf_counter()
+    if format == "JPEG" and pil_image.mode not in ["RGB", "L"]:
+        pil_image = pil_image.convert("RGB")  # JPEG has no alpha channel
+    with io.BytesIO() as buffer:
+        pil_image.save(buffer, format=format, **(save_kwargs or {}))
+        data = buffer.getvalue()
+    extension, content_type = _FORMATS[format]
+    return EncodedImage(
+        data=data,
+        format=format,
+        extension=extension,
+        content_type=content_type,
+        encode_seconds=time.perf_counter() - started_at,
+    )
+
+
+class ImageEncoder:
+    """
+    Encodes images for upload in a pool of worker processes.
+
+    The workers are spawned rather than forked: forking a process that holds
+    model weights, CUDA state and running threads is unsafe.
+    """
+
+    def __init__(
+        self,
+        format: str = "PNG",
+        quality: int = 90,
+        optimize: bool = False,
+        max_workers: int = 2,
+    ) -> None:
+        """
+        Initializes the encoder.
+
+        Args:
+            format (str, optional): One of PNG, JPEG or WEBP.
+            quality (int, optional): JPEG / WEBP quality (1-100, ignored for PNG).
+            optimize (bool, optional): Spend more time encoding for smaller files.
+            max_workers (int, optional): Number of encoding processes.
+        """
+        format = format.upper()
+        assert format in _FORMATS, f"Unsupported image format '{format}'."
+        self._format = format
+        if format == "PNG":
+            self._save_kwargs: Dict[str, Any] = {"optimize": optimize}
+        elif format == "JPEG":
+            self._save_kwargs = {"quality": quality, "optimize": optimize}
+        else:
+            self._save_kwargs = {"quality": quality, "method": 6 if optimize else 4}
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def submit(self, pil_image: Image) -> "Future[EncodedImage]":
+        """
+        Starts encoding an image in a worker process.
+
+        Args:
+            pil_image (Image): The image to encode.
+
+        Returns:
+            Future[EncodedImage]: The encoded image.
+        """
+        return self._executor.submit(
+            encode_image, pil_image, self._format, self._save_kwargs
+        )
+
+    def encode(self, pil_image: Image) -> EncodedImage:
+        """
+        Encodes an image in a worker process and waits for it.
+
+        Args:
+            pil_image (Image): The image to encode.
+
+        Returns:
+            EncodedImage: The encoded image.
+        """
+        return self.submit(pil_image).result()
+
+    def unload(self) -> None:
+        self._executor.shutdown()
+
+
+def load_encoded_image(path: str) -> EncodedImage:
+    """
+    Reads an already encoded image file, e.g. one written by batch generation.
+
+    Args:
+        path (str): Path of a .png, .jpg or .webp file.
+
+    Returns:
+        EncodedImage: The image, ready to upload.
+    """
+    extension = path.rsplit(".", 1)[-1].lower()
+    format = next(x for x, (y, _) in _FORMATS.items() if y == extension)
+    with open(path, "rb") as f:
+        data = f.read()
+    return EncodedImage(
+        data=data,
+        format=format,
+        extension=extension,
+        content_type=_FORMATS[format][1],
+        encode_seconds=0.0,
+    )
@@ -0,0 +1,295 @@
+from typing import Any, Dict, Iterator, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+from api_integration.data_models import (
+    PersistedAsset,
+    PersistedCategory,
+    PersistedNewsArticle,
+)
+from api_integration.fetch import FetchAPI
+import threading
+import requests
+import sqlite3
+import json
+import time
+import os
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (id TEXT PRIMARY KEY, url TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS categories (id TEXT PRIMARY KEY, title TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS news_articles (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    content TEXT NOT NULL,
+    published_date TEXT NOT NULL,
+    featured_image_id TEXT NOT NULL,
+    category_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+_ARTICLES_PAGE_SIZE = 200  # news articles (with their full content) read per query
+
+
+class MirroredFetchAPI(FetchAPI):
+    """
+    Fetch API served from a local SQLite mirror of Contentful.
+
+    The mirror is kept up to date with Contentful's Sync API: the first sync
+    downloads everything, later syncs only pull the changes since the stored
+    sync token. Reads trigger a sync when the mirror is older than
+    `max_staleness_seconds`.
+
+    Note: The Sync API is part of the Content Delivery API, so this needs a
+    delivery token and only mirrors published content.
+    """
+
+    def __init__(
+        self,
+        delivery_api_token: str,
+        space_id: str,
+        environment_id: str,
+        db_path: str,
+        max_staleness_seconds: float = 3600,
+        locale: str = "en-US",
+        base_url: str = "https://cdn.contentful.com",
+        timeout_seconds: float = 30,
+    ) -> None:
+        """
+        Opens (or creates) the local mirror.
+
+        Args:
+            delivery_api_token (str): The Contentful content delivery API token.
+            space_id (str): The ID of the space to mirror.
+            environment_id (str): The ID of the environment to mirror.
+            db_path (str): Path of the SQLite database file.
+            max_staleness_seconds (float, optional): Max age of the mirror before reads sync it.
+            locale (str, optional): Locale of the field values to store.
+            base_url (str, optional): Delivery API base URL (e.g. a local fake server).
+            timeout_seconds (float, optional): Timeout for each sync request.
+        """
+        self._url = f"{base_url}/spaces/{space_id}/environments/{environment_id}/sync"
+        self._headers = {"Authorization": f"Bearer {delivery_api_token}"}
+        self._max_staleness_seconds = max_staleness_seconds
+        self._locale = locale
+        self._timeout_seconds = timeout_seconds
+        self._session = requests.Session()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+
+    def sync(self) -> int:
+        """
+        Pulls all changes since the last sync (everything on the first sync).
+
+        Returns:
+            int: Number of changed items applied.
+        """
+        with self._lock:
+            sync_token = self._get_state("sync_token")
+            url: str = self._url
+            params: Optional[Dict[str, str]] = (
+                {"sync_token": sync_token} if sync_token else {"initial": "true"}
+            )
+            items: List[Dict[str, Any]] = []
+            while True:
+                response = self._session.get(
+                    url,
+                    params=params,
+                    headers=self._headers,
+                    timeout=self._timeout_seconds,
+                )
+                response.raise_for_status()
+                body = response.json()
+                items.extend(body["items"])
+                if "nextPageUrl" in body:
+                    url, params = body["nextPageUrl"], None
+                    continue
+                sync_token = parse_qs(urlparse(body["nextSyncUrl"]).query)[
+                    "sync_token"
+                ][0]
+                break
+            with self._db:  # one transaction, so a failed sync leaves the mirror intact
+                for item in items:
+                    try:
+                        self._apply(item)
+                    except (KeyError, TypeError) as e:  # malformed: skipped, not retried forever
+                        item_id = item.get("sys", {}).get("id")
+                        print(f"Skipping malformed sync item {item_id}: missing {e}")
+                self._set_state("sync_token", sync_token)
+                self._set_state("synced_at", str(time.time()))
+            return len(items)
+
+    def fetch_asset_by_id(self, asset_id: str) -> PersistedAsset:
+        row = self._query_one("SELECT id, url FROM assets WHERE id = ?", asset_id)
+        return PersistedAsset(*row)
+
+    def fetch_assets(self) -> List[PersistedAsset]:
+        return list(self.iter_assets())
+
+    def iter_assets(self) -> Iterator[PersistedAsset]:
+        for row in self._query("SELECT id, url FROM assets ORDER BY id"):
+            yield PersistedAsset(*row)
+
+    def fetch_category_by_id(self, category_id: str) -> PersistedCategory:
+        row = self._query_one(
+            "SELECT id, title FROM categories WHERE id = ?", category_id
+        )
+        return PersistedCategory(*row)
+
+    def fetch_categories(self) -> List[PersistedCategory]:
+        return list(self.iter_categories())
+
+    def iter_categories(self) -> Iterator[PersistedCategory]:
+        for row in self._query("SELECT id, title FROM categories ORDER BY id"):
+            yield PersistedCategory(*row)
+
+    def fetch_news_article_by_id(self, news_article_id: str) -> PersistedNewsArticle:
+        articles = self._to_news_articles(
+            self._query(
+                "SELECT * FROM news_articles WHERE id = ?", news_article_id
+            )
+        )
+        if len(articles) == 0:
+            raise KeyError(f"News article '{news_article_id}' not found in mirror.")
+        return articles[0]
+
+    def fetch_news_articles(self) -> List[PersistedNewsArticle]:
+        return list(self.iter_news_articles())
+
+    def iter_news_articles(self) -> Iterator[PersistedNewsArticle]:
+        # Paged by (published_date, id) so only one page of articles is in memory
+        after = ("", "")
+        while True:
+            rows = self._query(
+                "SELECT * FROM news_articles WHERE (published_date, id) > (?, ?)"
+                " ORDER BY published_date, id LIMIT ?",
+                *after,
+                _ARTICLES_PAGE_SIZE,
+            )
+            yield from self._to_news_articles(rows)
+            if len(rows) < _ARTICLES_PAGE_SIZE:
+                return
+            after = (rows[-1][3], rows[-1][0])
+
+    def _to_news_articles(self, rows: List[tuple]) -> List[PersistedNewsArticle]:
+        """Builds news articles; articles whose image is not (yet) published are skipped."""
+        assets = {
+            x[0]: PersistedAsset(*x)
+            for x in self._query_ids("SELECT id, url FROM assets", {x[4] for x in rows})
+        }
+        categories = {
+            x[0]: PersistedCategory(*x)
+            for x in self._query_ids(
+                "SELECT id, title FROM categories",
+                {y for x in rows for y in json.loads(x[5])},
+            )
+        }
+        return [
+            PersistedNewsArticle(
+                id=id,
+                title=title,
+                content=content,
+                publishedDate=published_date,
+                featuredImage=assets[featured_image_id],
+                categories=[
+                    categories[x] for x in json.loads(category_ids) if x in categories
+                ],
+            )
+            for id, title, content, published_date, featured_image_id, category_ids in rows
+            if featured_image_id in assets
+        ]
+
+    def _apply(self, item: Dict[str, Any]) -> None:
+        """Applies one sync item (upsert or deletion) to the mirror."""
+        sys = item["sys"]
+        if sys["type"] == "DeletedAsset":
+            self._db.execute("DELETE FROM assets WHERE id = ?", (sys["id"],))
+        elif sys["type"] == "DeletedEntry":
+            self._db.execute("DELETE FROM categories WHERE id = ?", (sys["id"],))
+            self._db.execute("DELETE FROM news_articles WHERE id = ?", (sys["id"],))
+        elif sys["type"] == "Asset":
+            self._db.execute(
+                "INSERT OR REPLACE INTO assets VALUES (?, ?)",
+                (sys["id"], self._field(item, "file")["url"]),
+            )  # an asset without a file raises KeyError and is skipped
+        elif sys["type"] == "Entry":
+            content_type = sys["contentType"]["sys"]["id"]
+            if content_type == "category":
+                self._db.execute(
+                    "INSERT OR REPLACE INTO categories VALUES (?, ?)",
+                    (sys["id"], self._field(item, "title")),
+                )
+            elif content_type == "newsArticle":
+                self._db.execute(
+                    "INSERT OR REPLACE INTO news_articles VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        sys["id"],
+                        self._field(item, "title"),
+                        self._field(item, "content"),
+                        self._field(item, "publishedDate"),
+                        self._field(item, "featuredImage")["sys"]["id"],
+                        json.dumps(
+                            [
+                                x["sys"]["id"]
+                                for x in self._field(item, "categories", default=[])
+                            ]
+                        ),
+                    ),
+                )
+
+    def _field(self, item: Dict[str, Any], name: str, default: Any = KeyError) -> Any:
+        """Returns a localized field value of a sync item (empty fields are omitted by Contentful)."""
+        value = item.get("fields", {}).get(name, {}).get(self._locale, default)
+        if value is KeyError:
+            raise KeyError(name)
+        return value
+
+    def _ensure_fresh(self) -> None:
+        """Syncs if the mirror is older than the staleness bound."""
+        synced_at = float(self._get_state("synced_at") or 0)
+        if time.time() - synced_at > self._max_staleness_seconds:
+            self.sync()
+
+    def _query(self, sql: str, *args: Any) -> List[tuple]:
+        """Runs a read query against a fresh-enough mirror."""
+        self._ensure_fresh()
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    def _query_one(self, sql: str, *args: Any) -> tuple:
+        """Runs a read query expected to return exactly one row."""
+        rows = self._query(sql, *args)
+        if len(rows) == 0:
+            raise KeyError(f"'{args[0]}' not found in mirror.")
+        return rows[0]
+
+    def _query_ids(self, sql: str, ids: Set[str]) -> List[tuple]:
+        """Runs `sql` restricted to the given IDs, in chunks below SQLite's variable limit."""
+        sorted_ids = sorted(ids)
+        rows = []
+        for i in range(0, len(sorted_ids), 500):
+            chunk = sorted_ids[i : i + 500]
+            rows.extend(
+                self._query(
+                    f"{sql} WHERE id IN ({', '.join('?' * len(chunk))})", *chunk
+                )
+            )
+        return rows
+
+    def _get_state(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM sync_state WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, key: str, value: str) -> None:
+        self._db.execute(
+            "INSERT OR REPLACE INTO sync_state VALUES (?, ?)", (key, value)
+        )
+
+    def unload(self) -> None:
+        self._session.close()
+        self._db.close()
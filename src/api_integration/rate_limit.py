@@ -0,0 +1,88 @@
+from typing import Any, Dict, Mapping
+import threading
+import time
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket shared by all requests to one API.
+
+    The refill rate follows the `X-Contentful-RateLimit-Second-Limit` header,
+    an exhausted `...-Second-Remaining` empties the bucket, and a 429 pauses
+    every caller for its `Retry-After` / `X-Contentful-RateLimit-Reset`.
+    """
+
+    def __init__(self, rate_per_second: float = 7, burst: float = 7) -> None:
+        """
+        Initializes a full bucket.
+
+        Args:
+            rate_per_second (float, optional): Initial refill rate (until a response reports the limit).
+            burst (float, optional): Bucket capacity.
+        """
+        self._rate = rate_per_second
+        self._capacity = burst
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "throttled": 0, "waited_seconds": 0.0}
+
+    def acquire(self) -> None:
+        """Blocks until a request may be sent."""
+        started_at = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._stats["requests"] += 1
+                    self._stats["waited_seconds"] += now - started_at
+                    return
+                delay = max(
+                    self._paused_until - now, (1 - self._tokens) / self._rate, 0.001
+                )
+            time.sleep(delay)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """
+        Adapts to the rate limit headers of a response.
+
+        Args:
+            status_code (int): HTTP status of the response.
+            headers (Mapping[str, str]): Response headers (case-insensitive).
+        """
+        limit = headers.get("X-Contentful-RateLimit-Second-Limit")
+        remaining = headers.get("X-Contentful-RateLimit-Second-Remaining")
+        with self._lock:
+            self._refill(time.monotonic())
+            if limit:
+                self._rate = self._capacity = float(limit)
+            if remaining is not None and int(remaining) == 0:
+                self._tokens = min(self._tokens, 0)
+            if status_code == 429:
+                retry_after = headers.get("Retry-After") or headers.get(
+                    "X-Contentful-RateLimit-Reset", "1"
+                )
+                self._tokens = 0
+                self._paused_until = max(
+                    self._paused_until, time.monotonic() + float(retry_after)
+                )
+                self._stats["throttled"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns request, throttle (429) and wait counters.
+
+        Returns:
+            Dict[str, Any]: Counters keyed by name, plus the current rate.
+        """
+        with self._lock:
+            return {**self._stats, "rate_per_second": self._rate}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self._capacity, self._tokens + (now - self._refilled_at) * self._rate
+        )
+        self._refilled_at = now
@@ -1,12 +1,15 @@
 from abc import ABC, abstractmethod
-from typing import Optional, List
+from typing import Any, Callable, List, Optional, Union
 from api_integration.data_models import (
     PersistedAsset,
     PersistedCategory,
     PersistedNewsArticle,
 )
 from datetime import datetime
-import contentful_management
+from api_integration.contentful_connection import ContentfulConnection
+from api_integration.asset_processing import AssetProcessingPoller, PendingAsset
+from api_integration.image_encoding import EncodedImage, ImageEncoder, encode_image
+from contentful_management.errors import NotFoundError
 from PIL import Image
 import uuid
 import io
@@ -28,6 +31,23 @@ class UploadAPI(ABC):
         """
         pass
 
+    @abstractmethod
+    def submit_asset(
+        self, pil_image: Union[Image, EncodedImage], asset_id: Optional[str] = None
+    ) -> PendingAsset:
+        """
+        Uploads an image asset and returns without waiting for it to be processed.
+
+        Args:
+            pil_image (Union[Image, EncodedImage]): The image to upload, optionally already encoded.
+            asset_id (str, optional): ID to create the asset under. If it already exists (a retried
+                job), that asset is resumed instead of uploading another one.
+
+        Returns:
+            PendingAsset: Handle resolved once the asset is processed and published.
+        """
+        pass
+
     @abstractmethod
     def upload_category(self, category_title: str) -> PersistedCategory:
         """
@@ -47,8 +67,9 @@ class UploadAPI(ABC):
         title: str,
         content: str,
         publishedDate: datetime,
-        featuredImage: PersistedAsset,
+        featuredImage: Union[PersistedAsset, PendingAsset],
         categories: List[PersistedCategory],
+        entry_id: Optional[str] = None,
     ) -> PersistedNewsArticle:
         """
         Uploads a news article to the API and returns the created PersistedNewsArticle object.
@@ -57,8 +78,11 @@ class UploadAPI(ABC):
             title (str): The title of the news article to upload.
             content (str): The content of the news article to upload.
             publishedDate (datetime): The publish date of the news article to upload.
-            featuredImage (PersistedAsset): The featured image of the news article to upload.
+            featuredImage (Union[PersistedAsset, PendingAsset]): The featured image of the news article to upload.
+                A pending asset is linked right away; the article is published once the asset is.
             categories (List[PersistedCategory]): The categories of the news article to upload.
+            entry_id (str, optional): ID to create the entry under. If it already exists (a retried
+                job), that entry is published instead of creating another one.
 
         Returns:
             PersistedNewsArticle: The created news article.
@@ -72,6 +96,12 @@ class ContentfulUploadAPI(UploadAPI):
         management_api_token: Optional[str],
         space_id: Optional[str] = None,
         environment_id: Optional[str] = None,
+        connection: Optional[ContentfulConnection] = None,
+        asset_processing_timeout_seconds: float = 300,
+        image_encoder: Optional[ImageEncoder] = None,
+        on_news_article_uploaded: Optional[
+            Callable[[PersistedNewsArticle], None]
+        ] = None,
     ) -> None:
         """
         Initializes the Contentful API client.
@@ -80,24 +110,52 @@ class ContentfulUploadAPI(UploadAPI):
             management_api_token (str): The Contentful management API token.
             space_id (str): The ID of the space to upload the asset to.
             environment_id (str): The ID of the environment to upload the asset to.
+            connection (ContentfulConnection, optional): Shared pooled connection to use instead of a new one.
+            asset_processing_timeout_seconds (float, optional): Give up on an asset not processed after this long.
+            image_encoder (ImageEncoder, optional): Encodes images in worker processes (default: PNG in-process).
+            on_news_article_uploaded (Callable[[PersistedNewsArticle], None], optional): Called with each published news article.
         """
-        self._management_api_token = management_api_token
-        self._space_id = space_id
-        self._environment_id = environment_id
-        self._client = contentful_management.Client(self._management_api_token)
+        self._image_encoder = image_encoder
+        self._on_news_article_uploaded = on_news_article_uploaded
+        self._connection = connection or ContentfulConnection(
+            management_api_token, space_id, environment_id
+        )
+        self._space_id = self._connection.space_id
+        self._environment_id = self._connection.environment_id
+        self._client = self._connection.client
+        self._poller = AssetProcessingPoller(
+            find_assets=lambda ids: self._client.assets(
+                self._space_id, self._environment_id
+            ).all({"sys.id[in]": ",".join(ids), "limit": len(ids)}),
+            timeout_seconds=asset_processing_timeout_seconds,
+        )
 
     def upload_asset(self, pil_image: Image) -> PersistedAsset:
-        unique_id = str(uuid.uuid4())
-        default_format = "PNG"
+        return self.submit_asset(pil_image).result()
 
-        file_extension = (
-            pil_image.format.lower() if pil_image.format else default_format.lower()
+    def submit_asset(
+        self, pil_image: Union[Image, EncodedImage], asset_id: Optional[str] = None
+    ) -> PendingAsset:
+        existing = self._find_existing(self._client.assets, asset_id)
+        if existing is not None:
+            print(f"Resuming existing asset {asset_id}.")
+            if not existing.fields().get("file", {}).get("url"):
+                existing.process()  # harmless if processing was already requested
+            return self._poller.watch(existing.id)
+        unique_id = asset_id or str(uuid.uuid4())
+        if isinstance(pil_image, EncodedImage):
+            encoded = pil_image
+        elif self._image_encoder is not None:
+            encoded = self._image_encoder.encode(pil_image)
+        else:
+            encoded = encode_image(pil_image)
+        file_name = f"{unique_id}.{encoded.extension}"
+        print(
+            f"Encoded {file_name}: {encoded.size_bytes / 1024:.0f} KiB"
+            f" in {encoded.encode_seconds:.2f}s"
         )
-        file_name = f"{unique_id}.{file_extension}"
 
-        with io.BytesIO() as img_byte_arr:
-            pil_image.save(img_byte_arr, format=pil_image.format or default_format)
-            img_byte_arr.seek(0)  # Reset the buffer to the beginning
+        with io.BytesIO(encoded.data) as img_byte_arr:  # shares the bytes, no copy
             upload = self._client.uploads(self._space_id).create(img_byte_arr)
 
         asset = self._client.assets(self._space_id, self._environment_id).create(
@@ -109,7 +167,7 @@ class ContentfulUploadAPI(UploadAPI):
                     "file": {
                         "en-US": {
                             "fileName": file_name,
-                            "contentType": f"image/{file_extension}",
+                            "contentType": encoded.content_type,
                             "uploadFrom": upload.to_link().to_json(),
                         }
                     },
@@ -117,14 +175,7 @@ class ContentfulUploadAPI(UploadAPI):
             },
         )
         asset.process()
-        while (
-            not asset.fields().get("file", {}).get("url")
-        ):  # Wait for the asset to be processed (network time = delay as is very fast to process)
-            asset = self._client.assets(self._space_id, self._environment_id).find(
-                asset.id
-            )
-        asset.publish()
-        return PersistedAsset(id=asset.id, url=f"https:{asset.fields()['file']['url']}")
+        return self._poller.watch(asset.id)
 
     def upload_category(self, category_title: str) -> PersistedCategory:
         unique_id = str(uuid.uuid4())
@@ -143,14 +194,15 @@ class ContentfulUploadAPI(UploadAPI):
         title: str,
         content: str,
         publishedDate: datetime,
-        featuredImage: PersistedAsset,
+        featuredImage: Union[PersistedAsset, PendingAsset],
         categories: List[PersistedCategory],
+        entry_id: Optional[str] = None,
     ) -> PersistedNewsArticle:
-        unique_id = str(uuid.uuid4())
+        unique_id = entry_id or str(uuid.uuid4())
         formatted_datetime = publishedDate.strftime("%Y-%m-%dT%H:%M")
-        news_article = self._client.entries(
-            self._space_id, self._environment_id
-        ).create(
+        news_article = self._find_existing(
+            self._client.entries, entry_id
+        ) or self._client.entries(self._space_id, self._environment_id).create(
             unique_id,
             {
                 "content_type_id": "newsArticle",
@@ -184,8 +236,11 @@ class ContentfulUploadAPI(UploadAPI):
                 },
             },
         )
-        news_article.publish()
-        return PersistedNewsArticle(
+        if isinstance(featuredImage, PendingAsset):
+            featuredImage = featuredImage.result()
+        if not news_article.is_published:
+            news_article.publish()
+        persisted = PersistedNewsArticle(
             id=news_article.id,
             title=title,
             content=content,
@@ -193,3 +248,18 @@ class ContentfulUploadAPI(UploadAPI):
             featuredImage=featuredImage,
             categories=categories,
         )
+        if self._on_news_article_uploaded:
+            self._on_news_article_uploaded(persisted)
+        return persisted
+
+    def _find_existing(self, proxy: Callable[[str, str], Any], entity_id: Optional[str]) -> Any:
+        """Returns the asset / entry created under `entity_id` by an earlier attempt, if any."""
+        if entity_id is None:
+            return None
+        try:
+            return proxy(self._space_id, self._environment_id).find(entity_id)
+        except NotFoundError:
+            return None
+
+    def unload(self) -> None:
+        self._poller.close()
@@ -0,0 +1,219 @@
+"""
+Offline Batch Generation and Bulk Publishing
+
+Generate articles from a manifest into a local directory (no Contentful access):
+    python batch.py generate manifest.json output/
+
+Publish a generated directory (already published articles are skipped, missing
+categories are created, requests are paced to Contentful's rate limit):
+    python batch.py publish output/ [--workers 8]
+
+Manifest:
+    {
+        "categories": ["Technology", "Cooking", "Travel"],  (writer's choices, default: the job categories)
+        "jobs": [
+            {"category": "Technology", "count": 10},
+            {"category": "Cooking", "ideas": ["How to Descale an Espresso Machine"]}
+        ]
+    }
+
+Output directory:
+    articles.jsonl   one generated article per line
+    images/          header images, named by job ID
+    published.jsonl  job ID -> news article ID, appended while publishing
+"""
+from config import *
+from main import ArticleJob, build_pipeline, initialize_apis
+from api_integration.image_encoding import load_encoded_image
+from api_integration.bulk_publish import BulkArticle, BulkPublisher
+from api_integration.data_models import PersistedCategory
+from api_integration.fetch import FetchAPI
+from runtime.model_manager import ModelManager
+from datetime import datetime
+from typing import Dict, Iterator, List, Set
+import functools
+import argparse
+import threading
+import shutil
+import json
+import uuid
+import os
+
+
+class BatchOutput:
+    """Directory of Generated Articles (JSONL + Image Files)"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.images_dir = os.path.join(directory, "images")
+        os.makedirs(self.images_dir, exist_ok=True)
+        self._articles_path = os.path.join(directory, "articles.jsonl")
+        self._published_path = os.path.join(directory, "published.jsonl")
+        self._lock = threading.Lock()
+
+    def records(self) -> List[Dict]:
+        """Generated Articles, Oldest First"""
+        return self._read_jsonl(self._articles_path)
+
+    def published_ids(self) -> Set[str]:
+        """Job IDs That Were Already Published"""
+        return {x["job_id"] for x in self._read_jsonl(self._published_path)}
+
+    def add(self, record: Dict) -> None:
+        """Appends a Generated Article (its image file must already be written)"""
+        self._append_jsonl(self._articles_path, record)
+
+    def mark_published(self, job_id: str, news_article_id: str) -> None:
+        self._append_jsonl(
+            self._published_path, {"job_id": job_id, "news_article_id": news_article_id}
+        )
+
+    def _append_jsonl(self, path: str, record: Dict) -> None:
+        with self._lock, open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())  # a crash never loses a line that was reported
+
+    @staticmethod
+    def _read_jsonl(path: str) -> List[Dict]:
+        if not os.path.exists(path):
+            return []
+        with open(path, "r") as f:
+            return [json.loads(x) for x in f if x.strip()]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="generate articles offline")
+    generate_parser.add_argument("manifest")
+    generate_parser.add_argument("output_dir")
+    publish_parser = commands.add_parser("publish", help="publish a generated directory")
+    publish_parser.add_argument("output_dir")
+    publish_parser.add_argument("--workers", type=int, default=BULK_PUBLISH_WORKERS)
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args.manifest, args.output_dir)
+    else:
+        publish(args.output_dir, args.workers)
+
+
+def generate(manifest_path: str, output_dir: str) -> None:
+    """Generates Every Article of the Manifest into the Output Directory"""
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+    output = BatchOutput(output_dir)
+    manager = initialize_apis(offline=True)
+    if DUPLICATE_THRESHOLD:  # also avoid duplicating earlier runs into this directory
+        with manager.use("duplicate_index") as duplicate_index:
+            for record in output.records():
+                duplicate_index.add(record["job_id"], record["title"])
+    pipeline = build_pipeline(
+        manager, last_stage=("saved", functools.partial(save_article, output=output))
+    )
+    jobs = list(manifest_jobs(manifest))
+    pipeline.start(iter(jobs))
+    saved = 0
+    for job in pipeline.results():
+        saved += 1
+        print(f"Saved ({saved}/{len(jobs)}): {job.article['title']}")
+    print(f"Generated {saved} of {len(jobs)} articles into {output_dir}.")
+    print(pipeline.report())
+    manager.unload_all()
+
+
+def manifest_jobs(manifest: Dict) -> Iterator[ArticleJob]:
+    """Yields One Job per Requested Article"""
+    titles = manifest.get("categories") or list(
+        dict.fromkeys(x["category"] for x in manifest["jobs"])
+    )
+    all_categories = [PersistedCategory(id="", title=x) for x in titles]
+    for entry in manifest["jobs"]:
+        for idea in entry.get("ideas", []):
+            yield ArticleJob(
+                all_categories=all_categories, category=entry["category"], idea=idea
+            )
+        for _ in range(entry.get("count", 0)):
+            yield ArticleJob(all_categories=all_categories, category=entry["category"])
+
+
+def save_article(
+    manager: ModelManager, job: ArticleJob, output: BatchOutput
+) -> ArticleJob:
+    """Stage: Write the Article and Its Header Image to the Output Directory"""
+    job_id = uuid.uuid4().hex
+    record = {
+        "job_id": job_id,
+        "generated_at": datetime.now().isoformat(),
+        "category": job.category,
+        "idea": job.idea,
+        **job.article,
+    }
+    if job.cached_image is not None:
+        # Linked to the existing asset when published; the file is kept for reference
+        record["asset_id"] = job.cached_image.asset.id
+        extension = job.cached_image.path.rsplit(".", 1)[-1]
+        record["image"] = f"images/{job_id}.{extension}"
+        shutil.copyfile(
+            job.cached_image.path, os.path.join(output.directory, record["image"])
+        )
+    else:
+        record["image"] = f"images/{job_id}.{job.encoded_image.extension}"
+        with open(os.path.join(output.directory, record["image"]), "wb") as f:
+            f.write(job.encoded_image.data)
+    output.add(record)
+    if DUPLICATE_THRESHOLD:
+        with manager.use("duplicate_index") as duplicate_index:
+            duplicate_index.add(job_id, job.article["title"])
+    return job
+
+
+def publish(output_dir: str, workers: int = BULK_PUBLISH_WORKERS) -> None:
+    """Publishes Every Article of the Output Directory Not Yet Published"""
+    output = BatchOutput(output_dir)
+    published_ids = output.published_ids()
+    records = [x for x in output.records() if x["job_id"] not in published_ids]
+    print(f"Publishing {len(records)} articles ({len(published_ids)} already published).")
+    manager = initialize_apis()
+    with manager.use("fetch_api") as fetch_api:
+        categories = {x.title: x for x in fetch_api.fetch_categories()}
+    # In chunks, so only one chunk's images are held in memory
+    for start in range(0, len(records), BULK_PUBLISH_CHUNK_SIZE):
+        with manager.use("fetch_api") as fetch_api:
+            articles = [
+                bulk_article(fetch_api, output, x)
+                for x in records[start : start + BULK_PUBLISH_CHUNK_SIZE]
+            ]
+        with manager.use("contentful") as connection, manager.use("upload_api") as upload_api:
+            publisher = BulkPublisher(
+                upload_api, workers=workers, rate_limiter=connection.rate_limiter
+            )
+            report = publisher.publish(
+                articles,
+                categories,
+                on_published=lambda job_id, x: output.mark_published(job_id, x.id),
+            )
+        categories.update(report.categories)
+        print(f"Articles {start + 1}-{start + len(articles)} of {len(records)}:")
+        print(report)
+    manager.unload_all()
+
+
+def bulk_article(fetch_api: FetchAPI, output: BatchOutput, record: Dict) -> BulkArticle:
+    """The Generated Article with Its Header Image (or the cached asset it links)"""
+    if record.get("asset_id"):
+        image = fetch_api.fetch_asset_by_id(record["asset_id"])
+    else:
+        image = load_encoded_image(os.path.join(output.directory, record["image"]))
+    return BulkArticle(
+        key=record["job_id"],
+        title=record["title"],
+        content=record["body"],
+        published_date=datetime.now(),
+        image=image,
+        category_titles=record["category_list"],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Measures sustained publish throughput against a local fake Contentful server.
+
+Publishes a batch of articles (each with its own header image, plus a few
+new categories) one at a time like the previous publisher did, then with
+`BulkPublisher`, and prints entities/s, 429s and time spent waiting on the
+rate limiter. The server enforces its own per-second limit, so a publisher
+that ignores the rate limit headers shows up as throttled requests.
+
+Run from `src`:
+    python -m benchmarks.bulk_publish_benchmark [--articles 40] [--workers 8] [--limit 10]
+"""
+from api_integration.bulk_publish import BulkArticle, BulkPublisher, BulkPublishReport
+from api_integration.contentful_connection import ContentfulConnection
+from api_integration.image_encoding import EncodedImage
+from api_integration.upload import ContentfulUploadAPI
+from benchmarks.fake_contentful import FakeContentfulServer
+from datetime import datetime
+from typing import List
+import argparse
+import time
+
+CATEGORIES = ["Technology", "Cooking", "Travel"]
+
+
+def make_articles(count: int) -> List[BulkArticle]:
+    return [
+        BulkArticle(
+            key=f"article-{i}",
+            title=f"Article {i}",
+            content=f"Body of article {i}.",
+            published_date=datetime.now(),
+            image=EncodedImage(
+                data=b"\x89PNG" + bytes(1024),
+                format="PNG",
+                extension="png",
+                content_type="image/png",
+                encode_seconds=0.0,
+            ),
+            category_titles=[CATEGORIES[i % len(CATEGORIES)]],
+        )
+        for i in range(count)
+    ]
+
+
+def run(
+    server: FakeContentfulServer, articles: List[BulkArticle], workers: int
+) -> BulkPublishReport:
+    connection = ContentfulConnection(
+        "token",
+        space_id="space",
+        environment_id="master",
+        pool_maxsize=workers,
+        api_url=server.host,
+        uploads_api_url=server.host,
+        https=False,
+    )
+    upload_api = ContentfulUploadAPI(
+        None, connection=connection, asset_processing_timeout_seconds=60
+    )
+    try:
+        if workers == 1:
+            return publish_sequentially(upload_api, articles, connection)
+        publisher = BulkPublisher(
+            upload_api, workers=workers, rate_limiter=connection.rate_limiter
+        )
+        return publisher.publish(articles, categories={})
+    finally:
+        upload_api.unload()
+        connection.close()
+
+
+def publish_sequentially(
+    upload_api: ContentfulUploadAPI,
+    articles: List[BulkArticle],
+    connection: ContentfulConnection,
+) -> BulkPublishReport:
+    """One entity at a time, each waiting for the previous one (the previous publisher)."""
+    report = BulkPublishReport()
+    started_at = time.monotonic()
+    categories = {}
+    for article in articles:
+        for title in article.category_titles:
+            if title not in categories:
+                categories[title] = upload_api.upload_category(title)
+                report.categories_created += 1
+        asset = upload_api.upload_asset(article.image)
+        report.assets_uploaded += 1
+        report.published[article.key] = upload_api.upload_news_article(
+            title=article.title,
+            content=article.content,
+            publishedDate=article.published_date,
+            featuredImage=asset,
+            categories=[categories[x] for x in article.category_titles],
+        )
+    report.elapsed_seconds = time.monotonic() - started_at
+    report.rate_limit = connection.rate_limiter.stats()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--articles", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=10, help="server requests/s")
+    args = parser.parse_args()
+    for name, workers in (("Sequential", 1), ("BulkPublisher", args.workers)):
+        server = FakeContentfulServer(
+            rate_limit_per_second=args.limit, latency_seconds=0.1
+        ).start()
+        try:
+            report = run(server, make_articles(args.articles), workers)
+        finally:
+            server.stop()
+        print(f"{name} ({workers} workers):")
+        print(report)
+        print(
+            f"Server: {server.stats['requests']} requests,"
+            f" {server.stats['throttled']} throttled,"
+            f" {server.stats['rejected_publishes']} publishes rejected for unpublished links."
+        )
+
+
+if __name__ == "__main__":
+    main()
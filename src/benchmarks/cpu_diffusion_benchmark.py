@@ -0,0 +1,95 @@
+"""
+Measures CPU inference of `DiffusersTextToImage` per `CPUBackend` configuration.
+
+Each configuration runs in its own process, so the peak RSS reported is that
+of loading the pipeline and rendering with it alone. One warmup image is
+rendered first (it includes `torch.compile`'s compilation), then seconds per
+image are averaged over the timed images.
+
+Run from `src`:
+    python -m benchmarks.cpu_diffusion_benchmark [--model <path>] [--steps 20] [--images 2]
+"""
+from config import HUGGINGFACE_DIFFUSERS_PRETRAINED_MODEL_NAME_OR_PATH
+from diffusion_generator.text_to_image import CPUBackend, DiffusersTextToImage
+from dataclasses import asdict
+from typing import Dict, List, Tuple
+import multiprocessing
+import argparse
+import resource
+import sys
+import time
+
+PROMPT = "A lighthouse on a rocky coast at sunset, photograph"
+
+CONFIGURATIONS: List[Tuple[str, CPUBackend]] = [
+    ("fp32", CPUBackend(dtype="float32", channels_last=False)),
+    ("bf16", CPUBackend(dtype="bfloat16", channels_last=False)),
+    ("bf16 + channels last", CPUBackend(dtype="bfloat16")),
+    (
+        "bf16 + slicing + tiling",
+        CPUBackend(dtype="bfloat16", attention_slicing=True, vae_tiling=True),
+    ),
+    ("bf16 + compile", CPUBackend(dtype="bfloat16", compile=True)),
+]
+
+
+def run_configuration(
+    model: str, backend: CPUBackend, steps: int, images: int
+) -> Dict[str, float]:
+    """Loads the pipeline with the backend and renders; runs in a child process."""
+    started_at = time.perf_counter()
+    gen = DiffusersTextToImage(
+        model, num_inference_steps=steps, cpu_backend=backend
+    )
+    load_seconds = time.perf_counter() - started_at
+    gen.generate_image(PROMPT, "")  # warmup
+    started_at = time.perf_counter()
+    for _ in range(images):
+        gen.generate_image(PROMPT, "")
+    seconds_per_image = (time.perf_counter() - started_at) / images
+    # ru_maxrss is in KiB on Linux, bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / 2**20 if sys.platform == "darwin" else peak_rss / 2**10
+    return {
+        "load_seconds": load_seconds,
+        "seconds_per_image": seconds_per_image,
+        "peak_rss_mb": peak_rss_mb,
+    }
+
+
+def _child(model: str, backend: Dict, steps: int, images: int, queue: multiprocessing.Queue) -> None:
+    try:
+        queue.put(run_configuration(model, CPUBackend(**backend), steps, images))
+    except Exception as e:
+        queue.put({"error": f"{type(e).__name__}: {e}"})
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--model", default=HUGGINGFACE_DIFFUSERS_PRETRAINED_MODEL_NAME_OR_PATH)
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--images", type=int, default=2, help="timed images per configuration")
+    parser.add_argument("--threads", type=int, default=0, help="0 = one per core")
+    args = parser.parse_args()
+    context = multiprocessing.get_context("spawn")  # fresh process: clean peak RSS
+    print(f"{'Configuration':<28}{'load s':>10}{'s/image':>10}{'peak RSS MB':>14}")
+    for name, backend in CONFIGURATIONS:
+        queue = context.Queue()
+        fields = {**asdict(backend), "num_threads": args.threads or None}
+        process = context.Process(
+            target=_child, args=(args.model, fields, args.steps, args.images, queue)
+        )
+        process.start()
+        result = queue.get()
+        process.join()
+        if "error" in result:
+            print(f"{name:<28}{result['error']}")
+            continue
+        print(
+            f"{name:<28}{result['load_seconds']:>10.1f}"
+            f"{result['seconds_per_image']:>10.2f}{result['peak_rss_mb']:>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Local fake of the parts of the Contentful Management and Upload APIs the
+upload API uses, and of the Sync API the mirror uses, for exercising them
+without a real space.
+
+It keeps entities in memory, answers with `X-Contentful-RateLimit-*`
+headers, rejects requests over its per-second limit with 429, processes
+assets after a delay and refuses to publish an entry that links an
+unpublished asset or entry.
+
+Serves all APIs on one port; point a `ContentfulConnection` at it with
+`api_url=server.host, uploads_api_url=server.host, https=False`, and a
+`MirroredFetchAPI` with `base_url=f"http://{server.host}"`.
+"""
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+import threading
+import json
+import math
+import time
+import uuid
+import re
+
+
+class FakeContentfulServer:
+    """In-memory Contentful stand-in running on a background thread."""
+
+    def __init__(
+        self,
+        rate_limit_per_second: int = 10,
+        processing_seconds: float = 0.5,
+        latency_seconds: float = 0.02,
+        port: int = 0,
+        sync_page_size: int = 100,
+    ) -> None:
+        """
+        Initializes the server (call `start()` to serve).
+
+        Args:
+            rate_limit_per_second (int, optional): Requests accepted per wall-clock second.
+            processing_seconds (float, optional): Time an asset takes to process.
+            latency_seconds (float, optional): Added to every response.
+            port (int, optional): Port to listen on (0 picks a free one).
+            sync_page_size (int, optional): Items per Sync API page.
+        """
+        self.rate_limit_per_second = rate_limit_per_second
+        self.processing_seconds = processing_seconds
+        self.latency_seconds = latency_seconds
+        self.sync_page_size = sync_page_size
+        self.stats: Counter = Counter()
+        self._entities: Dict[str, Dict[str, Any]] = {}  # "Asset:<id>" / "Entry:<id>" -> json
+        self._processed_at: Dict[str, float] = {}
+        self._published_log: List[str] = []  # keys in publish order; sync tokens index it
+        self._window: Tuple[int, int] = (0, 0)  # (second, requests in it)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def host(self) -> str:
+        return f"127.0.0.1:{self._server.server_address[1]}"
+
+    def start(self) -> "FakeContentfulServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                self._respond()
+
+            def do_POST(self) -> None:
+                self._respond()
+
+            def do_PUT(self) -> None:
+                self._respond()
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _respond(self) -> None:
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                time.sleep(server.latency_seconds)
+                status, payload, headers = server._handle(
+                    self.command, self.path, self.headers, body
+                )
+                data = b"" if payload is None else json.dumps(payload).encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/vnd.contentful.management.v1+json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    def _handle(
+        self, method: str, path: str, headers: Any, body: bytes
+    ) -> Tuple[int, Optional[Dict], Dict[str, str]]:
+        """Routes one request; returns status, JSON payload and extra headers."""
+        now = time.time()
+        with self._lock:
+            second, count = self._window
+            if int(now) != second:
+                second, count = int(now), 0
+            count += 1
+            self._window = (second, count)
+            remaining = max(self.rate_limit_per_second - count, 0)
+            rate_headers = {
+                "X-Contentful-RateLimit-Second-Limit": str(self.rate_limit_per_second),
+                "X-Contentful-RateLimit-Second-Remaining": str(remaining),
+            }
+            if count > self.rate_limit_per_second:
+                self.stats["throttled"] += 1
+                reset = str(max(math.ceil(second + 1 - now), 1))
+                return 429, _error("RateLimitExceeded"), {
+                    **rate_headers,
+                    "X-Contentful-RateLimit-Reset": reset,
+                }
+            self.stats["requests"] += 1
+            status, payload = self._route(method, urlparse(path), headers, body)
+        return status, payload, rate_headers
+
+    def _route(
+        self, method: str, url: Any, headers: Any, body: bytes
+    ) -> Tuple[int, Optional[Dict]]:
+        match = re.fullmatch(
+            r"/spaces/(?P<space>[^/]+)(?:/environments/(?P<env>[^/]+))?"
+            r"(?:/(?P<kind>assets|entries|uploads|sync)(?:/(?P<id>[^/]+)(?P<action>/.*)?)?)?",
+            url.path,
+        )
+        if match is None:
+            return 404, _error("NotFound")
+        space, env, kind = match["space"], match["env"] or "master", match["kind"]
+        entity_id, action = match["id"], match["action"] or ""
+        if kind is None:  # space or environment
+            type_ = "Environment" if match["env"] else "Space"
+            return 200, {"sys": {"type": type_, "id": match["env"] or space}, "name": space}
+        if kind == "sync" and method == "GET":
+            return 200, self._sync(url, space, env)
+        if kind == "uploads" and method == "POST":
+            self.stats["uploads"] += 1
+            return 201, {"sys": {"type": "Upload", "id": uuid.uuid4().hex, "space": _link("Space", space)}}
+        type_ = "Asset" if kind == "assets" else "Entry"
+        if entity_id is None and method == "GET":
+            ids = parse_qs(url.query).get("sys.id[in]", [""])[0].split(",")
+            items = [self._view(f"{type_}:{x}") for x in ids if f"{type_}:{x}" in self._entities]
+            return 200, {"sys": {"type": "Array"}, "items": items, "total": len(items), "skip": 0, "limit": len(items)}
+        key = f"{type_}:{entity_id}"
+        if method == "PUT" and action == "":
+            self._entities[key] = {
+                "sys": _sys(type_, entity_id, space, env, headers.get("X-Contentful-Content-Type")),
+                "fields": json.loads(body or b"{}").get("fields", {}),
+            }
+            self.stats[f"{type_.lower()}_created"] += 1
+            return 201, self._view(key)
+        if key not in self._entities:
+            return 404, _error("NotFound")
+        entity = self._entities[key]
+        if method == "GET" and action == "":
+            return 200, self._view(key)
+        if method == "PUT" and action.startswith("/files/") and action.endswith("/process"):
+            entity["sys"]["version"] += 1
+            self._processed_at[key] = time.time() + self.processing_seconds
+            return 204, None
+        if method == "PUT" and action == "/published":
+            unpublished = self._unpublished_links(key)
+            if unpublished:
+                self.stats["rejected_publishes"] += 1
+                return 422, _error("UnresolvedLinks", unpublished)
+            entity["sys"]["version"] += 1
+            entity["sys"]["publishedVersion"] = entity["sys"]["version"] - 1
+            entity["sys"]["publishedAt"] = _now()
+            self.stats[f"{type_.lower()}_published"] += 1
+            self._published_log.append(key)
+            return 200, self._view(key)
+        return 404, _error("NotFound")
+
+    def _sync(self, url: Any, space: str, env: str) -> Dict:
+        """One Sync API page: entities published since the token (all on `initial`)."""
+        query = parse_qs(url.query)
+        start = 0 if "initial" in query else int(query["sync_token"][0])
+        end = min(start + self.sync_page_size, len(self._published_log))
+        keys = list(dict.fromkeys(self._published_log[start:end]))  # latest state once
+        base = f"http://{self.host}/spaces/{space}/environments/{env}/sync"
+        next_url = "nextPageUrl" if end < len(self._published_log) else "nextSyncUrl"
+        self.stats["sync_pages"] += 1
+        return {
+            "sys": {"type": "Array"},
+            "items": [self._view(x) for x in keys],
+            next_url: f"{base}?sync_token={end}",
+        }
+
+    def _view(self, key: str) -> Dict:
+        """JSON of an entity as the API shows it now (assets gain a URL once processed)."""
+        entity = json.loads(json.dumps(self._entities[key]))
+        processed_at = self._processed_at.get(key)
+        if processed_at is not None and processed_at <= time.time():
+            for file in entity["fields"].get("file", {}).values():
+                file.pop("uploadFrom", None)
+                file["url"] = f"//images.fake/{key.split(':')[1]}/{file['fileName']}"
+        return entity
+
+    def _unpublished_links(self, key: str) -> Optional[str]:
+        """Why the entity cannot be published yet, None if it can."""
+        if key.startswith("Asset:"):
+            view = self._view(key)
+            ok = all("url" in x for x in view["fields"].get("file", {}).values())
+            return None if ok else "Asset is not processed."
+        for value in self._entities[key]["fields"].values():
+            for localized in value.values():
+                for link in localized if isinstance(localized, list) else [localized]:
+                    sys = link.get("sys", {}) if isinstance(link, dict) else {}
+                    if sys.get("type") != "Link":
+                        continue
+                    linked = self._entities.get(f"{sys['linkType']}:{sys['id']}")
+                    if linked is None or "publishedVersion" not in linked["sys"]:
+                        return f"Linked {sys['linkType']} {sys['id']} is not published."
+        return None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def _link(link_type: str, id: str) -> Dict:
+    return {"sys": {"type": "Link", "linkType": link_type, "id": id}}
+
+
+def _sys(
+    type_: str, id: str, space: str, env: str, content_type: Optional[str]
+) -> Dict:
+    sys = {
+        "type": type_,
+        "id": id,
+        "version": 1,
+        "space": _link("Space", space),
+        "environment": _link("Environment", env),
+        "createdAt": _now(),
+        "updatedAt": _now(),
+    }
+    if content_type:
+        sys["contentType"] = _link("ContentType", content_type)
+    return sys
+
+
+def _error(id: str, message: str = "") -> Dict:
+    return {"sys": {"type": "Error", "id": id}, "message": message or id}
@@ -0,0 +1,97 @@
+"""
+Measures how many LLM rewrites the JSON repair parser avoids.
+
+Every output in the corpus is parsed with the previous parser (newline
+escaping + `json.loads`) and with `repair_json_object`, then checked like
+`InOut.write_news_article` checks articles. Outputs that fail are outputs
+the writer would have to regenerate.
+
+Run from `src`:
+    python -m benchmarks.json_repair_benchmark [corpus.jsonl]
+
+The corpus is JSONL with an "output" (raw model output) and a "note" per line.
+"""
+from typing import Callable, Dict, List
+from llm_generator.in_out import InOut
+from llm_generator.json_repair import repair_json_object
+import json
+import time
+import sys
+import re
+import os
+
+DEFAULT_CORPUS = os.path.join(
+    os.path.dirname(__file__), "corpora", "malformed_article_outputs.jsonl"
+)
+
+
+def legacy_parse(json_string: str) -> Dict:
+    """The parser used before the repair parser."""
+    json_string = json_string.replace("<|im_end|>", "")
+    removed_internal_newlines = re.sub(
+        r'\"([^"]*)\"',
+        lambda match: match.group(0).replace("\n", "\\n"),
+        json_string,
+    )
+    return json.loads(removed_internal_newlines)
+
+
+def repair_parse(json_string: str) -> Dict:
+    return repair_json_object(json_string)[0]
+
+
+def accepts(parse: Callable[[str], Dict], output: str) -> bool:
+    """Whether the output would be accepted without a rewrite."""
+    try:
+        InOut._raise_for_bad_json_output(
+            input_json=parse(output),
+            expected_keys_to_type=InOut.NEWS_ARTICLE_KEYS_TO_TYPE,
+        )
+    except (ValueError, AssertionError):
+        return False
+    return True
+
+
+def time_per_mb(body_kb: int) -> float:
+    """Seconds per MB to repair an article with a body of `body_kb` KB."""
+    body = ('He said "yes".\n' * 64 * body_kb)[: body_kb * 1024]
+    output = (
+        '{"title": "T", "category_list": ["A",], "header_img_description": "D", '
+        f'"body": "{body}",}}'
+    )
+    started_at = time.perf_counter()
+    repair_json_object(output)
+    return (time.perf_counter() - started_at) / (len(output) / 2**20)
+
+
+def main(corpus_path: str) -> None:
+    with open(corpus_path, encoding="utf-8") as f:
+        corpus: List[Dict] = [json.loads(x) for x in f if x.strip()]
+
+    print(f"{'output':<45} {'legacy':>7} {'repair':>7}  repairs")
+    legacy_accepted = repair_accepted = 0
+    for item in corpus:
+        legacy_ok = accepts(legacy_parse, item["output"])
+        repair_ok = accepts(repair_parse, item["output"])
+        legacy_accepted += legacy_ok
+        repair_accepted += repair_ok
+        try:
+            repairs = ", ".join(repair_json_object(item["output"])[1]) or "-"
+        except ValueError as e:
+            repairs = f"failed: {e}"
+        print(
+            f"{item.get('note', '')[:45]:<45} {'ok' if legacy_ok else 'REWRITE':>7}"
+            f" {'ok' if repair_ok else 'REWRITE':>7}  {repairs}"
+        )
+
+    total = len(corpus)
+    print()
+    print(f"Rewrite rate (legacy): {1 - legacy_accepted / total:.0%}")
+    print(f"Rewrite rate (repair): {1 - repair_accepted / total:.0%}")
+    print(f"Rewrites avoided: {repair_accepted - legacy_accepted} of {total}")
+    for body_kb in [4, 64, 1024]:
+        print(f"Repair speed, {body_kb} KB body: {time_per_mb(body_kb):.2f} s/MB")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_CORPUS)
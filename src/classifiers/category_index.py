@@ -0,0 +1,173 @@
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from api_integration.data_models import PersistedCategory, PersistedNewsArticle
+import threading
+import math
+import json
+import re
+import os
+
+_STOP_WORDS = set(
+    "a an and are as at be by for from how in is it of on or that the to what when"
+    " why with you your".split()
+)
+
+
+class CategoryRanker(ABC):
+    @abstractmethod
+    def sync(
+        self,
+        categories: Optional[List[PersistedCategory]] = None,
+        articles: Iterable[PersistedNewsArticle] = (),
+    ) -> None:
+        """
+        Brings the index up to date with the current categories and any new articles.
+
+        Args:
+            categories (List[PersistedCategory], optional): All current categories (None if unchanged).
+            articles (Iterable[PersistedNewsArticle], optional): Published articles (already indexed ones are skipped).
+        """
+        pass
+
+    @abstractmethod
+    def top_k(self, text: str, k: int) -> List[str]:
+        """
+        Ranks categories by relevance to a text.
+
+        Args:
+            text (str): E.g. an article idea.
+            k (int): Number of categories to return.
+
+        Returns:
+            List[str]: Titles of the k most relevant categories, most relevant first.
+        """
+        pass
+
+    @abstractmethod
+    def unload(self) -> None:
+        """
+        Persists and releases the index.
+        """
+        pass
+
+
+class TfidfCategoryIndex(CategoryRanker):
+    """
+    TF-IDF index of categories, cached on disk and updated incrementally.
+
+    Each category is a document made of its title (weighted up) and the titles
+    of the articles published in it, so categories are matched on what they
+    are actually about. Categories without any matching term are ranked by
+    article count.
+    """
+
+    TITLE_WEIGHT = 3  # the category title counts like this many article titles
+
+    def __init__(self, path: str) -> None:
+        """
+        Loads (or creates) the index.
+
+        Args:
+            path (str): Path of the JSON file the index is persisted to.
+        """
+        self._path = path
+        self._terms: Dict[str, Counter] = {}  # category title -> term counts
+        self._article_counts: Counter = Counter()
+        self._article_ids: set = set()
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            self._terms = {x: Counter(y) for x, y in state["terms"].items()}
+            self._article_counts = Counter(state["article_counts"])
+            self._article_ids = set(state["article_ids"])
+        self._vectors: Optional[Dict[str, Dict[str, float]]] = None
+        self._lock = threading.Lock()
+
+    def sync(
+        self,
+        categories: Optional[List[PersistedCategory]] = None,
+        articles: Iterable[PersistedNewsArticle] = (),
+    ) -> None:
+        with self._lock:
+            changed = False
+            titles = set(self._terms) if categories is None else {x.title for x in categories}
+            for title in set(self._terms) - titles:
+                del self._terms[title]
+                self._article_counts.pop(title, None)
+                changed = True
+            for title in titles - set(self._terms):
+                self._terms[title] = Counter(
+                    {x: self.TITLE_WEIGHT for x in self._tokenize(title)}
+                )
+                changed = True
+            for article in articles:
+                if article.id in self._article_ids:
+                    continue
+                self._article_ids.add(article.id)
+                for category in article.categories:
+                    if category.title in self._terms:
+                        self._terms[category.title].update(self._tokenize(article.title))
+                        self._article_counts[category.title] += 1
+                changed = True
+            if changed:
+                self._vectors = None
+                self._save()
+
+    def top_k(self, text: str, k: int) -> List[str]:
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = self._build_vectors()
+            query = set(self._tokenize(text))
+            scores = {
+                title: sum(vector.get(x, 0.0) for x in query)
+                for title, vector in self._vectors.items()
+            }
+        ranked = sorted(
+            scores, key=lambda x: (scores[x], self._article_counts[x]), reverse=True
+        )
+        return ranked[:k]
+
+    def _build_vectors(self) -> Dict[str, Dict[str, float]]:
+        """Normalized TF-IDF vector of each category."""
+        document_frequency: Counter = Counter()
+        for terms in self._terms.values():
+            document_frequency.update(terms.keys())
+        vectors = {}
+        for title, terms in self._terms.items():
+            vector = {
+                term: (1 + math.log(count))
+                * math.log((1 + len(self._terms)) / (1 + document_frequency[term]))
+                for term, count in terms.items()
+            }
+            norm = math.sqrt(sum(x * x for x in vector.values())) or 1.0
+            vectors[title] = {x: y / norm for x, y in vector.items()}
+        return vectors
+
+    @staticmethod
+    def _tokenize(text: str) -> List[str]:
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        return [
+            x[:-1] if len(x) > 3 and x.endswith("s") and not x.endswith("ss") else x
+            for x in tokens
+            if x not in _STOP_WORDS
+        ]
+
+    def _save(self) -> None:
+        """Writes the index to disk (atomically, so a crash never leaves a partial file)."""
+        if os.path.dirname(self._path):
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(f"{self._path}.tmp", "w") as f:
+            json.dump(
+                {
+                    "terms": self._terms,
+                    "article_counts": self._article_counts,
+                    "article_ids": sorted(self._article_ids),
+                },
+                f,
+            )
+        os.replace(f"{self._path}.tmp", self._path)
+
+    def unload(self) -> None:
+        with self._lock:
+            self._save()
@@ -0,0 +1,136 @@
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import threading
+import zlib
+import re
+
+
+class NearDuplicateIndex(ABC):
+    @abstractmethod
+    def add(self, key: str, text: str) -> None:
+        """
+        Indexes a text (e.g. the title of a published article).
+
+        Args:
+            key (str): ID of the text, returned by lookups.
+            text (str): Text to index.
+        """
+        pass
+
+    @abstractmethod
+    def find_similar(self, text: str) -> Optional[Tuple[str, float]]:
+        """
+        Finds the indexed text most similar to `text`, if it is a near-duplicate.
+
+        Args:
+            text (str): Text to look up (e.g. an article idea or title).
+
+        Returns:
+            Optional[Tuple[str, float]]: Key and estimated similarity, None if nothing is above the threshold.
+        """
+        pass
+
+    @abstractmethod
+    def unload(self) -> None:
+        """
+        Releases the memory held by the index.
+        """
+        pass
+
+
+class MinHashLSHIndex(NearDuplicateIndex):
+    """
+    MinHash signatures of character shingles, bucketed with LSH.
+
+    Similarity is the Jaccard similarity of the shingle sets. A lookup only
+    compares signatures of texts sharing at least one LSH band, so it stays
+    sub-millisecond with 100k+ indexed texts.
+    """
+
+    _PRIME = (1 << 31) - 1
+
+    def __init__(
+        self,
+        threshold: float = 0.6,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        seed: int = 1,
+    ) -> None:
+        """
+        Initializes an empty index.
+
+        Args:
+            threshold (float, optional): Min Jaccard similarity of a near-duplicate.
+            num_perm (int, optional): MinHash permutations (signature length).
+            shingle_size (int, optional): Characters per shingle.
+            seed (int, optional): Seed of the hash permutations.
+        """
+        self._threshold = threshold
+        self._shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self._PRIME, size=(num_perm, 1), dtype=np.int64)
+        self._b = rng.integers(0, self._PRIME, size=(num_perm, 1), dtype=np.int64)
+        # Cut-off below the threshold, so texts just above it are rarely missed
+        self._bands, self._rows = self._lsh_params(0.8 * threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[str]]] = [
+            defaultdict(list) for _ in range(self._bands)
+        ]
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, text: str) -> None:
+        signature = self._signature(text)
+        with self._lock:
+            if key in self._signatures:
+                return
+            self._signatures[key] = signature
+            for bucket, band in zip(self._buckets, self._band_keys(signature)):
+                bucket[band].append(key)
+
+    def find_similar(self, text: str) -> Optional[Tuple[str, float]]:
+        signature = self._signature(text)
+        best: Optional[Tuple[str, float]] = None
+        with self._lock:
+            candidates = {
+                x
+                for bucket, band in zip(self._buckets, self._band_keys(signature))
+                for x in bucket.get(band, ())
+            }
+            for key in candidates:
+                similarity = float(np.mean(self._signatures[key] == signature))
+                if similarity >= self._threshold and (best is None or similarity > best[1]):
+                    best = (key, similarity)
+        return best
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the text's shingles."""
+        normalized = " ".join(re.sub(r"[^\w\s]", "", text.lower()).split())
+        size = min(self._shingle_size, max(len(normalized), 1))
+        shingles = {
+            zlib.crc32(normalized[i : i + size].encode()) % self._PRIME
+            for i in range(max(len(normalized) - size + 1, 1))
+        }
+        hashes = (self._a * np.fromiter(shingles, np.int64) + self._b) % self._PRIME
+        return hashes.min(axis=1).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[i * self._rows : (i + 1) * self._rows].tobytes()
+            for i in range(self._bands)
+        ]
+
+    @staticmethod
+    def _lsh_params(cutoff: float, num_perm: int) -> Tuple[int, int]:
+        """Bands and rows per band whose LSH cut-off, (1 / bands) ** (1 / rows), is closest to `cutoff`."""
+        options = [(x, num_perm // x) for x in range(1, num_perm + 1) if num_perm % x == 0]
+        return min(options, key=lambda x: abs((1 / x[0]) ** (1 / x[1]) - cutoff))
+
+    def unload(self) -> None:
+        with self._lock:
+            self._signatures.clear()
+            self._buckets = [defaultdict(list) for _ in range(self._bands)]
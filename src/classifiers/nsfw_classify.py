@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
 from PIL import Image
+from typing import List, Optional
+import torch
+import gc
 
 
 class NSFWClassify(ABC):
@@ -16,11 +19,36 @@ class NSFWClassify(ABC):
         """
         pass
 
-    @staticmethod
     @abstractmethod
-    def kill() -> None:
+    def classify_many(self, images: List[Image]) -> List[float]:
         """
-        Kills all processes that are using VRAM.
+        Scores several images in one batched forward pass.
+
+        Args:
+            images (List[Image]): Images to score.
+
+        Returns:
+            List[float]: NSFW probability for each image.
+        """
+        pass
+
+    @abstractmethod
+    def select_safe(self, candidates: List[List[Image]]) -> List[Optional[int]]:
+        """
+        Picks the first image that is not NSFW from each group of candidates.
+
+        Args:
+            candidates (List[List[Image]]): Groups of candidate images in order of preference.
+
+        Returns:
+            List[Optional[int]]: Index of the first safe image per group, None if all are NSFW.
+        """
+        pass
+
+    @abstractmethod
+    def unload(self) -> None:
+        """
+        Releases the VRAM / RAM held by the model.
         """
         pass
 
@@ -29,24 +57,61 @@ class HuggingfaceNSFWClassify(NSFWClassify):
     def __init__(
         self,
         pretrained_model_name_or_path: str,
+        nsfw_threshold: float = 0.5,
+        batch_size: int = 8,
     ) -> None:
         """
         Huggingface NSFW classifier.
 
         Args:
             pretrained_model_name_or_path (str): Pretrained model name or path.
+            nsfw_threshold (float, optional): Images scoring above this are NSFW.
+            batch_size (int, optional): Max images per forward pass.
         """
         from transformers import pipeline
 
         self._pretrained_model_name_or_path = pretrained_model_name_or_path
+        self._nsfw_threshold = nsfw_threshold
+        self._batch_size = batch_size
         self._classifier = pipeline(
             "image-classification", model=self._pretrained_model_name_or_path
         )
 
     def check_is_nsfw(self, image: Image) -> bool:
-        result = self._classifier(image)
-        return result[0]["label"] == "nsfw"
+        return self.classify_many([image])[0] > self._nsfw_threshold
+
+    def classify_many(self, images: List[Image]) -> List[float]:
+        if len(images) == 0:
+            return []
+        results = self._classifier(
+            images,
+            batch_size=min(self._batch_size, len(images)),
+            top_k=self._classifier.model.config.num_labels,
+        )
+        return [
+            next((x["score"] for x in result if x["label"] == "nsfw"), 0.0)
+            for result in results
+        ]
+
+    def select_safe(self, candidates: List[List[Image]]) -> List[Optional[int]]:
+        scores = self.classify_many([y for x in candidates for y in x])
+        selected = []
+        for group in candidates:
+            group_scores, scores = scores[: len(group)], scores[len(group) :]
+            selected.append(
+                next(
+                    (
+                        index
+                        for index, score in enumerate(group_scores)
+                        if score <= self._nsfw_threshold
+                    ),
+                    None,
+                )
+            )
+        return selected
 
-    @staticmethod
-    def kill() -> None:
-        pass  # No VRAM processes to kill (auto-cleaned)
+    def unload(self) -> None:
+        self._classifier = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
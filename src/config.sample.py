@@ -2,17 +2,62 @@
 CONTENTFUL_MANAGEMENT_API_TOKEN = ""
 CONTENTFUL_SPACE_ID = ""
 CONTENTFUL_ENVIRONMENT_ID = ""
+CONTENTFUL_POOL_MAXSIZE = 10  # keep-alive connections shared by fetch and upload
+CONTENTFUL_PAGE_SIZE = 100  # items per page when listing (max 1000)
+CONTENTFUL_ASSET_PROCESSING_TIMEOUT_SECONDS = 300
+CONTENTFUL_RATE_LIMIT_PER_SECOND = 7  # until Contentful's rate limit headers report the actual limit
+CONTENTFUL_API_URL = "api.contentful.com"  # e.g. "127.0.0.1:8000" for a local fake server
+CONTENTFUL_UPLOADS_API_URL = "upload.contentful.com"
+CONTENTFUL_HTTPS = True
+BULK_PUBLISH_WORKERS = 8  # requests in flight when publishing a generated batch
+BULK_PUBLISH_CHUNK_SIZE = 50  # articles (and their images) held in memory at once
+UPLOAD_IMAGE_FORMAT = "WEBP"  # PNG, JPEG or WEBP
+UPLOAD_IMAGE_QUALITY = 90  # JPEG / WEBP only
+UPLOAD_IMAGE_OPTIMIZE = True  # slower encode, smaller upload
+UPLOAD_IMAGE_ENCODE_WORKERS = 2  # encoding processes
+CONTENTFUL_DELIVERY_API_TOKEN = ""  # if set, reads are served from a local synced mirror
+CONTENTFUL_MIRROR_PATH = "data/contentful_mirror.sqlite"
+CONTENTFUL_MIRROR_MAX_STALENESS_SECONDS = 3600
 
 # === Classifiers ===
 HUGGINGFACE_NSFW_CLASSIFIER_PRETRAINED_MODEL_NAME_OR_PATH = (
     "Falconsai/nsfw_image_detection"
 )
+NSFW_THRESHOLD = 0.5  # images with a higher NSFW score are rejected
 
 # === Image Diffusion ===
 HUGGINGFACE_DIFFUSERS_PRETRAINED_MODEL_NAME_OR_PATH = (
     "stablediffusionapi/juggernaut-xl-v7"
 )
 NEGATIVE_PROMPT_FILTER = ""  # global content filter
+DIFFUSION_MAX_BATCH_SIZE = 2  # halved automatically when a batch runs out of memory
+DIFFUSION_CANDIDATES_PER_ARTICLE = 1  # header image candidates, first safe one is used (each extra costs a full render)
+DIFFUSION_PROFILES = {  # inference profiles (scheduler: ddim, dpm++, euler, euler_a, lcm)
+    "quality": {"num_inference_steps": 50},  # the checkpoint's own scheduler
+    "balanced": {"scheduler": "dpm++", "num_inference_steps": 25},
+    "fast": {"scheduler": "dpm++", "num_inference_steps": 15, "width": 768, "height": 768},
+    # "lcm": {"scheduler": "lcm", "num_inference_steps": 4, "guidance_scale": 1.0},  # LCM weights only
+}
+DIFFUSION_PROFILE = "quality"  # profile name, or "adaptive" to pick one per call
+DIFFUSION_ARTICLE_SECONDS_TARGET = 120  # adaptive: render time allowed per article's candidates
+DIFFUSION_DEVICE = "cuda"  # "cuda" or "cpu" (CPU-only nodes)
+DIFFUSION_CPU_DTYPE = "bfloat16"  # "bfloat16" (CPUs with AVX512-BF16 / AMX) or "float32"
+DIFFUSION_CPU_THREADS = 0  # 0 = one per core
+DIFFUSION_CPU_CHANNELS_LAST = True
+DIFFUSION_CPU_ATTENTION_SLICING = False  # less memory, slower
+DIFFUSION_CPU_VAE_TILING = False  # less memory when decoding
+DIFFUSION_CPU_COMPILE = False  # torch.compile the UNet (faster after a slow first image)
+IMAGE_CACHE_DIR = ""  # reuse header images of equivalent prompts, e.g. "data/image_cache" ("" = off)
+IMAGE_CACHE_MAX_SIZE_MB = 2048  # least recently used images are evicted beyond this
+IMAGE_CACHE_MAX_USES = 3  # articles one header image may be linked to
+IMAGE_CACHE_SAME_CATEGORY_ONLY = True
+
+# === Duplicate Detection ===
+DUPLICATE_THRESHOLD = 0.6  # skip ideas / titles this similar to a published title (0 = off)
+
+# === Category Selection ===
+CATEGORY_INDEX_PATH = "data/category_index.json"  # TF-IDF index of categories ("" = off)
+WRITER_MAX_CATEGORIES = 8  # most relevant categories offered to the writer
 
 # === LLM Text Generation ===
 OLLAMA_MODEL = "mistral-openorca"
@@ -20,3 +65,45 @@ OPENAI_MODEL = "gpt-3.5-turbo-1106"
 OPENAI_API_KEY = ""
 TEMPERATURE_IDEA_GENERATOR = 1
 TEMPERATURE_WRITER = 0.8
+STREAM_WRITER = True  # validate fields while streaming, cancel on the first bad one
+# Start diffusion once the header description is streamed: lower latency per article, but each
+# early render is a single-prompt call that bypasses PIPELINE_IMAGE_BATCH_SIZE batching
+EARLY_HEADER_RENDER = False
+STRUCTURED_OUTPUT_WRITER = True  # JSON mode plus a JSON schema of the article
+LLM_MAX_ATTEMPTS = 5  # per idea / article, then the article is skipped
+LLM_TIMEOUT_SECONDS = 900  # per idea / article, across all attempts
+IDEA_POOL_PATH = "data/idea_pool.json"  # pre-generated ideas ("" = one LLM call per idea)
+IDEA_POOL_IDEAS_PER_CALL = 10
+IDEA_POOL_LOW_WATER_MARK = 3  # refill a category in the background below this many ideas
+OLLAMA_MAX_CONCURRENCY = 2  # async requests in flight (match the server's OLLAMA_NUM_PARALLEL)
+OPENAI_MAX_CONCURRENCY = 8  # async requests in flight
+
+# === Runtime ===
+MODEL_MEMORY_BUDGET_GB = 24  # total memory resident models may hold
+LLM_MEMORY_GB = 6
+DIFFUSION_MEMORY_GB = 10
+NSFW_CLASSIFIER_MEMORY_GB = 1
+
+# === Pipeline ===
+PIPELINE_QUEUE_SIZE = 2  # max items waiting between two stages
+PIPELINE_STAGE_WORKERS = {  # workers per stage (default 1)
+    "encoded": UPLOAD_IMAGE_ENCODE_WORKERS,  # one per encoding process
+    "published": 2,
+}
+PIPELINE_REPORT_INTERVAL_SECONDS = 300
+PIPELINE_IMAGE_BATCH_SIZE = 2  # header images rendered together
+PIPELINE_IMAGE_BATCH_TIMEOUT_SECONDS = 0  # wait for a fuller batch (0 = take what is queued)
+JOB_JOURNAL_DIR = "data/jobs"  # checkpoints of unfinished articles, resumed on restart ("" to disable)
+JOB_MAX_ATTEMPTS = 3  # failures after which an article is abandoned
+JOB_RETRY_DELAY_SECONDS = 60  # wait before retrying a failed article
+
+# === Workers ===
+JOB_QUEUE_PATH = "data/job_queue.sqlite"  # shared by all workers (with JOB_JOURNAL_DIR, on a filesystem with working locks)
+JOB_LEASE_SECONDS = 300  # a job whose worker stopped heartbeating goes to another worker after this long
+WORKER_ROLES = {  # stages each role runs (python worker.py --roles llm,publish)
+    "llm": ["ideas", "drafts"],
+    "diffusion": ["images", "moderated"],
+    "publish": ["encoded", "published"],
+}
+WORKER_MAX_UNFINISHED_JOBS = 8  # new jobs are only started while fewer are in the queue
+WORKER_POLL_SECONDS = 5  # wait when no job is ready for the worker's stages
@@ -0,0 +1,185 @@
+from dataclasses import dataclass
+from typing import Optional
+from api_integration.data_models import PersistedAsset
+from api_integration.image_encoding import EncodedImage
+import threading
+import hashlib
+import sqlite3
+import time
+import re
+import os
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    key TEXT PRIMARY KEY,
+    prompt TEXT NOT NULL,
+    category TEXT,
+    asset_id TEXT NOT NULL,
+    asset_url TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    uses INTEGER NOT NULL,
+    last_used_at REAL NOT NULL
+);
+"""
+_FILLER_WORDS = {"a", "an", "the", "of", "with", "and", "in", "on"}
+
+
+@dataclass(frozen=True)
+class ReuseRule:
+    """Decides when a cached header image may be linked to another article."""
+
+    max_uses: int = 3  # articles one image may head, including the first
+    same_category_only: bool = True
+
+    def allows(self, uses: int, cached_category: Optional[str], category: Optional[str]) -> bool:
+        return uses < self.max_uses and (
+            not self.same_category_only or cached_category == category
+        )
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    """Header image already rendered and uploaded for an equivalent prompt."""
+
+    asset: PersistedAsset
+    path: str
+
+
+class PromptImageCache:
+    """
+    Content-addressed cache of uploaded header images by normalized prompt.
+
+    Prompts are normalized (case, punctuation, whitespace and filler words) and
+    hashed, so near-identical descriptions share an entry. Each entry links the
+    published asset and keeps the encoded image on disk; the least recently
+    used entries are evicted once the files exceed `max_size_bytes`.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_size_bytes: int = 2 * 1024**3,
+        reuse_rule: Optional[ReuseRule] = None,
+    ) -> None:
+        """
+        Opens (or creates) the cache.
+
+        Args:
+            directory (str): Directory of the image files and the SQLite index.
+            max_size_bytes (int, optional): Max total size of the cached image files.
+            reuse_rule (ReuseRule, optional): When a cached image may be reused.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_size_bytes = max_size_bytes
+        self._reuse_rule = reuse_rule or ReuseRule()
+        self._db = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def find(self, prompt: str, category: Optional[str] = None) -> Optional[CachedImage]:
+        """
+        Looks up an image the reuse rule allows for the prompt, without using it.
+
+        Args:
+            prompt (str): Header image description.
+            category (str, optional): Category of the article.
+
+        Returns:
+            Optional[CachedImage]: The cached image, None on a miss.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT category, asset_id, asset_url, file_name, uses FROM images WHERE key = ?",
+                (self._key(prompt),),
+            ).fetchone()
+        if row is None or not self._reuse_rule.allows(row[4], row[0], category):
+            return None
+        return CachedImage(
+            asset=PersistedAsset(id=row[1], url=row[2]),
+            path=os.path.join(self._directory, row[3]),
+        )
+
+    def reuse(self, prompt: str, category: Optional[str] = None) -> Optional[CachedImage]:
+        """
+        Looks up an image for the prompt and records that it is used again.
+
+        Args:
+            prompt (str): Header image description.
+            category (str, optional): Category of the article.
+
+        Returns:
+            Optional[CachedImage]: The cached image, None on a miss.
+        """
+        cached = self.find(prompt, category)
+        if cached is not None:
+            with self._lock, self._db:
+                self._db.execute(
+                    "UPDATE images SET uses = uses + 1, last_used_at = ? WHERE key = ?",
+                    (time.time(), self._key(prompt)),
+                )
+        return cached
+
+    def store(
+        self,
+        prompt: str,
+        image: EncodedImage,
+        asset: PersistedAsset,
+        category: Optional[str] = None,
+    ) -> None:
+        """
+        Caches a newly uploaded header image.
+
+        Args:
+            prompt (str): Header image description it was rendered from.
+            image (EncodedImage): The uploaded image.
+            asset (PersistedAsset): The published asset.
+            category (str, optional): Category of the article.
+        """
+        key = self._key(prompt)
+        file_name = f"{key}.{image.extension}"
+        with open(os.path.join(self._directory, file_name), "wb") as f:
+            f.write(image.data)
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)",
+                (
+                    key,
+                    prompt,
+                    category,
+                    asset.id,
+                    asset.url,
+                    file_name,
+                    image.size_bytes,
+                    time.time(),
+                ),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        """Deletes least recently used entries until the files fit the size bound."""
+        (total,) = self._db.execute(
+            "SELECT COALESCE(SUM(size_bytes), 0) FROM images"
+        ).fetchone()
+        for key, file_name, size_bytes in self._db.execute(
+            "SELECT key, file_name, size_bytes FROM images ORDER BY last_used_at"
+        ).fetchall():
+            if total <= self._max_size_bytes:
+                break
+            self._db.execute("DELETE FROM images WHERE key = ?", (key,))
+            path = os.path.join(self._directory, file_name)
+            if os.path.exists(path):
+                os.remove(path)
+            total -= size_bytes
+
+    @staticmethod
+    def _key(prompt: str) -> str:
+        words = re.sub(r"[^\w\s]", " ", prompt.lower()).split()
+        normalized = " ".join(x for x in words if x not in _FILLER_WORDS)
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def unload(self) -> None:
+        self._db.close()
@@ -1,7 +1,92 @@
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from PIL import Image
+import threading
 import torch
-from typing import Optional
+import time
+import gc
+from typing import Any, Callable, Dict, List, Optional
+
+# Scheduler names usable in an `InferenceProfile` -> diffusers class
+SCHEDULERS = {
+    "ddim": "DDIMScheduler",
+    "dpm++": "DPMSolverMultistepScheduler",
+    "euler": "EulerDiscreteScheduler",
+    "euler_a": "EulerAncestralDiscreteScheduler",
+    "lcm": "LCMScheduler",  # only for LCM-distilled weights (or an LCM LoRA)
+}
+
+# Full batches in a row after which a batch size lowered on out of memory is doubled again
+BATCH_SIZE_RECOVERY_BATCHES = 8
+
+
+class GenerationCancelled(Exception):
+    """Raised when a generation is stopped by its `should_stop` callback."""
+
+
+@dataclass(frozen=True)
+class InferenceProfile:
+    """Sampling settings trading image quality for generation time."""
+
+    num_inference_steps: int = 50
+    scheduler: Optional[str] = None  # key of SCHEDULERS (None: the checkpoint's own)
+    width: Optional[int] = None  # None: the model's default resolution
+    height: Optional[int] = None
+    guidance_scale: Optional[float] = None  # None: pipeline default, <= 1 disables CFG
+
+    def __post_init__(self) -> None:
+        assert (
+            self.scheduler is None or self.scheduler in SCHEDULERS
+        ), f"Unknown scheduler '{self.scheduler}' (use one of {', '.join(SCHEDULERS)})."
+
+    def step_cost(self, default_pixels: int) -> float:
+        """Relative UNet work of one step for one image (pixels, doubled by CFG)."""
+        pixels = (self.width or 0) * (self.height or 0) or default_pixels
+        guided = self.guidance_scale is None or self.guidance_scale > 1
+        return pixels * (2 if guided else 1)
+
+
+@dataclass(frozen=True)
+class CPUBackend:
+    """
+    Runs the pipeline on the CPU.
+
+    fp16 is not supported: most CPU kernels lack it. bf16 halves memory and
+    is fast on CPUs with AVX512-BF16 / AMX, fp32 is the safe default
+    elsewhere.
+    """
+
+    dtype: str = "bfloat16"  # "bfloat16" or "float32"
+    num_threads: Optional[int] = None  # intra-op threads (None: PyTorch default, one per core)
+    channels_last: bool = True  # NHWC convolutions, usually faster on CPU
+    attention_slicing: bool = False  # less memory, somewhat slower
+    vae_tiling: bool = False  # decode in tiles, bounds memory at large resolutions
+    compile: bool = False  # torch.compile the UNet (slow first image)
+
+    def __post_init__(self) -> None:
+        assert self.dtype in (
+            "bfloat16",
+            "float32",
+        ), f"Unsupported CPU dtype '{self.dtype}' (use bfloat16 or float32)."
+
+    @property
+    def torch_dtype(self) -> torch.dtype:
+        return getattr(torch, self.dtype)
+
+    def apply(self, pipe: Any) -> None:
+        """Moves a loaded pipeline to the CPU and applies the options."""
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        pipe.to("cpu")
+        if self.channels_last:
+            pipe.unet.to(memory_format=torch.channels_last)
+            pipe.vae.to(memory_format=torch.channels_last)
+        if self.attention_slicing:
+            pipe.enable_attention_slicing()
+        if self.vae_tiling:
+            pipe.vae.enable_tiling()
+        if self.compile:
+            pipe.unet = torch.compile(pipe.unet)
 
 
 class TextToImage(ABC):
@@ -19,21 +104,63 @@ class TextToImage(ABC):
         """
         pass
 
-    @staticmethod
     @abstractmethod
-    def kill() -> None:
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompts: Optional[List[str]] = None,
+        num_images_per_prompt: int = 1,
+        should_stop: Optional[Callable[[], bool]] = None,
+        profile: Optional[str] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> List[List[Image]]:
+        """
+        Generates images for several prompts in as few model calls as possible.
+
+        Args:
+            prompts (List[str]): Prompts to generate images from.
+            negative_prompts (List[str], optional): Negative prompt for each prompt.
+            num_images_per_prompt (int, optional): Number of candidate images per prompt.
+            should_stop (Callable[[], bool], optional): Checked every step, cancels the generation when True.
+            profile (str, optional): Name of the inference profile to use (default: the default profile).
+            deadline_seconds (float, optional): Instead of `profile`, use the best profile expected to render each prompt's images within this time.
+
+        Returns:
+            List[List[Image]]: Generated images, one list of candidates per prompt.
+
+        Raises:
+            GenerationCancelled: If `should_stop` returned True.
+        """
+        pass
+
+    @abstractmethod
+    def unload(self) -> None:
         """
-        Kills all processes that are using VRAM.
+        Releases the VRAM / RAM held by the model.
         """
         pass
 
 
 class DiffusersTextToImage(TextToImage):
+    """
+    Diffusers pipeline with named inference profiles.
+
+    Step times are measured on every call. With a deadline, the profile
+    expected to take the most work (assumed to give the best images) that
+    still fits is used, or the cheapest one if none fits, so generation
+    speeds up when the pipeline falls behind and recovers when it catches up.
+    """
+
     def __init__(
         self,
         pretrained_model_name_or_path: str,
         num_inference_steps: Optional[int] = 50,
         enable_cpu_offload: Optional[bool] = True,
+        max_batch_size: int = 1,
+        memory_aware: bool = True,
+        cpu_backend: Optional[CPUBackend] = None,
+        profiles: Optional[Dict[str, InferenceProfile]] = None,
+        default_profile: Optional[str] = None,
     ) -> None:
         """
         Loads local SDXL model.
@@ -42,28 +169,222 @@ class DiffusersTextToImage(TextToImage):
             pretrained_model_name_or_path (str): Huggingface Diffusers Download Path.
             num_inference_steps (int, optional): Number of inference steps.
             enable_cpu_optim (bool, optional): Enables CPU optimization. (use when not enough VRAM or no GPU)
+            max_batch_size (int, optional): Max images rendered per pipeline call.
+            memory_aware (bool, optional): Halve the batch size and retry when a batch runs out of memory (it grows back once batches fit again).
+            cpu_backend (CPUBackend, optional): Run on the CPU with these options (no GPU needed).
+            profiles (Dict[str, InferenceProfile], optional): Inference profiles by name (default: one using `num_inference_steps`).
+            default_profile (str, optional): Profile used when a call names none (default: the first).
         """
         from diffusers import DiffusionPipeline
 
         self._pretrained_model_name_or_path = pretrained_model_name_or_path
-        self._num_inference_steps = num_inference_steps
+        self._max_batch_size = max_batch_size
+        self._batch_size = max_batch_size  # lowered on out of memory, guarded by the lock
+        self._batches_since_out_of_memory = 0
+        self._memory_aware = memory_aware
+        self._lock = threading.Lock()  # pipeline calls are not thread-safe
+        self._profiles = profiles or {
+            "default": InferenceProfile(num_inference_steps=num_inference_steps)
+        }
+        self._default_profile = default_profile or next(iter(self._profiles))
+        assert (
+            self._default_profile in self._profiles
+        ), f"Unknown inference profile '{self._default_profile}'."
+        self._seconds_per_cost: Optional[float] = None  # moving average of step time / step cost
         self._pipe = DiffusionPipeline.from_pretrained(
             self._pretrained_model_name_or_path,
-            torch_dtype=torch.float16,
+            torch_dtype=cpu_backend.torch_dtype if cpu_backend else torch.float16,
         )
-        if enable_cpu_offload:
+        if cpu_backend is not None:
+            cpu_backend.apply(self._pipe)
+        elif enable_cpu_offload:
             self._pipe.enable_sequential_cpu_offload()
         else:
             self._pipe.to("cuda")
+        self._schedulers: Dict[Optional[str], Any] = {None: self._pipe.scheduler}
+        self._default_pixels = (
+            self._pipe.unet.config.sample_size
+            * getattr(self._pipe, "vae_scale_factor", 8)
+        ) ** 2
 
     def generate_image(self, prompt: str, negative_prompt: str) -> Image:
-        image = self._pipe(
-            prompt=prompt,
-            negative_prompt=negative_prompt,
-            num_inference_steps=self._num_inference_steps,
-        ).images[0]
-        return image
+        return self.generate_images([prompt], [negative_prompt])[0][0]
+
+    def generate_images(
+        self,
+        prompts: List[str],
+        negative_prompts: Optional[List[str]] = None,
+        num_images_per_prompt: int = 1,
+        should_stop: Optional[Callable[[], bool]] = None,
+        profile: Optional[str] = None,
+        deadline_seconds: Optional[float] = None,
+    ) -> List[List[Image]]:
+        negative_prompts = negative_prompts or [""] * len(prompts)
+        assert len(negative_prompts) == len(
+            prompts
+        ), "Need exactly one negative prompt per prompt."
+        if profile is None and deadline_seconds is not None:
+            profile = self.pick_profile(deadline_seconds, num_images_per_prompt)
+        profile = profile or self._default_profile
+        assert profile in self._profiles, f"Unknown inference profile '{profile}'."
+        settings = self._profiles[profile]
+        # One entry per image so batches can split a prompt's candidates
+        pending = [
+            (index, prompt, negative_prompt)
+            for index, (prompt, negative_prompt) in enumerate(
+                zip(prompts, negative_prompts)
+            )
+            for _ in range(num_images_per_prompt)
+        ]
+        images: List[List[Image]] = [[] for _ in prompts]
+        while pending:
+            step_times: List[float] = []
+            try:
+                with self._lock:
+                    batch = pending[: self._batch_size]
+                    self._pipe.scheduler = self._scheduler(settings.scheduler)
+                    batch_images = self._pipe(
+                        prompt=[x[1] for x in batch],
+                        negative_prompt=[x[2] for x in batch],
+                        **self._call_kwargs(settings),
+                        callback_on_step_end=self._step_callback(should_stop, step_times),
+                    ).images
+                    self._batch_succeeded(len(batch))
+            except Exception as e:
+                if not (self._memory_aware and len(batch) > 1 and self._is_out_of_memory(e)):
+                    raise
+                with self._lock:
+                    # Another caller may have lowered it already
+                    self._batch_size = min(self._batch_size, len(batch) // 2)
+                    self._batches_since_out_of_memory = 0
+                    print(f"Out of memory, retrying with batch size {self._batch_size}")
+                gc.collect()
+                if torch.cuda.is_available():
+                    torch.cuda.empty_cache()
+                continue
+            self._record_step_times(step_times, settings, len(batch))
+            for (index, _, _), image in zip(batch, batch_images):
+                images[index].append(image)
+            pending = pending[len(batch) :]
+        return images
+
+    def _batch_succeeded(self, batch_size: int) -> None:
+        """Doubles a lowered batch size (up to the max) after enough full batches fit (call with the lock)."""
+        if batch_size < self._batch_size or self._batch_size >= self._max_batch_size:
+            return
+        self._batches_since_out_of_memory += 1
+        if self._batches_since_out_of_memory >= BATCH_SIZE_RECOVERY_BATCHES:
+            self._batch_size = min(self._batch_size * 2, self._max_batch_size)
+            self._batches_since_out_of_memory = 0
+            print(f"Raising batch size to {self._batch_size}")
+
+    def pick_profile(self, deadline_seconds: float, num_images: int = 1) -> str:
+        """
+        Picks the profile to render images within a deadline, from measured step times.
+
+        Args:
+            deadline_seconds (float): Time allowed for the images.
+            num_images (int, optional): Number of images to render.
+
+        Returns:
+            str: The most expensive profile expected to fit, else the cheapest
+                (the default profile until a step time was measured).
+        """
+        if self._seconds_per_cost is None:
+            return self._default_profile
+        by_cost = sorted(
+            self._profiles,
+            key=lambda x: self.estimate_seconds(x, num_images),
+            reverse=True,
+        )
+        for name in by_cost:
+            if self.estimate_seconds(name, num_images) <= deadline_seconds:
+                return name
+        return by_cost[-1]
+
+    def estimate_seconds(self, profile: str, num_images: int = 1) -> Optional[float]:
+        """
+        Estimates the time a profile takes to render images.
+
+        Args:
+            profile (str): Name of the profile.
+            num_images (int, optional): Number of images to render.
+
+        Returns:
+            Optional[float]: Seconds of denoising, None until a step time was measured.
+        """
+        if self._seconds_per_cost is None:
+            return None
+        settings = self._profiles[profile]
+        return (
+            self._seconds_per_cost
+            * settings.step_cost(self._default_pixels)
+            * settings.num_inference_steps
+            * num_images
+        )
+
+    def _scheduler(self, name: Optional[str]) -> Any:
+        """The pipeline's scheduler swapped for the named one (built on first use)."""
+        if name not in self._schedulers:
+            import diffusers
+
+            scheduler_class = getattr(diffusers, SCHEDULERS[name])
+            self._schedulers[name] = scheduler_class.from_config(
+                self._schedulers[None].config
+            )
+        return self._schedulers[name]
 
     @staticmethod
-    def kill() -> None:
-        pass  # Diffusers automatically implements this
+    def _call_kwargs(settings: InferenceProfile) -> Dict[str, Any]:
+        """Pipeline arguments of a profile (unset ones keep the pipeline's defaults)."""
+        kwargs: Dict[str, Any] = {"num_inference_steps": settings.num_inference_steps}
+        if settings.width and settings.height:
+            kwargs["width"], kwargs["height"] = settings.width, settings.height
+        if settings.guidance_scale is not None:
+            kwargs["guidance_scale"] = settings.guidance_scale
+        return kwargs
+
+    def _record_step_times(
+        self, step_times: List[float], settings: InferenceProfile, batch_size: int
+    ) -> None:
+        """Updates the moving average of step time per unit of step cost."""
+        if len(step_times) < 2:
+            return
+        # From the end of the first step: skips text encoding and warmup
+        step_seconds = (step_times[-1] - step_times[0]) / (len(step_times) - 1)
+        seconds_per_cost = step_seconds / (
+            settings.step_cost(self._default_pixels) * batch_size
+        )
+        if self._seconds_per_cost is None:
+            self._seconds_per_cost = seconds_per_cost
+        else:
+            self._seconds_per_cost += 0.3 * (seconds_per_cost - self._seconds_per_cost)
+
+    @staticmethod
+    def _step_callback(
+        should_stop: Optional[Callable[[], bool]], step_times: List[float]
+    ) -> Callable[..., Dict]:
+        """Builds a step-end callback recording step times that cancels the run once `should_stop` is True."""
+
+        def callback(pipe: Any, step: int, timestep: Any, callback_kwargs: Dict) -> Dict:
+            step_times.append(time.perf_counter())
+            if should_stop is not None and should_stop():
+                raise GenerationCancelled(f"Generation cancelled at step {step}.")
+            return callback_kwargs
+
+        return callback
+
+    @staticmethod
+    def _is_out_of_memory(e: Exception) -> bool:
+        """Checks if an exception was raised by a failed (V)RAM allocation."""
+        message = str(e).lower()
+        return isinstance(e, torch.cuda.OutOfMemoryError) or (
+            isinstance(e, RuntimeError)
+            and ("out of memory" in message or "can't allocate memory" in message)
+        )
+
+    def unload(self) -> None:
+        self._pipe = None
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
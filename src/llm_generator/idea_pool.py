@@ -0,0 +1,134 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List
+import threading
+import json
+import os
+
+
+class IdeaPool:
+    """
+    Pre-generated article ideas per category, persisted to disk.
+
+    Ideas are generated many per call and handed out one at a time. When a
+    category runs below `low_water_mark` ideas, it is refilled in the
+    background; only an empty category makes the caller wait. Ideas are
+    deduped against the pool and against recently issued ideas.
+    """
+
+    MAX_ISSUED = 10_000  # issued ideas remembered for deduping
+
+    def __init__(
+        self,
+        generate_ideas: Callable[[str, int], List[str]],
+        path: str,
+        ideas_per_call: int = 10,
+        low_water_mark: int = 3,
+    ) -> None:
+        """
+        Loads (or creates) the pool.
+
+        Args:
+            generate_ideas (Callable[[str, int], List[str]]): Generates up to N ideas for a category.
+            path (str): Path of the JSON file the pool is persisted to.
+            ideas_per_call (int, optional): Ideas asked for per refill.
+            low_water_mark (int, optional): Refill a category once it has fewer ideas left.
+        """
+        self._generate_ideas = generate_ideas
+        self._path = path
+        self._ideas_per_call = ideas_per_call
+        self._low_water_mark = low_water_mark
+        self._ideas: Dict[str, List[str]] = {}
+        self._issued: List[str] = []  # normalized, oldest first
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                state = json.load(f)
+            self._ideas, self._issued = state["ideas"], state["issued"]
+        self._lock = threading.RLock()
+        self._refills: Dict[str, "Future[int]"] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1)  # refills share one LLM
+
+    def take(self, category: str) -> str:
+        """
+        Hands out an idea for a category.
+
+        Args:
+            category (str): The category.
+
+        Returns:
+            str: An idea that has not been handed out before.
+
+        Raises:
+            RuntimeError: If refills keep producing no new ideas.
+        """
+        for _ in range(3):
+            with self._lock:
+                ideas = self._ideas.get(category, [])
+                if ideas:
+                    idea = ideas.pop(0)
+                    self._issued.append(self._normalize(idea))
+                    del self._issued[: -self.MAX_ISSUED]
+                    self._save()
+                    if len(ideas) < self._low_water_mark:
+                        self._schedule_refill(category)
+                    return idea
+                refill = self._schedule_refill(category)
+            refill.result()  # empty, wait for ideas
+        raise RuntimeError(f"No new ideas could be generated for '{category}'.")
+
+    def sizes(self) -> Dict[str, int]:
+        """
+        Returns the number of ideas left per category.
+
+        Returns:
+            Dict[str, int]: Ideas left keyed by category.
+        """
+        with self._lock:
+            return {x: len(y) for x, y in self._ideas.items()}
+
+    def _schedule_refill(self, category: str) -> "Future[int]":
+        """Starts a refill of the category unless one is already running."""
+        with self._lock:
+            refill = self._refills.get(category)
+            if refill is None or refill.done():
+                refill = self._executor.submit(self._refill, category)
+                self._refills[category] = refill
+                refill.add_done_callback(lambda x: self._refill_done(category, x))
+            return refill
+
+    def _refill(self, category: str) -> int:
+        """Generates ideas for a category and adds the new ones, returning how many."""
+        ideas = self._generate_ideas(category, self._ideas_per_call)
+        with self._lock:
+            pool = self._ideas.setdefault(category, [])
+            seen = set(self._issued) | {self._normalize(x) for x in pool}
+            added = 0
+            for idea in ideas:
+                if self._normalize(idea) not in seen:
+                    seen.add(self._normalize(idea))
+                    pool.append(idea)
+                    added += 1
+            self._save()
+        print(f"Idea pool: added {added} of {len(ideas)} ideas for '{category}'.")
+        return added
+
+    def _refill_done(self, category: str, refill: "Future[int]") -> None:
+        with self._lock:
+            if self._refills.get(category) is refill:
+                del self._refills[category]
+        if refill.exception() is not None:
+            print(f"Error refilling ideas for '{category}': {refill.exception()}")
+
+    def _save(self) -> None:
+        """Writes the pool to disk (atomically, so a crash never leaves a partial file)."""
+        if os.path.dirname(self._path):
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(f"{self._path}.tmp", "w") as f:
+            json.dump({"ideas": self._ideas, "issued": self._issued}, f)
+        os.replace(f"{self._path}.tmp", self._path)
+
+    @staticmethod
+    def _normalize(idea: str) -> str:
+        return " ".join(idea.lower().split())
+
+    def unload(self) -> None:
+        self._executor.shutdown(wait=True)
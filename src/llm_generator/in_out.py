@@ -4,21 +4,154 @@ from langchain.llms.base import BaseLLM
 from langchain.chat_models.base import BaseChatModel
 from langchain.llms.ollama import Ollama
 from langchain.chat_models.openai import ChatOpenAI
-from typing import Dict, List, Union, Any
+from llm_generator.streaming_json import IncrementalJSONObjectParser
+from llm_generator.json_repair import repair_json_object
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
 import subprocess
+import concurrent.futures
+import threading
+import asyncio
+import weakref
+import requests
 import json
+import math
+import time
 import re
 import os
 
+T = TypeVar("T")
+
+
+class GenerationFailed(RuntimeError):
+    """Raised when a generation did not succeed within its retry budget."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Bounds how long a generation is retried."""
+
+    max_attempts: int = 5
+    timeout_seconds: float = 600
+    initial_backoff_seconds: float = 1
+    max_backoff_seconds: float = 30
+
+    def backoff_seconds(self, attempt: int) -> float:
+        """Delay before the given retry (1 = first retry)."""
+        return min(
+            self.initial_backoff_seconds * 2 ** (attempt - 1), self.max_backoff_seconds
+        )
+
+
+async def fan_out(
+    calls: Iterable[Awaitable[T]],
+) -> AsyncIterator[Tuple[int, Union[T, Exception]]]:
+    """
+    Runs generations concurrently and yields them as they complete.
+
+    A failed call yields its exception instead of cancelling the others. The
+    concurrency limit of each `InOut` still applies, so requests beyond it
+    wait their turn.
+
+    Args:
+        calls (Iterable[Awaitable[T]]): E.g. `agenerate_random_article_idea(...)` coroutines.
+
+    Yields:
+        Tuple[int, Union[T, Exception]]: Index of the call and its result or error.
+    """
+
+    async def indexed(i: int, call: Awaitable[T]) -> Tuple[int, Union[T, Exception]]:
+        try:
+            return i, await call
+        except Exception as e:
+            return i, e
+
+    tasks = [asyncio.ensure_future(indexed(i, x)) for i, x in enumerate(calls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:  # the caller stopped early
+            task.cancel()
+
 
 class InOut(ABC):
     """InOut class for interacting with LLMs."""
 
     PROMPTS_DIR = os.path.join(os.path.dirname(__file__), "prompts")
+    NEWS_ARTICLE_KEYS_TO_TYPE = {
+        "title": str,
+        "category_list": list,
+        "header_img_description": str,
+        "body": str,
+    }
 
-    def __init__(self, llm: Union[BaseLLM, BaseChatModel]) -> None:
-        """Initializes InOut class."""
+    def __init__(
+        self,
+        llm: Union[BaseLLM, BaseChatModel],
+        stream: bool = False,
+        structured_output: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        model_name: str = "",
+        max_concurrency: int = 1,
+    ) -> None:
+        """
+        Initializes InOut class.
+
+        Args:
+            llm (Union[BaseLLM, BaseChatModel]): Model to generate with (already in JSON mode if structured_output).
+            stream (bool, optional): Stream articles and abort as soon as a field is invalid.
+            structured_output (bool, optional): Send a JSON schema of the expected article with the request.
+            retry_policy (RetryPolicy, optional): Bounds retries of failed generations.
+            model_name (str, optional): Model name reported in stats.
+            max_concurrency (int, optional): Max requests in flight through the async API.
+        """
         self._llm = llm
+        self._stream = stream
+        self._structured_output = structured_output
+        self._retry_policy = retry_policy or RetryPolicy()
+        self.model_name = model_name
+        self.stream_stats = {"completed": 0, "aborted": 0, "tokens_saved": 0}
+        self.retry_stats = {"calls": 0, "retries": 0, "failures": 0}
+        self.repair_stats = {"parsed": 0, "repaired": 0}
+        self._completed_tokens = 0
+        self._stats_lock = threading.Lock()  # stages call the model from several threads
+        # Runs sync attempts, so a hung one can be abandoned at the deadline
+        self._attempt_executor = ThreadPoolExecutor(thread_name_prefix="llm-attempt")
+        self._max_concurrency = max_concurrency
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Returns retry, failure, repair and streaming counters of this model.
+
+        Returns:
+            Dict[str, Any]: Counters keyed by name, plus the model name.
+        """
+        with self._stats_lock:
+            return {
+                "model": self.model_name,
+                **self.retry_stats,
+                **{f"json_{x}": y for x, y in self.repair_stats.items()},
+                **{f"stream_{x}": y for x, y in self.stream_stats.items()},
+            }
 
     def generate_random_article_idea(self, category_injection: str) -> str:
         """
@@ -30,27 +163,76 @@ class InOut(ABC):
 
         Returns:
             str: Random article idea.
+
+        Raises:
+            GenerationFailed: If no idea was generated within the retry budget.
+        """
+        messages = self._article_idea_messages(category_injection)
+
+        def attempt(deadline: float) -> str:
+            return self._parse_article_idea(self._invoke_model(input=messages, deadline=deadline))
+
+        return self._with_retries(attempt)
+
+    def generate_article_ideas(self, category_injection: str, count: int) -> List[str]:
+        """
+        Generates several distinct article ideas in one call.
+
+        Args:
+            category_injection (str): Category to inject into prompt for latent space activation.
+            count (int): Number of ideas to ask for (fewer may be returned after deduping).
+
+        Returns:
+            List[str]: Distinct article ideas.
+
+        Raises:
+            GenerationFailed: If no ideas were generated within the retry budget.
         """
         messages = [
-            SystemMessage(content=self._load_prompt("generate_random_article_idea")),
+            SystemMessage(content=self._load_prompt("generate_article_ideas")),
             HumanMessage(
-                content=f"Request: 'Please give me one idea exactly', Broad Category Idea: '{category_injection}'"
+                content=f"Request: 'Please give me {count} different ideas, one per line', Broad Category Idea: '{category_injection}'"
             ),
         ]
-        while True:
-            try:
-                generated_text = self._parse_single_line_output(
-                    self._invoke_model(input=messages)
+
+        def attempt(deadline: float) -> List[str]:
+            ideas: Dict[str, str] = {}  # normalized -> idea
+            for line in self._invoke_model(input=messages, deadline=deadline).splitlines():
+                idea = self._parse_single_line_output(
+                    re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line)  # list markers
                 )
-                assert (
-                    len(generated_text) > 0
-                ), "Output is empty. Please try again with a different category."
-                return generated_text
-            except Exception as e:
-                print(str(e))
+                if idea:
+                    ideas.setdefault(" ".join(idea.lower().split()), idea)
+            assert len(ideas) > 0, "Output has no ideas."
+            return list(ideas.values())[:count]
+
+        return self._with_retries(attempt)
+
+    async def agenerate_random_article_idea(self, category_injection: str) -> str:
+        """
+        Async version of `generate_random_article_idea`.
+
+        Args:
+            category_injection (str): Category to inject into prompt for latent space activation.
+
+        Returns:
+            str: Random article idea.
+
+        Raises:
+            GenerationFailed: If no idea was generated within the retry budget.
+        """
+        messages = self._article_idea_messages(category_injection)
+
+        async def attempt(deadline: float) -> str:
+            return self._parse_article_idea(await self._ainvoke_model(input=messages, deadline=deadline))
+
+        return await self._awith_retries(attempt)
 
     def write_news_article(
-        self, article_idea: str, category_constraint: List[str]
+        self,
+        article_idea: str,
+        category_constraint: List[str],
+        on_partial: Optional[Callable[[Dict], None]] = None,
     ) -> Dict:
         """
         Writes a news article.
@@ -58,10 +240,16 @@ class InOut(ABC):
         Args:
             article_idea (str): Idea for article.
             category_constraint (List[str]): List of categories to constrain output selection to.
+            on_partial (Callable[[Dict], None], optional): Called with the validated fields of the
+                current attempt each time one is added (as they stream in when streaming). An empty
+                dict marks the start of a new attempt, so earlier partial fields are void.
 
         Returns:
             Dict: News article.
 
+        Raises:
+            GenerationFailed: If no valid article was written within the retry budget.
+
         Return Format:
             {
                 "title": "<Long, Specific, and SEO Optimized Title>",
@@ -70,48 +258,492 @@ class InOut(ABC):
                 "body": "<## Body in Markdown\\n\\nShould use expressive markdown syntax with proper \\"escape\\" characters>"
             }
         """
-        messages = [
-            SystemMessage(content=self._load_prompt("write_news_article")),
+        messages = self._news_article_messages(article_idea, category_constraint)
+
+        def attempt(deadline: float) -> Dict:
+            validate_field = self._article_field_validator(category_constraint, on_partial)
+            if self._stream:
+                loaded_json = self._stream_json_output(
+                    input=messages, validate_field=validate_field, deadline=deadline
+                )
+            else:
+                loaded_json = self._parse_json_output(
+                    self._invoke_model(input=messages, deadline=deadline)
+                )
+                for key, value in loaded_json.items():
+                    validate_field(key, value)
+            self._raise_for_bad_json_output(
+                input_json=loaded_json,
+                expected_keys_to_type=self.NEWS_ARTICLE_KEYS_TO_TYPE,
+            )
+            return loaded_json
+
+        return self._with_retries(attempt)
+
+    async def awrite_news_article(
+        self,
+        article_idea: str,
+        category_constraint: List[str],
+        on_partial: Optional[Callable[[Dict], None]] = None,
+    ) -> Dict:
+        """
+        Async version of `write_news_article`.
+
+        Args:
+            article_idea (str): Idea for article.
+            category_constraint (List[str]): List of categories to constrain output selection to.
+            on_partial (Callable[[Dict], None], optional): See `write_news_article`.
+
+        Returns:
+            Dict: News article.
+
+        Raises:
+            GenerationFailed: If no valid article was written within the retry budget.
+        """
+        messages = self._news_article_messages(article_idea, category_constraint)
+
+        async def attempt(deadline: float) -> Dict:
+            validate_field = self._article_field_validator(category_constraint, on_partial)
+            if self._stream:
+                loaded_json = await self._astream_json_output(
+                    input=messages, validate_field=validate_field, deadline=deadline
+                )
+            else:
+                loaded_json = self._parse_json_output(
+                    await self._ainvoke_model(input=messages, deadline=deadline)
+                )
+                for key, value in loaded_json.items():
+                    validate_field(key, value)
+            self._raise_for_bad_json_output(
+                input_json=loaded_json,
+                expected_keys_to_type=self.NEWS_ARTICLE_KEYS_TO_TYPE,
+            )
+            return loaded_json
+
+        return await self._awith_retries(attempt)
+
+    def _article_idea_messages(self, category_injection: str) -> List[Any]:
+        """Builds the messages asking for one article idea."""
+        return [
+            SystemMessage(content=self._load_prompt("generate_random_article_idea")),
             HumanMessage(
-                content=f"Article Idea: '{article_idea}', Categories to Choose From: {category_constraint}"
+                content=f"Request: 'Please give me one idea exactly', Broad Category Idea: '{category_injection}'"
             ),
         ]
-        while True:
-            try:
-                generated_text = self._invoke_model(input=messages)
-                loaded_json = self._parse_json_output(generated_text)
-                self._raise_for_bad_json_output(
-                    input_json=loaded_json,
-                    expected_keys_to_type={
-                        "title": str,
-                        "category_list": list,
-                        "header_img_description": str,
-                        "body": str,
-                    },
+
+    def _parse_article_idea(self, output: str) -> str:
+        """Parses and checks a generated article idea."""
+        generated_text = self._parse_single_line_output(output)
+        assert (
+            len(generated_text) > 0
+        ), "Output is empty. Please try again with a different category."
+        return generated_text
+
+    def _news_article_messages(
+        self, article_idea: str, category_constraint: List[str]
+    ) -> List[Any]:
+        """Builds the messages asking for a news article (with its schema if structured)."""
+        request = f"Article Idea: '{article_idea}', Categories to Choose From: {category_constraint}"
+        if self._structured_output:
+            schema = self._build_json_schema(
+                self.NEWS_ARTICLE_KEYS_TO_TYPE,
+                enums={"category_list": category_constraint},
+            )
+            schema["properties"]["title"]["maxLength"] = 149
+            schema["properties"]["category_list"].update(minItems=1, maxItems=3)
+            request += f", Output JSON Schema: {json.dumps(schema)}"
+        return [
+            SystemMessage(content=self._load_prompt("write_news_article")),
+            HumanMessage(content=request),
+        ]
+
+    def _article_field_validator(
+        self,
+        category_constraint: List[str],
+        on_partial: Optional[Callable[[Dict], None]],
+    ) -> Callable[[str, Any], None]:
+        """Starts an attempt: returns a validator that reports each valid field to `on_partial`."""
+        partial: Dict = {}
+        if on_partial:
+            on_partial({})
+
+        def validate_field(key: str, value: Any) -> None:
+            self._raise_for_bad_article_field(key, value, category_constraint)
+            partial[key] = value
+            if on_partial:
+                on_partial(dict(partial))
+
+        return validate_field
+
+    def _with_retries(self, attempt: Callable[[float], T]) -> T:
+        """
+        Runs `attempt` until it succeeds, within the retry policy.
+
+        Args:
+            attempt (Callable[[float], T]): One generation attempt, given the overall deadline.
+
+        Returns:
+            T: Result of the first successful attempt.
+
+        Raises:
+            GenerationFailed: If attempts or time ran out.
+        """
+        policy = self._retry_policy
+        deadline = time.monotonic() + policy.timeout_seconds
+        self._count(self.retry_stats, "calls")
+        last_error: Optional[Exception] = None
+        attempts = 0
+        while attempts < policy.max_attempts and time.monotonic() < deadline:
+            if attempts > 0:
+                self._count(self.retry_stats, "retries")
+                time.sleep(
+                    min(
+                        policy.backoff_seconds(attempts),
+                        max(deadline - time.monotonic(), 0),
+                    )
                 )
-                assert len(loaded_json["title"]) > 0, "Error: Title is empty."
-                assert len(loaded_json["title"]) < 150, "Error: Title is too long."
-                assert len(loaded_json["category_list"]) in list(
-                    range(1, 4)
-                ), "Error: Wrong number of categories."
-                assert all(
-                    category in category_constraint
-                    for category in loaded_json["category_list"]
-                ), "Error: Category list must be a subset of the category constraint."
-                assert (
-                    len(loaded_json["header_img_description"]) > 0
-                ), "Error: Header image description is empty."
-                assert len(loaded_json["body"]) > 0, "Error: Body is empty."
-                return loaded_json
+            attempts += 1
+            try:
+                return self._run_attempt(attempt, deadline)
             except Exception as e:
+                last_error = e
                 print(str(e))
+        self._count(self.retry_stats, "failures")
+        raise GenerationFailed(
+            f"{self.model_name}: no valid output after {attempts} attempts ({last_error})"
+        ) from last_error
 
-    def _invoke_model(self, input: Any) -> str:
+    def _run_attempt(self, attempt: Callable[[float], T], deadline: float) -> T:
+        """
+        Runs one attempt on a helper thread and stops waiting for it at the deadline.
+
+        A hung request is abandoned; its request timeout is cut to the time
+        left before the deadline (see `_llm_until`), so it ends by then too.
+        """
+        future = self._attempt_executor.submit(attempt, deadline)
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except concurrent.futures.TimeoutError:
+            future.cancel()  # in case it never started
+            raise TimeoutError("Error: Generation timed out.") from None
+
+    async def _awith_retries(self, attempt: Callable[[float], Awaitable[T]]) -> T:
+        """
+        Async version of `_with_retries`; each attempt holds a concurrency slot.
+
+        Args:
+            attempt (Callable[[float], Awaitable[T]]): One generation attempt, given the overall deadline.
+
+        Returns:
+            T: Result of the first successful attempt.
+
+        Raises:
+            GenerationFailed: If attempts or time ran out.
+        """
+        policy = self._retry_policy
+        deadline = time.monotonic() + policy.timeout_seconds
+        self._count(self.retry_stats, "calls")
+        last_error: Optional[Exception] = None
+        attempts = 0
+        while attempts < policy.max_attempts and time.monotonic() < deadline:
+            if attempts > 0:
+                self._count(self.retry_stats, "retries")
+                await asyncio.sleep(
+                    min(
+                        policy.backoff_seconds(attempts),
+                        max(deadline - time.monotonic(), 0),
+                    )
+                )
+            attempts += 1
+            try:
+                async with self._concurrency_limit():
+                    return await asyncio.wait_for(
+                        attempt(deadline), max(deadline - time.monotonic(), 0)
+                    )
+            except Exception as e:
+                last_error = e
+                print(str(e) or type(e).__name__)
+        self._count(self.retry_stats, "failures")
+        raise GenerationFailed(
+            f"{self.model_name}: no valid output after {attempts} attempts ({last_error})"
+        ) from last_error
+
+    def _concurrency_limit(self) -> asyncio.Semaphore:
+        """Semaphore bounding the requests in flight on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if loop not in self._semaphores:
+            self._semaphores[loop] = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphores[loop]
+
+    @staticmethod
+    def _build_json_schema(
+        expected_keys_to_type: Dict, enums: Optional[Dict[str, List[str]]] = None
+    ) -> Dict:
+        """
+        Builds a JSON schema from an expected keys to type mapping.
+
+        Args:
+            expected_keys_to_type (Dict): Expected keys to type mapping.
+            enums (Dict[str, List[str]], optional): Allowed values per key (per item for lists).
+
+        Returns:
+            Dict: JSON schema of the expected object.
+        """
+        json_types = {
+            str: "string",
+            list: "array",
+            dict: "object",
+            int: "integer",
+            float: "number",
+            bool: "boolean",
+        }
+        properties: Dict[str, Dict] = {}
+        for key, value_type in expected_keys_to_type.items():
+            properties[key] = {"type": json_types[value_type]}
+            if enums and key in enums:
+                if value_type == list:
+                    properties[key]["items"] = {"type": "string", "enum": enums[key]}
+                else:
+                    properties[key]["enum"] = enums[key]
+        return {
+            "type": "object",
+            "properties": properties,
+            "required": list(expected_keys_to_type),
+            "additionalProperties": False,
+        }
+
+    def _raise_for_bad_article_field(
+        self, key: str, value: Any, category_constraint: List[str]
+    ) -> None:
+        """
+        Raises for a bad news article field (checked as soon as the field is complete).
+
+        Args:
+            key (str): Field name.
+            value (Any): Field value.
+            category_constraint (List[str]): List of categories to constrain output selection to.
+
+        Raises:
+            AssertionError: If the field is not valid.
+        """
+        assert (
+            key in self.NEWS_ARTICLE_KEYS_TO_TYPE
+        ), f"Error: Unexpected key '{key}'."
+        assert (
+            type(value) == self.NEWS_ARTICLE_KEYS_TO_TYPE[key]
+        ), f"Value for key '{key}' is not of expected type '{self.NEWS_ARTICLE_KEYS_TO_TYPE[key]}'."
+        if key == "title":
+            assert len(value) > 0, "Error: Title is empty."
+            assert len(value) < 150, "Error: Title is too long."
+        elif key == "category_list":
+            assert len(value) in list(range(1, 4)), "Error: Wrong number of categories."
+            assert all(
+                category in category_constraint for category in value
+            ), "Error: Category list must be a subset of the category constraint."
+        elif key == "header_img_description":
+            assert len(value) > 0, "Error: Header image description is empty."
+        elif key == "body":
+            assert len(value) > 0, "Error: Body is empty."
+
+    def _stream_json_output(
+        self,
+        input: Any,
+        validate_field: Callable[[str, Any], None],
+        deadline: Optional[float] = None,
+    ) -> Dict:
+        """
+        Streams a JSON object from the model, validating each field as soon as it closes.
+
+        Generation is cancelled on the first invalid field; the tokens that were
+        not generated (estimated from the average completed output) are added to
+        `stream_stats["tokens_saved"]`. If the output is not strictly valid JSON
+        (e.g. a trailing comma), the rest is streamed without incremental
+        validation and the whole output is repaired once the stream ends.
+
+        Args:
+            input (Any): Model input.
+            validate_field (Callable[[str, Any], None]): Raises for an invalid field.
+            deadline (float, optional): `time.monotonic()` after which the generation is cancelled.
+
+        Returns:
+            Dict: Parsed JSON.
+        """
+        parser = IncrementalJSONObjectParser()
+        text: List[str] = []  # streamed so far, repaired if the strict parse fails
+        validated: Set[str] = set()
+        strict = True
+        tokens = 0
+        chunks = self._stream_model(input=input, deadline=deadline)
+        try:
+            for chunk in chunks:
+                tokens += 1  # Ollama and OpenAI stream one token per chunk
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError("Error: Generation timed out.")
+                text.append(chunk.replace("<|im_end|>", ""))
+                if strict:
+                    strict = self._feed_streamed_chunk(
+                        parser, text[-1], validate_field, validated
+                    )
+                    if parser.done:
+                        break
+            result = self._streamed_result(
+                parser if strict else None, "".join(text), validate_field, validated
+            )
+        except Exception:
+            self._record_aborted_stream(tokens)
+            raise
+        finally:
+            chunks.close()  # closing the stream cancels the generation
+        self._record_completed_stream(tokens)
+        return result
+
+    async def _astream_json_output(
+        self,
+        input: Any,
+        validate_field: Callable[[str, Any], None],
+        deadline: Optional[float] = None,
+    ) -> Dict:
+        """Async version of `_stream_json_output`."""
+        parser = IncrementalJSONObjectParser()
+        text: List[str] = []
+        validated: Set[str] = set()
+        strict = True
+        tokens = 0
+        chunks = self._astream_model(input=input, deadline=deadline)
+        try:
+            async for chunk in chunks:
+                tokens += 1
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError("Error: Generation timed out.")
+                text.append(chunk.replace("<|im_end|>", ""))
+                if strict:
+                    strict = self._feed_streamed_chunk(
+                        parser, text[-1], validate_field, validated
+                    )
+                    if parser.done:
+                        break
+            result = self._streamed_result(
+                parser if strict else None, "".join(text), validate_field, validated
+            )
+        except BaseException:  # includes cancellation by the attempt timeout
+            self._record_aborted_stream(tokens)
+            raise
+        finally:
+            await chunks.aclose()
+        self._record_completed_stream(tokens)
+        return result
+
+    @staticmethod
+    def _feed_streamed_chunk(
+        parser: IncrementalJSONObjectParser,
+        chunk: str,
+        validate_field: Callable[[str, Any], None],
+        validated: Set[str],
+    ) -> bool:
+        """Feeds a chunk to the strict parser and validates completed fields; False once it fails."""
+        try:
+            fields = parser.feed(chunk)
+        except ValueError as e:
+            print(f"Streamed JSON is malformed ({e}), repairing it once the stream ends.")
+            return False
+        for key, value in fields:
+            validate_field(key, value)
+            validated.add(key)
+        return True
+
+    def _streamed_result(
+        self,
+        parser: Optional[IncrementalJSONObjectParser],
+        text: str,
+        validate_field: Callable[[str, Any], None],
+        validated: Set[str],
+    ) -> Dict:
+        """The strictly parsed object, else the repaired full output (validating the remaining fields)."""
+        if parser is not None and parser.done:
+            return parser.result()
+        loaded_json = self._parse_json_output(text)  # raises if it can not be repaired
+        for key, value in loaded_json.items():
+            if key not in validated:
+                validate_field(key, value)
+        return loaded_json
+
+    def _count(self, stats: Dict[str, int], key: str, n: int = 1) -> None:
+        """Adds to one of the stats counters."""
+        with self._stats_lock:
+            stats[key] += n
+
+    def _record_completed_stream(self, tokens: int) -> None:
+        """Records a completed stream, for estimating the tokens later aborts save."""
+        with self._stats_lock:
+            self.stream_stats["completed"] += 1
+            self._completed_tokens += tokens
+
+    def _record_aborted_stream(self, tokens: int) -> None:
+        """Records an aborted stream and reports the tokens it saved."""
+        with self._stats_lock:
+            self.stream_stats["aborted"] += 1
+            completed = self.stream_stats["completed"]
+            saved = (
+                max(int(self._completed_tokens / completed) - tokens, 0)
+                if completed
+                else None
+            )
+            self.stream_stats["tokens_saved"] += saved or 0
+        if saved is None:
+            print(f"Generation aborted after {tokens} tokens.")
+        else:
+            print(f"Generation aborted after {tokens} tokens (~{saved} tokens saved).")
+
+    def _llm_until(
+        self, deadline: Optional[float]
+    ) -> Union[BaseLLM, BaseChatModel]:
+        """
+        Returns the model with its request timeout cut to the time left before `deadline`.
+
+        Args:
+            deadline (float, optional): `time.monotonic()` the request must end by.
+
+        Returns:
+            Union[BaseLLM, BaseChatModel]: The model to send the request with.
+        """
+        return self._llm
+
+    def _stream_model(self, input: Any, deadline: Optional[float] = None) -> Iterator[str]:
+        """Abstracts LLM / ChatModel Streaming"""
+        llm = self._llm_until(deadline)
+        if isinstance(llm, BaseLLM):
+            yield from llm.stream(input=input)
+        if isinstance(llm, BaseChatModel):
+            for chunk in llm.stream(input=input):
+                yield chunk.content
+
+    async def _astream_model(
+        self, input: Any, deadline: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Abstracts async LLM / ChatModel Streaming"""
+        llm = self._llm_until(deadline)
+        if isinstance(llm, BaseLLM):
+            async for chunk in llm.astream(input=input):
+                yield chunk
+        if isinstance(llm, BaseChatModel):
+            async for chunk in llm.astream(input=input):
+                yield chunk.content
+
+    def _invoke_model(self, input: Any, deadline: Optional[float] = None) -> str:
         """Abstracts LLM / ChatModel Call"""
-        if isinstance(self._llm, BaseLLM):
-            return self._llm.invoke(input=input)
-        if isinstance(self._llm, BaseChatModel):
-            return self._llm.invoke(input=input).content
+        llm = self._llm_until(deadline)
+        if isinstance(llm, BaseLLM):
+            return llm.invoke(input=input)
+        if isinstance(llm, BaseChatModel):
+            return llm.invoke(input=input).content
+
+    async def _ainvoke_model(self, input: Any, deadline: Optional[float] = None) -> str:
+        """Abstracts async LLM / ChatModel Call"""
+        llm = self._llm_until(deadline)
+        if isinstance(llm, BaseLLM):
+            return await llm.ainvoke(input=input)
+        if isinstance(llm, BaseChatModel):
+            return (await llm.ainvoke(input=input)).content
 
     def _load_prompt(self, prompt_name: str) -> str:
         """Loads prompt from file."""
@@ -136,10 +768,9 @@ class InOut(ABC):
         input = input.strip()
         return input
 
-    @staticmethod
-    def _parse_json_output(json_string: str) -> Dict:
+    def _parse_json_output(self, json_string: str) -> Dict:
         """
-        Parses JSON output from LLM.
+        Parses JSON output from LLM, salvaging near-valid output.
 
         Args:
             json_string (str): JSON string to clean.
@@ -148,15 +779,14 @@ class InOut(ABC):
             Dict: Cleaned JSON.
 
         Raises:
-            JSONDecodeError: If JSON string is not valid.
+            ValueError: If no JSON object can be salvaged.
         """
-        json_string = json_string.replace("<|im_end|>", "")
-        removed_internal_newlines = re.sub(
-            r'\"([^"]*)\"',  # match anything in quotes including quotes
-            lambda match: match.group(0).replace("\n", "\\n"),
-            json_string,
-        )
-        return json.loads(removed_internal_newlines)
+        loaded_json, repairs = repair_json_object(json_string)
+        self._count(self.repair_stats, "parsed")
+        if repairs:
+            self._count(self.repair_stats, "repaired")
+            print(f"Repaired JSON output ({self.model_name}): {', '.join(repairs)}")
+        return loaded_json
 
     @staticmethod
     def _raise_for_bad_json_output(
@@ -181,43 +811,101 @@ class InOut(ABC):
                 type(input_value) == expected_keys_to_type[input_key]
             ), f"Value for key '{input_key}' is not of expected type '{expected_keys_to_type[input_key]}'."
 
-    @staticmethod
     @abstractmethod
-    def kill() -> None:
-        """Kills LLM runner process."""
+    def unload(self) -> None:
+        """Releases the memory held by the LLM runner."""
         pass
 
 
 class OllamaInOut(InOut):
-    def __init__(self, model_name: str, temperature: int):
+    def __init__(
+        self,
+        model_name: str,
+        temperature: int,
+        stream: bool = False,
+        structured_output: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        max_concurrency: int = 1,
+    ):
         print(f"Pulling Ollama model: {model_name}")
         subprocess.run(["ollama", "pull", model_name], check=True)
         print(f"Running Ollama model: {model_name}")
-        llm = Ollama(model=model_name, temperature=temperature)
-        super().__init__(llm)
+        llm = Ollama(
+            model=model_name,
+            temperature=temperature,
+            timeout=math.ceil((retry_policy or RetryPolicy()).timeout_seconds),
+            format="json" if structured_output else None,  # Ollama JSON mode
+        )
+        super().__init__(
+            llm,
+            stream=stream,
+            structured_output=structured_output,
+            retry_policy=retry_policy,
+            model_name=model_name,
+            max_concurrency=max_concurrency,
+        )
 
-    @staticmethod
-    def kill():
-        try:
-            result = subprocess.run(
-                ["pgrep", "-f", "ollama-runner"], capture_output=True, text=True
-            )
-            pid = result.stdout.strip()
-            if pid:
-                subprocess.run(["kill", "-9", pid], check=True)
-                print(f"Ollama runner with PID {pid} has been successfully killed.")
-            else:
-                print("Ollama runner process not found.")
-        except subprocess.CalledProcessError as e:
-            print(f"Error: {e}")
+    def unload(self) -> None:
+        # keep_alive=0 asks the Ollama server to evict the model from memory
+        requests.post(
+            f"{self._llm.base_url}/api/generate",
+            json={"model": self.model_name, "keep_alive": 0},
+            timeout=30,
+        ).raise_for_status()
+        print(f"Ollama model {self.model_name} has been unloaded.")
+
+    def _llm_until(self, deadline: Optional[float]) -> BaseLLM:
+        if deadline is None:
+            return self._llm
+        # A shallow copy per request (sharing the fields), read when the request is sent
+        return type(self._llm).construct(
+            **{
+                **self._llm.__dict__,
+                "timeout": math.ceil(max(deadline - time.monotonic(), 1)),
+            }
+        )
 
 
 class OpenAIInOut(InOut):
-    def __init__(self, model_name: str, temperature: int, api_key: str):
+    def __init__(
+        self,
+        model_name: str,
+        temperature: int,
+        api_key: str,
+        stream: bool = False,
+        structured_output: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        max_concurrency: int = 8,
+    ):
         os.environ["OPENAI_API_KEY"] = api_key
-        llm = ChatOpenAI(model_name=model_name, temperature=temperature)
-        super().__init__(llm)
+        llm = ChatOpenAI(
+            model_name=model_name,
+            temperature=temperature,
+            request_timeout=(retry_policy or RetryPolicy()).timeout_seconds,
+            model_kwargs={"response_format": {"type": "json_object"}}  # JSON mode
+            if structured_output
+            else {},
+        )
+        super().__init__(
+            llm,
+            stream=stream,
+            structured_output=structured_output,
+            retry_policy=retry_policy,
+            model_name=model_name,
+            max_concurrency=max_concurrency,
+        )
 
-    @staticmethod
-    def kill():
+    def _llm_until(self, deadline: Optional[float]) -> BaseChatModel:
+        if deadline is None:
+            return self._llm
+        # A shallow copy per request; extra model_kwargs are passed to the client's create call
+        model_kwargs = {
+            **self._llm.model_kwargs,
+            "timeout": max(deadline - time.monotonic(), 1),
+        }
+        return type(self._llm).construct(
+            **{**self._llm.__dict__, "model_kwargs": model_kwargs}
+        )
+
+    def unload(self) -> None:
         pass  # not local process
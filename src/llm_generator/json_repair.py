@@ -0,0 +1,216 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+import json
+
+_OPENING_QUOTES = {'"': '"', "“": "”", "'": "'", "‘": "’", "”": "”"}
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "'": "'",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+@dataclass
+class _Container:
+    kind: str  # "{" or "["
+    expect: str  # "key", "colon", "value" or "comma"
+
+
+@dataclass
+class _Repairer:
+    """Single pass over the text, emitting strict JSON."""
+
+    text: str
+    i: int = 0
+    out: List[str] = field(default_factory=list)
+    stack: List[_Container] = field(default_factory=list)
+    repairs: List[str] = field(default_factory=list)
+
+    def repair(self, message: str) -> None:
+        if message not in self.repairs:
+            self.repairs.append(message)
+
+    def skip_whitespace(self, i: int) -> int:
+        while i < len(self.text) and self.text[i].isspace():
+            i += 1
+        return i
+
+    def run(self) -> str:
+        text = self.text
+        while self.i < len(text):
+            char = text[self.i]
+            if char.isspace():
+                self.i += 1
+            elif char in _OPENING_QUOTES:
+                self.read_string()
+            elif char in "{[":
+                self.before_value()
+                self.out.append(char)
+                self.stack.append(_Container(char, "key" if char == "{" else "value"))
+                self.i += 1
+            elif char in "}]":
+                self.close_container(char)
+                self.i += 1
+                if not self.stack:
+                    if text[self.i :].strip():
+                        self.repair("ignored text after object")
+                    return "".join(self.out)
+            elif char == ":":
+                self.out.append(char)
+                self.stack[-1].expect = "value"
+                self.i += 1
+            elif char == ",":
+                container = self.stack[-1]
+                if container.expect == "comma":
+                    self.out.append(char)
+                    container.expect = "key" if container.kind == "{" else "value"
+                else:
+                    self.repair("removed extra comma")
+                self.i += 1
+            else:
+                self.read_literal()
+        if any(x.expect == "colon" for x in self.stack):
+            raise ValueError("Output ends inside a key.")
+        self.repair("closed unterminated object")
+        while self.stack:
+            self.close_container("}" if self.stack[-1].kind == "{" else "]")
+        return "".join(self.out)
+
+    def before_value(self) -> None:
+        """Inserts a comma if a new member follows the previous one without one."""
+        if self.stack and self.stack[-1].expect == "comma":
+            self.repair("inserted missing comma")
+            self.out.append(",")
+            self.stack[-1].expect = "key" if self.stack[-1].kind == "{" else "value"
+
+    def close_container(self, char: str) -> None:
+        container = self.stack.pop()
+        closing = "}" if container.kind == "{" else "]"
+        if char != closing:
+            self.repair("fixed mismatched bracket")
+        if self.out and self.out[-1] == ",":
+            self.out.pop()
+            self.repair("removed trailing comma")
+        if container.expect == "value" and container.kind == "{":
+            raise ValueError("Object member has no value.")
+        self.out.append(closing)
+        if self.stack:
+            self.stack[-1].expect = "comma"
+
+    def read_string(self) -> None:
+        self.before_value()
+        container = self.stack[-1]
+        is_key = container.kind == "{" and container.expect == "key"
+        opening = self.text[self.i]
+        closing = _OPENING_QUOTES[opening]
+        if opening != '"':
+            self.repair("replaced non-standard quotes")
+        content: List[str] = []
+        i = self.i + 1
+        while i < len(self.text):
+            char = self.text[i]
+            if char == "\\" and i + 1 < len(self.text):
+                escaped = self.text[i + 1]
+                if escaped in _ESCAPES:
+                    content.append(_ESCAPES[escaped])
+                    i += 2
+                elif escaped == "u" and self._is_hex(self.text[i + 2 : i + 6]):
+                    content.append(chr(int(self.text[i + 2 : i + 6], 16)))
+                    i += 6
+                else:
+                    self.repair("kept invalid escape")
+                    content.append(escaped)
+                    i += 2
+                continue
+            if char == closing or (closing == "”" and char == '"'):
+                if self._closes_string(i + 1, is_key, container.kind):
+                    self.out.append(json.dumps("".join(content)))
+                    self.i = i + 1
+                    container.expect = "colon" if is_key else "comma"
+                    return
+                self.repair("escaped inner quote")
+            elif char in "\n\r\t":
+                self.repair("escaped control character")
+            content.append(char)
+            i += 1
+        raise ValueError("Output ends inside a string.")
+
+    def _closes_string(self, i: int, is_key: bool, kind: str) -> bool:
+        """Decides whether a quote ends the string by looking at what follows it."""
+        j = self.skip_whitespace(i)
+        if j >= len(self.text):
+            return True
+        following = self.text[j]
+        if is_key:
+            return following == ":"
+        if following == ",":
+            k = self.skip_whitespace(j + 1)
+            return kind == "[" or k >= len(self.text) or self.text[k] in "}\"“'‘"
+        if following in "}]":
+            return True
+        # Members split by a newline but no comma (repaired by `before_value`)
+        return following in _OPENING_QUOTES and "\n" in self.text[i:j]
+
+    def read_literal(self) -> None:
+        i = self.i
+        while i < len(self.text) and not (
+            self.text[i].isspace() or self.text[i] in ",:{}[]" + "".join(_OPENING_QUOTES)
+        ):
+            i += 1
+        token = self.text[self.i : i]
+        container = self.stack[-1]
+        if container.kind == "{" and container.expect == "key":
+            self.repair("quoted bare key")
+            self.out.append(json.dumps(token))
+            container.expect = "colon"
+        else:
+            self.before_value()
+            if token in _PYTHON_LITERALS:
+                self.repair("converted Python literal")
+                token = _PYTHON_LITERALS[token]
+            try:
+                json.loads(token)
+            except ValueError:
+                raise ValueError(f"Invalid literal '{token[:20]}'.")
+            self.out.append(token)
+            container.expect = "comma"
+        self.i = i
+
+    @staticmethod
+    def _is_hex(value: str) -> bool:
+        return len(value) == 4 and all(x in "0123456789abcdefABCDEF" for x in value)
+
+
+def repair_json_object(text: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Extracts and repairs the first JSON object in near-valid LLM output.
+
+    Runs in a single linear pass. Fixes text around the object (prose, code
+    fences, end tokens), smart and single quotes, unescaped inner quotes,
+    raw control characters in strings, invalid escapes, trailing / extra /
+    missing commas, bare keys, Python literals and missing closing brackets.
+
+    Args:
+        text (str): Raw model output.
+
+    Returns:
+        Tuple[Dict[str, Any], List[str]]: Parsed object and the repairs that were needed.
+
+    Raises:
+        ValueError: If no object can be salvaged.
+    """
+    text = text.replace("<|im_end|>", "")
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in output.")
+    repairer = _Repairer(text=text, i=start)
+    if text[:start].strip():
+        repairer.repair("ignored text before object")
+    return json.loads(repairer.run()), repairer.repairs
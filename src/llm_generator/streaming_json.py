@@ -0,0 +1,148 @@
+from typing import Any, Dict, List, Optional, Tuple
+import json
+
+
+class IncrementalJSONObjectParser:
+    """
+    Parses a JSON object from text that arrives in chunks.
+
+    Each top-level key / value pair is returned by `feed()` as soon as its
+    value is closed, so callers can validate fields while the rest of the
+    object is still being generated. Like `InOut._parse_json_output`, raw
+    newlines / tabs inside strings are accepted and escaped. Text before the
+    opening brace and after the closing brace is ignored.
+    """
+
+    def __init__(self) -> None:
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._text: List[str] = []  # current key or value
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._fields: Dict[str, Any] = {}
+
+    @property
+    def done(self) -> bool:
+        """Whether the closing brace of the object has been seen."""
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """
+        Consumes the next chunk of text.
+
+        Args:
+            chunk (str): Newly generated text.
+
+        Returns:
+            List[Tuple[str, Any]]: Key / value pairs completed by this chunk.
+
+        Raises:
+            ValueError: If the text can not be a JSON object.
+        """
+        completed = []
+        for char in chunk:
+            field = self._feed_char(char)
+            if field is not None:
+                completed.append(field)
+        return completed
+
+    def result(self) -> Dict[str, Any]:
+        """
+        Returns the parsed object.
+
+        Returns:
+            Dict[str, Any]: Parsed object.
+
+        Raises:
+            ValueError: If the object has not been closed yet.
+        """
+        if not self.done:
+            raise ValueError("Incomplete JSON object.")
+        return dict(self._fields)
+
+    def _feed_char(self, char: str) -> Optional[Tuple[str, Any]]:
+        """Advances the state machine by one character."""
+        state = self._state
+        if state == "start":
+            if char == "{":
+                self._state = "key"
+        elif state == "key":
+            if char == '"':
+                self._state, self._text = "in_key", []
+            elif char == "}" and not self._fields:
+                self._state = "done"
+            elif not char.isspace():
+                raise ValueError(f"Expected key, got {char!r}.")
+        elif state == "in_key":
+            if self._escaped:
+                self._escaped = False
+                self._text.append(char)
+            elif char == "\\":
+                self._escaped = True
+                self._text.append(char)
+            elif char == '"':
+                self._key = json.loads('"' + "".join(self._text) + '"')
+                self._state = "colon"
+            else:
+                self._text.append(char)
+        elif state == "colon":
+            if char == ":":
+                self._state, self._text = "value", []
+                self._depth, self._in_string = 0, False
+            elif not char.isspace():
+                raise ValueError(f"Expected ':', got {char!r}.")
+        elif state == "value":
+            return self._feed_value_char(char)
+        elif state == "after_value":
+            if char == ",":
+                self._state = "key"
+            elif char == "}":
+                self._state = "done"
+            elif not char.isspace():
+                raise ValueError(f"Expected ',' or '}}', got {char!r}.")
+        return None
+
+    def _feed_value_char(self, char: str) -> Optional[Tuple[str, Any]]:
+        """Consumes one character of a value, returning the field once it closes."""
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+            elif char == "\n":
+                char = "\\n"
+            elif char == "\t":
+                char = "\\t"
+            self._text.append(char)
+            if not self._in_string and self._depth == 0:
+                return self._close_value()
+            return None
+        if not self._text and char.isspace():
+            return None
+        if self._depth == 0 and self._text and (char in ",}" or char.isspace()):
+            # End of a scalar (number, true, false, null)
+            field = self._close_value()
+            self._feed_char(char)
+            return field
+        self._text.append(char)
+        if char == '"':
+            self._in_string = True
+        elif char in "[{":
+            self._depth += 1
+        elif char in "]}":
+            self._depth -= 1
+            if self._depth == 0:
+                return self._close_value()
+        return None
+
+    def _close_value(self) -> Tuple[str, Any]:
+        """Parses the finished value and stores the field."""
+        value = json.loads("".join(self._text))
+        if self._key in self._fields:
+            raise ValueError(f"Duplicate key '{self._key}'.")
+        self._fields[self._key] = value
+        self._state = "after_value"
+        return self._key, value
@@ -1,106 +1,727 @@
 from config import *
-from llm_generator.in_out import OllamaInOut
-from diffusion_generator.text_to_image import DiffusersTextToImage
+from llm_generator.in_out import OllamaInOut, RetryPolicy
+from llm_generator.idea_pool import IdeaPool
+from diffusion_generator.text_to_image import (
+    CPUBackend,
+    DiffusersTextToImage,
+    GenerationCancelled,
+    InferenceProfile,
+)
+from diffusion_generator.image_cache import CachedImage, PromptImageCache, ReuseRule
 from classifiers.nsfw_classify import HuggingfaceNSFWClassify
+from classifiers.near_duplicate import MinHashLSHIndex
+from classifiers.category_index import TfidfCategoryIndex
 from api_integration.upload import ContentfulUploadAPI
 from api_integration.fetch import ContentfulFetchAPI
+from api_integration.contentful_connection import ContentfulConnection
+from api_integration.mirror import MirroredFetchAPI
+from api_integration.image_encoding import EncodedImage, ImageEncoder, load_encoded_image
+from api_integration.data_models import (
+    PersistedAsset,
+    PersistedCategory,
+    PersistedNewsArticle,
+)
+from runtime.job_journal import JobJournal
+from runtime.job_queue import SQLiteJobQueue
+from runtime.model_manager import ModelManager
+from runtime.pipeline import Pipeline, Stage
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from PIL import Image
+import functools
+import io
+import threading
 import random
 
 
 def main() -> None:
     """Run Indefinitely Creating and Publishing New Articles"""
+    manager = initialize_apis()
+    pipeline = build_pipeline(manager)
+    pipeline.start(article_jobs(manager))
+    for job in pipeline.results():
+        print(f"Published: {job.published.title}")
+        print(f"Contentful requests: {manager.get('contentful').request_counts()}")
+        for name in ["llm_idea_generator", "llm_writer"]:
+            if manager.peek(name) is not None:
+                print(f"{name}: {manager.peek(name).get_stats()}")
+        if manager.peek("idea_pool") is not None:
+            print(f"Idea pool: {manager.peek('idea_pool').sizes()}")
+
+
+LLM_RETRY_POLICY = RetryPolicy(
+    max_attempts=LLM_MAX_ATTEMPTS, timeout_seconds=LLM_TIMEOUT_SECONDS
+)
+
+
+def initialize_apis(offline: bool = False, worker: bool = False) -> ModelManager:
+    """Register All APIs (each is loaded once on first use and kept resident; offline never touches Contentful, workers share the job journal)"""
+    manager = ModelManager(memory_budget_gb=MODEL_MEMORY_BUDGET_GB)
+    manager.register(
+        "contentful",
+        lambda: ContentfulConnection(
+            management_api_token=CONTENTFUL_MANAGEMENT_API_TOKEN,
+            space_id=CONTENTFUL_SPACE_ID,
+            environment_id=CONTENTFUL_ENVIRONMENT_ID,
+            pool_maxsize=CONTENTFUL_POOL_MAXSIZE,
+            rate_limit_per_second=CONTENTFUL_RATE_LIMIT_PER_SECOND,
+            api_url=CONTENTFUL_API_URL,
+            uploads_api_url=CONTENTFUL_UPLOADS_API_URL,
+            https=CONTENTFUL_HTTPS,
+        ),
+    )
+    manager.register(
+        "fetch_api",
+        lambda: MirroredFetchAPI(
+            delivery_api_token=CONTENTFUL_DELIVERY_API_TOKEN,
+            space_id=CONTENTFUL_SPACE_ID,
+            environment_id=CONTENTFUL_ENVIRONMENT_ID,
+            db_path=CONTENTFUL_MIRROR_PATH,
+            max_staleness_seconds=CONTENTFUL_MIRROR_MAX_STALENESS_SECONDS,
+        )
+        if CONTENTFUL_DELIVERY_API_TOKEN
+        else ContentfulFetchAPI(
+            management_api_token=CONTENTFUL_MANAGEMENT_API_TOKEN,
+            connection=manager.get("contentful"),
+            page_size=CONTENTFUL_PAGE_SIZE,
+        ),
+    )
+    # Idea generator and writer share the same Ollama weights, so only the writer is charged
+    manager.register(
+        "llm_idea_generator",
+        lambda: OllamaInOut(
+            model_name=OLLAMA_MODEL,
+            temperature=TEMPERATURE_IDEA_GENERATOR,
+            retry_policy=LLM_RETRY_POLICY,
+            max_concurrency=OLLAMA_MAX_CONCURRENCY,
+        ),
+    )
+    manager.register(
+        "idea_pool",
+        lambda: IdeaPool(
+            generate_ideas=functools.partial(generate_pool_ideas, manager),
+            path=IDEA_POOL_PATH,
+            ideas_per_call=IDEA_POOL_IDEAS_PER_CALL,
+            low_water_mark=IDEA_POOL_LOW_WATER_MARK,
+        ),
+    )
+    manager.register(
+        "llm_writer",
+        lambda: OllamaInOut(
+            model_name=OLLAMA_MODEL,
+            temperature=TEMPERATURE_WRITER,
+            stream=STREAM_WRITER,
+            structured_output=STRUCTURED_OUTPUT_WRITER,
+            retry_policy=LLM_RETRY_POLICY,
+            max_concurrency=OLLAMA_MAX_CONCURRENCY,
+        ),
+        memory_gb=LLM_MEMORY_GB,
+    )
+    manager.register(
+        "gen",
+        lambda: DiffusersTextToImage(
+            pretrained_model_name_or_path=HUGGINGFACE_DIFFUSERS_PRETRAINED_MODEL_NAME_OR_PATH,
+            max_batch_size=DIFFUSION_MAX_BATCH_SIZE,
+            cpu_backend=CPUBackend(
+                dtype=DIFFUSION_CPU_DTYPE,
+                num_threads=DIFFUSION_CPU_THREADS or None,
+                channels_last=DIFFUSION_CPU_CHANNELS_LAST,
+                attention_slicing=DIFFUSION_CPU_ATTENTION_SLICING,
+                vae_tiling=DIFFUSION_CPU_VAE_TILING,
+                compile=DIFFUSION_CPU_COMPILE,
+            )
+            if DIFFUSION_DEVICE == "cpu"
+            else None,
+            profiles={
+                name: InferenceProfile(**settings)
+                for name, settings in DIFFUSION_PROFILES.items()
+            },
+            default_profile=None if DIFFUSION_PROFILE == "adaptive" else DIFFUSION_PROFILE,
+        ),
+        memory_gb=DIFFUSION_MEMORY_GB,
+    )
+    manager.register(
+        "nsfw_classify",
+        lambda: HuggingfaceNSFWClassify(
+            pretrained_model_name_or_path=HUGGINGFACE_NSFW_CLASSIFIER_PRETRAINED_MODEL_NAME_OR_PATH,
+            nsfw_threshold=NSFW_THRESHOLD,
+        ),
+        memory_gb=NSFW_CLASSIFIER_MEMORY_GB,
+    )
+    manager.register(
+        "image_encoder",
+        lambda: ImageEncoder(
+            format=UPLOAD_IMAGE_FORMAT,
+            quality=UPLOAD_IMAGE_QUALITY,
+            optimize=UPLOAD_IMAGE_OPTIMIZE,
+            max_workers=UPLOAD_IMAGE_ENCODE_WORKERS,
+        ),
+    )
+    manager.register(
+        "upload_api",
+        lambda: ContentfulUploadAPI(
+            management_api_token=CONTENTFUL_MANAGEMENT_API_TOKEN,
+            connection=manager.get("contentful"),
+            asset_processing_timeout_seconds=CONTENTFUL_ASSET_PROCESSING_TIMEOUT_SECONDS,
+            on_news_article_uploaded=functools.partial(index_news_article, manager),
+        ),
+    )
+    manager.register(
+        "duplicate_index", functools.partial(build_duplicate_index, manager, offline)
+    )
+    manager.register(
+        "category_index", functools.partial(build_category_index, manager, offline)
+    )
+    manager.register(
+        "image_cache",
+        lambda: PromptImageCache(
+            directory=IMAGE_CACHE_DIR,
+            max_size_bytes=IMAGE_CACHE_MAX_SIZE_MB * 1024**2,
+            reuse_rule=ReuseRule(
+                max_uses=IMAGE_CACHE_MAX_USES,
+                same_category_only=IMAGE_CACHE_SAME_CATEGORY_ONLY,
+            ),
+        ),
+    )
+    manager.register(
+        "job_journal",
+        lambda: JobJournal(
+            directory=JOB_JOURNAL_DIR,
+            max_attempts=JOB_MAX_ATTEMPTS,
+            retry_delay_seconds=JOB_RETRY_DELAY_SECONDS,
+            shared=worker,
+        ),
+    )
+    manager.register(
+        "job_queue",
+        lambda: SQLiteJobQueue(
+            path=JOB_QUEUE_PATH,
+            lease_seconds=JOB_LEASE_SECONDS,
+            max_attempts=JOB_MAX_ATTEMPTS,
+        ),
+    )
+    return manager
+
+
+def build_duplicate_index(manager: ModelManager, offline: bool = False) -> MinHashLSHIndex:
+    """Indexes the Titles of All Published Articles (starts empty offline)"""
+    duplicate_index = MinHashLSHIndex(threshold=DUPLICATE_THRESHOLD)
+    if not offline:
+        with manager.use("fetch_api") as fetch_api:
+            for article in fetch_api.iter_news_articles():
+                duplicate_index.add(article.id, article.title)
+        print(f"Indexed {len(duplicate_index)} published titles for duplicate detection.")
+    return duplicate_index
+
+
+def build_category_index(manager: ModelManager, offline: bool = False) -> TfidfCategoryIndex:
+    """Loads the Category Index and Adds Articles Published Since It Was Saved (as saved offline)"""
+    category_index = TfidfCategoryIndex(path=CATEGORY_INDEX_PATH)
+    if not offline:
+        with manager.use("fetch_api") as fetch_api:
+            category_index.sync(
+                fetch_api.fetch_categories(), fetch_api.iter_news_articles()
+            )
+    return category_index
+
+
+def index_news_article(manager: ModelManager, article: PersistedNewsArticle) -> None:
+    """Adds a Just Published Article to the Duplicate and Category Indexes"""
+    if DUPLICATE_THRESHOLD and manager.peek("duplicate_index") is not None:
+        manager.peek("duplicate_index").add(article.id, article.title)
+    if CATEGORY_INDEX_PATH and manager.peek("category_index") is not None:
+        manager.peek("category_index").sync(articles=[article])
+
+
+def find_near_duplicate(manager: ModelManager, text: str) -> Optional[str]:
+    """Returns the ID of a Published Article Too Similar to an Idea / Title"""
+    if not DUPLICATE_THRESHOLD:
+        return None
+    with manager.use("duplicate_index") as duplicate_index:
+        match = duplicate_index.find_similar(text)
+    if match is None:
+        return None
+    print(f"'{text}' is a near-duplicate of article {match[0]} ({match[1]:.2f}).")
+    return match[0]
+
+
+@dataclass
+class ArticleJob:
+    """Work Item Passed Between Pipeline Stages"""
+
+    all_categories: List[PersistedCategory]
+    category: str
+    job_id: Optional[str] = None  # set if the job is checkpointed in the job journal
+    idea: Optional[str] = None
+    article: Optional[Dict] = None
+    early_candidates: Optional["Future[Optional[List[Image.Image]]]"] = None
+    cached_image: Optional[CachedImage] = None  # header image reused instead of rendered
+    candidates: List[Image.Image] = field(default_factory=list)
+    image: Optional[Image.Image] = None
+    image_index: Optional[int] = None  # of the candidate that passed moderation
+    encoded_image: Optional[EncodedImage] = None
+    asset_id: Optional[str] = None
+    published: Optional[PersistedNewsArticle] = None
+
+
+def build_pipeline(
+    manager: ModelManager,
+    last_stage: Optional[Tuple[str, Callable[..., Optional[ArticleJob]]]] = None,
+) -> Pipeline:
+    """Build the Staged Article Pipeline (ideas -> drafts -> images -> moderated -> encoded -> published)"""
+    stages = [
+        ("ideas", generate_idea),
+        ("drafts", write_article),
+        ("images", render_images),
+        ("moderated", moderate_images),
+        ("encoded", encode_header_image),
+        last_stage or ("published", publish_article),
+    ]
+    return Pipeline(
+        stages=[
+            Stage(
+                name=name,
+                fn=functools.partial(journaled(fn), manager),
+                workers=PIPELINE_STAGE_WORKERS.get(name, 1),
+                queue_size=PIPELINE_QUEUE_SIZE,
+                batch_size=PIPELINE_IMAGE_BATCH_SIZE
+                if name in ["images", "moderated"]
+                else 1,
+                batch_timeout_seconds=PIPELINE_IMAGE_BATCH_TIMEOUT_SECONDS,
+            )
+            for name, fn in stages
+        ],
+        report_interval_seconds=PIPELINE_REPORT_INTERVAL_SECONDS,
+    )
+
+
+def journaled(
+    stage: Callable[..., Any], owned: Optional[Callable[[], bool]] = None
+) -> Callable[..., Any]:
+    """Wraps a Stage to Checkpoint Its Jobs (one or a batch) in the Job Journal (while `owned()`, if given)"""
+
+    @functools.wraps(stage)
+    def run(manager: ModelManager, job_or_jobs: Any) -> Any:
+        jobs = job_or_jobs if isinstance(job_or_jobs, list) else [job_or_jobs]
+        if all(x.job_id is None for x in jobs):
+            return stage(manager, job_or_jobs)
+        try:
+            result = stage(manager, job_or_jobs)
+        except Exception as e:
+            if owned is not None and not owned():  # another worker journals it now
+                raise
+            with manager.use("job_journal") as job_journal:
+                for job in jobs:
+                    if job.job_id is not None:  # keeps what the stage got done
+                        checkpoint_job(job_journal, job)
+                        job_journal.fail(job.job_id, f"{stage.__name__}: {e}")
+            raise
+        if owned is not None and not owned():
+            return result
+        results = result if isinstance(result, list) else [result]
+        with manager.use("job_journal") as job_journal:
+            for job, result in zip(jobs, results):
+                if job.job_id is None:
+                    continue
+                if result is None or result.published is not None:
+                    job_journal.finish(job.job_id)  # dropped or done
+                else:
+                    checkpoint_job(job_journal, result)
+        return result
+
+    return run
+
+
+def checkpoint_job(job_journal: JobJournal, job: ArticleJob) -> None:
+    """Journals What a Job Gained (idea, article, rendered images, NSFW-checked image, upload file, asset)"""
+    record = job_journal.get(job.job_id)
+    if record is None:
+        return
+    fields: Dict[str, Any] = {}
+    if job.idea is not None and record.get("idea") is None:
+        fields["idea"] = job.idea
+    if job.article is not None and record.get("article") is None:
+        fields["article"] = job.article
+    if job.cached_image is not None and "cached_image" not in record:
+        fields["cached_image"] = {
+            "asset_id": job.cached_image.asset.id,
+            "asset_url": job.cached_image.asset.url,
+            "path": job.cached_image.path,
+        }
+    if job.candidates and "candidates" not in record:
+        fields["candidates"] = [f"candidate-{i}.png" for i in range(len(job.candidates))]
+        for name, image in zip(fields["candidates"], job.candidates):
+            job_journal.write_file(job.job_id, name, png_bytes(image))
+    unused_files: List[str] = []  # removed once the record no longer points to them
+    if job.image is not None and "image" not in record:
+        # The candidate that passed moderation, already journaled if it was rendered
+        candidates = record.get("candidates", [])
+        if job.image_index is not None and job.image_index < len(candidates):
+            fields["image"] = candidates[job.image_index]
+        else:
+            fields["image"] = "image.png"
+            job_journal.write_file(job.job_id, "image.png", png_bytes(job.image))
+        unused_files = [x for x in candidates if x != fields["image"]]
+    if job.encoded_image is not None and "encoded_image" not in record:
+        fields["encoded_image"] = f"encoded.{job.encoded_image.extension}"
+        job_journal.write_file(job.job_id, fields["encoded_image"], job.encoded_image.data)
+    if job.asset_id is not None and record.get("asset_id") is None:
+        fields["asset_id"] = job.asset_id
+    if fields:
+        job_journal.update(job.job_id, **fields)
+    for name in unused_files:
+        job_journal.remove_file(job.job_id, name)
+
+
+def png_bytes(image: Image.Image) -> bytes:
+    with io.BytesIO() as buffer:
+        # Fastest compression: checkpoints are temporary, and written on the GPU stages
+        image.save(buffer, format="PNG", compress_level=1)
+        return buffer.getvalue()
+
+
+def article_jobs(manager: ModelManager) -> Iterator[ArticleJob]:
+    """Yields Journaled Jobs Due to Resume, Then a New Article Job, Indefinitely"""
     while True:
+        if JOB_JOURNAL_DIR:
+            with manager.use("job_journal") as job_journal:
+                records = job_journal.take_resumable()
+            for record in records:
+                print(f"Resuming job {record['job_id']} (attempt {record['attempts'] + 1}).")
+                try:
+                    job = resume_job(manager, record)
+                except Exception as e:
+                    with manager.use("job_journal") as job_journal:
+                        job_journal.fail(record["job_id"], f"resume: {e}")
+                    continue
+                yield job
         try:
-            create_novel_article(*initialize_apis())
+            yield new_article_job(manager)
         except Exception as e:
             print(str(e))
 
 
-def initialize_apis() -> (
-    Tuple[
-        ContentfulFetchAPI,
-        OllamaInOut,
-        OllamaInOut,
-        DiffusersTextToImage,
-        HuggingfaceNSFWClassify,
-        ContentfulUploadAPI,
+def resume_job(
+    manager: ModelManager, record: Dict[str, Any], with_categories: bool = True
+) -> ArticleJob:
+    """Rebuilds a Journaled Job at Its Last Checkpoint (the stages skip what it has)"""
+    all_categories = []
+    if with_categories:  # only the stages in CATEGORY_STAGES use them
+        with manager.use("fetch_api") as fetch_api:
+            all_categories = fetch_api.fetch_categories()
+    job = ArticleJob(
+        all_categories=all_categories,
+        category=record["category"],
+        job_id=record["job_id"],
+        idea=record.get("idea"),
+        article=record.get("article"),
+        asset_id=record.get("asset_id"),
+    )
+    with manager.use("job_journal") as job_journal:
+        if record.get("cached_image"):
+            cached = record["cached_image"]
+            job.cached_image = CachedImage(
+                asset=PersistedAsset(id=cached["asset_id"], url=cached["asset_url"]),
+                path=cached["path"],
+            )
+        elif record.get("image"):
+            job.image = load_image(job_journal.file_path(job.job_id, record["image"]))
+        else:
+            job.candidates = [
+                load_image(job_journal.file_path(job.job_id, x))
+                for x in record.get("candidates", [])
+            ]
+        if record.get("encoded_image"):
+            job.encoded_image = load_encoded_image(
+                job_journal.file_path(job.job_id, record["encoded_image"])
+            )
+    return job
+
+
+def load_image(path: str) -> Image.Image:
+    with Image.open(path) as image:
+        return image.convert("RGB")
+
+
+# Stages that read the categories of a job (writer constraint, entry links)
+CATEGORY_STAGES = ["drafts", "published"]
+
+
+def article_stages() -> List[Tuple[str, Callable[..., Optional[ArticleJob]]]]:
+    """Stages of One Article in Order, Named Like the Pipeline Stages"""
+    return [
+        ("ideas", generate_idea),
+        ("drafts", write_article),
+        ("images", render_image),
+        ("moderated", moderate_image),
+        ("encoded", encode_header_image),
+        ("published", publish_article),
     ]
-):
-    """Initialize All APIs"""
-    fetch_api = ContentfulFetchAPI(
-        management_api_token=CONTENTFUL_MANAGEMENT_API_TOKEN,
-        space_id=CONTENTFUL_SPACE_ID,
-        environment_id=CONTENTFUL_ENVIRONMENT_ID,
-    )
-    llm_idea_generator = OllamaInOut(
-        model_name=OLLAMA_MODEL, temperature=TEMPERATURE_IDEA_GENERATOR
-    )
-    llm_writer = OllamaInOut(model_name=OLLAMA_MODEL, temperature=TEMPERATURE_WRITER)
-    gen = DiffusersTextToImage(
-        pretrained_model_name_or_path=HUGGINGFACE_DIFFUSERS_PRETRAINED_MODEL_NAME_OR_PATH
-    )
-    nsfw_classify = HuggingfaceNSFWClassify(
-        pretrained_model_name_or_path=HUGGINGFACE_NSFW_CLASSIFIER_PRETRAINED_MODEL_NAME_OR_PATH
-    )
-    upload_api = ContentfulUploadAPI(
-        management_api_token=CONTENTFUL_MANAGEMENT_API_TOKEN,
-        space_id=CONTENTFUL_SPACE_ID,
-        environment_id=CONTENTFUL_ENVIRONMENT_ID,
-    )
-    return fetch_api, llm_idea_generator, llm_writer, gen, nsfw_classify, upload_api
-
-
-def create_novel_article(
-    fetch_api: ContentfulFetchAPI,
-    llm_idea_generator: OllamaInOut,
-    llm_writer: OllamaInOut,
-    gen: DiffusersTextToImage,
-    nsfw_classify: HuggingfaceNSFWClassify,
-    upload_api: ContentfulUploadAPI,
-) -> None:
-    """Creates a New Article and Publishes"""
-
-    all_categories = fetch_api.fetch_categories()
+
+
+def create_novel_article(manager: ModelManager) -> Optional[ArticleJob]:
+    """Creates a New Article and Publishes (all stages in sequence)"""
+    job = new_article_job(manager)
+    for _, stage in article_stages():
+        job = journaled(stage)(manager, job)
+        if job is None:
+            return None
+    return job
+
+
+def new_article_job(manager: ModelManager) -> ArticleJob:
+    """Picks a Random Category for a New Article"""
+    with manager.use("fetch_api") as fetch_api:
+        all_categories = fetch_api.fetch_categories()
     if len(all_categories) == 0:
         quit("No Categories Found, Exiting...")
-    category_constraint = [x.title for x in all_categories]
-
-    kill_vram_processes()
-    random_category = random.choice(category_constraint)
-    article_idea = llm_idea_generator.generate_random_article_idea(
-        category_injection=random_category
+    job = ArticleJob(
+        all_categories=all_categories,
+        category=random.choice([x.title for x in all_categories]),
     )
+    if JOB_JOURNAL_DIR:
+        with manager.use("job_journal") as job_journal:
+            job.job_id = job_journal.create(category=job.category)
+    return job
 
-    article = llm_writer.write_news_article(
-        article_idea=article_idea,
-        category_constraint=category_constraint,
-    )
 
-    kill_vram_processes()
-    img = gen.generate_image(
-        prompt=article["header_img_description"],
-        negative_prompt=NEGATIVE_PROMPT_FILTER,
-    )
+def generate_idea(manager: ModelManager, job: ArticleJob) -> Optional[ArticleJob]:
+    """Stage: Generate an Article Idea Unless Given (dropped if already published)"""
+    if job.article is not None:  # resumed after writing
+        return job
+    if job.idea is None and IDEA_POOL_PATH:
+        with manager.use("idea_pool") as idea_pool:
+            job.idea = idea_pool.take(job.category)
+    elif job.idea is None:
+        with manager.use("llm_idea_generator") as llm_idea_generator:
+            job.idea = llm_idea_generator.generate_random_article_idea(
+                category_injection=job.category
+            )
+    if find_near_duplicate(manager, job.idea) is not None:
+        return None
+    return job
 
-    if nsfw_classify.check_is_nsfw(img):
-        return
 
-    uploaded_asset = upload_api.upload_asset(img)
-    upload_api.upload_news_article(
-        title=article["title"],
-        content=article["body"],
-        publishedDate=datetime.now(),
-        featuredImage=uploaded_asset,
-        categories=[x for x in all_categories if x.title in article["category_list"]],
+def generate_pool_ideas(manager: ModelManager, category: str, count: int) -> List[str]:
+    """Generates Ideas to Refill the Idea Pool"""
+    with manager.use("llm_idea_generator") as llm_idea_generator:
+        return llm_idea_generator.generate_article_ideas(
+            category_injection=category, count=count
+        )
+
+
+class EarlyHeaderRender:
+    """Renders the Header Image While the Writer Is Still Streaming the Body"""
+
+    _executor = ThreadPoolExecutor(max_workers=1)  # early renders share the GPU
+
+    def __init__(self, manager: ModelManager, category: str) -> None:
+        self._manager = manager
+        self._category = category
+        self._cancelled = threading.Event()
+        self.future: Optional["Future[Optional[List[Image.Image]]]"] = None
+
+    def on_partial(self, fields: Dict) -> None:
+        """Starts rendering once title and header image description are valid"""
+        if "header_img_description" not in fields:
+            self.cancel()  # new writer attempt, the old description is void
+        elif (
+            self.future is None
+            and "title" in fields
+            and find_near_duplicate(self._manager, fields["title"]) is None
+            and not self._is_cached(fields["header_img_description"])
+        ):
+            self._cancelled = threading.Event()
+            self.future = self._executor.submit(
+                self._render, fields["header_img_description"], self._cancelled
+            )
+
+    def cancel(self) -> None:
+        """Cancels the current render (queued or running)"""
+        if self.future is not None:
+            self._cancelled.set()
+            self.future.cancel()
+            self.future = None
+
+    def _is_cached(self, prompt: str) -> bool:
+        """Whether the header image will be reused from the cache (so not rendered)"""
+        if not IMAGE_CACHE_DIR:
+            return False
+        with self._manager.use("image_cache") as image_cache:
+            return image_cache.find(prompt, self._category) is not None
+
+    def _render(
+        self, prompt: str, cancelled: threading.Event
+    ) -> Optional[List[Image.Image]]:
+        if cancelled.is_set():
+            return None
+        with self._manager.use("gen") as gen:
+            try:
+                return gen.generate_images(
+                    prompts=[prompt],
+                    negative_prompts=[NEGATIVE_PROMPT_FILTER],
+                    num_images_per_prompt=DIFFUSION_CANDIDATES_PER_ARTICLE,
+                    should_stop=cancelled.is_set,
+                    **inference_profile_args(),
+                )[0]
+            except GenerationCancelled:
+                return None
+
+
+def select_categories(manager: ModelManager, job: ArticleJob) -> List[str]:
+    """Categories the Writer May Choose From (the most relevant to the idea)"""
+    titles = [x.title for x in job.all_categories]
+    if not CATEGORY_INDEX_PATH or len(titles) <= WRITER_MAX_CATEGORIES:
+        return titles
+    with manager.use("category_index") as category_index:
+        category_index.sync(job.all_categories)
+        selected = category_index.top_k(job.idea, WRITER_MAX_CATEGORIES)
+    if job.category not in selected:  # the category the idea was generated for
+        selected = [job.category] + selected[:-1]
+    return selected
+
+
+def write_article(
+    manager: ModelManager,
+    job: ArticleJob,
+    early_header_render: bool = EARLY_HEADER_RENDER,
+) -> Optional[ArticleJob]:
+    """Stage: Write the Article (header image rendering may start before the body is done)"""
+    if job.article is not None:  # resumed after writing
+        return job
+    early_render = (
+        EarlyHeaderRender(manager, job.category) if early_header_render else None
     )
+    with manager.use("llm_writer") as llm_writer:
+        try:
+            job.article = llm_writer.write_news_article(
+                article_idea=job.idea,
+                category_constraint=select_categories(manager, job),
+                on_partial=early_render.on_partial if early_render else None,
+            )
+        except BaseException:
+            if early_render:
+                early_render.cancel()
+            raise
+    if find_near_duplicate(manager, job.article["title"]) is not None:
+        if early_render:
+            early_render.cancel()
+        return None
+    if early_render:
+        job.early_candidates = early_render.future
+    return job
+
+
+def inference_profile_args() -> Dict[str, Any]:
+    """Profile Arguments of Header Image Renders (a deadline in adaptive mode)"""
+    if DIFFUSION_PROFILE == "adaptive":
+        return {"deadline_seconds": DIFFUSION_ARTICLE_SECONDS_TARGET}
+    return {"profile": DIFFUSION_PROFILE}
+
+
+def render_image(manager: ModelManager, job: ArticleJob) -> ArticleJob:
+    """Stage: Render the Header Image"""
+    return render_images(manager, [job])[0]
+
+
+def render_images(manager: ModelManager, jobs: List[ArticleJob]) -> List[ArticleJob]:
+    """Stage: Render the Header Images of Several Articles in One Pass"""
+    for job in jobs:  # join renders started while the article was being written
+        if job.early_candidates is not None:
+            try:
+                job.candidates = job.early_candidates.result() or []
+            except Exception as e:  # rendered again below, with the batch
+                print(f"Early header render failed: {e}")
+                job.candidates = []
+            job.early_candidates = None
+    if IMAGE_CACHE_DIR:
+        with manager.use("image_cache") as image_cache:
+            for job in jobs:
+                if not job.candidates and job.image is None and job.cached_image is None:
+                    job.cached_image = image_cache.reuse(
+                        job.article["header_img_description"], job.category
+                    )
+    to_render = [
+        x
+        for x in jobs
+        if not x.candidates and x.image is None and x.cached_image is None
+    ]
+    if to_render:
+        with manager.use("gen") as gen:
+            images = gen.generate_images(
+                prompts=[x.article["header_img_description"] for x in to_render],
+                negative_prompts=[NEGATIVE_PROMPT_FILTER] * len(to_render),
+                num_images_per_prompt=DIFFUSION_CANDIDATES_PER_ARTICLE,
+                **inference_profile_args(),
+            )
+        for job, candidates in zip(to_render, images):
+            job.candidates = candidates
+    return jobs
+
+
+def moderate_image(manager: ModelManager, job: ArticleJob) -> Optional[ArticleJob]:
+    """Stage: Pick a Safe Header Image (drops the article if every candidate is NSFW)"""
+    return moderate_images(manager, [job])[0]
+
+
+def moderate_images(
+    manager: ModelManager, jobs: List[ArticleJob]
+) -> List[Optional[ArticleJob]]:
+    """Stage: Pick Safe Header Images for Several Articles in One Forward Pass"""
+    # Cached images passed moderation before, resumed jobs may have passed it already
+    rendered = [x for x in jobs if x.cached_image is None and x.image is None]
+    if rendered:
+        with manager.use("nsfw_classify") as nsfw_classify:
+            selected = nsfw_classify.select_safe([x.candidates for x in rendered])
+        for job, index in zip(rendered, selected):
+            job.image = job.candidates[index] if index is not None else None
+            job.image_index = index
+            job.candidates = []
+    return [x if x.image is not None or x.cached_image else None for x in jobs]
+
+
+def encode_header_image(manager: ModelManager, job: ArticleJob) -> ArticleJob:
+    """Stage: Encode the Header Image for Upload (in a worker process)"""
+    if job.cached_image is not None or job.encoded_image is not None:
+        return job
+    with manager.use("image_encoder") as image_encoder:
+        job.encoded_image = image_encoder.encode(job.image)
+    return job
 
 
-def kill_vram_processes() -> None:
-    """Used to Kill VRAM Processes Before Continuing"""
-    OllamaInOut.kill()
-    DiffusersTextToImage.kill()
+def publish_article(manager: ModelManager, job: ArticleJob) -> ArticleJob:
+    """Stage: Upload the Header Image and Article"""
+    with manager.use("upload_api") as upload_api:
+        if job.cached_image is not None:
+            featured_image = job.cached_image.asset
+        else:
+            # The entry is created while Contentful is still processing the image.
+            # Keyed by job ID, so a retried job resumes its asset / entry.
+            featured_image = upload_api.submit_asset(
+                job.encoded_image, asset_id=job.job_id
+            )
+            job.asset_id = featured_image.id
+        job.published = upload_api.upload_news_article(
+            title=job.article["title"],
+            content=job.article["body"],
+            publishedDate=datetime.now(),
+            featuredImage=featured_image,
+            categories=[
+                x for x in job.all_categories if x.title in job.article["category_list"]
+            ],
+            entry_id=job.job_id,
+        )
+    if IMAGE_CACHE_DIR and job.cached_image is None:
+        with manager.use("image_cache") as image_cache:
+            image_cache.store(
+                job.article["header_img_description"],
+                job.encoded_image,
+                job.published.featuredImage,
+                job.category,
+            )
+    return job
 
 
 if __name__ == "__main__":
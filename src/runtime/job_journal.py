@@ -0,0 +1,218 @@
+from typing import Any, Dict, List, Optional
+import threading
+import shutil
+import json
+import time
+import uuid
+import os
+
+
+class JobJournal:
+    """
+    Durable record of unfinished jobs, one directory per job.
+
+    Each job directory holds a `job.json` with the fields checkpointed so
+    far and any files the job produced (e.g. rendered images). Writes are
+    atomic, so a crash leaves every job at its last completed checkpoint.
+    Finished jobs are deleted; failed ones are handed out again after
+    `retry_delay_seconds` until they have failed `max_attempts` times.
+
+    A `shared` journal is used by several worker processes (on a shared
+    filesystem) whose jobs are scheduled by a `JobQueue`: it always reads
+    a job from disk and leaves retries and abandoning to the queue.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_attempts: int = 3,
+        retry_delay_seconds: float = 60,
+        shared: bool = False,
+    ) -> None:
+        """
+        Opens (or creates) the journal.
+
+        Args:
+            directory (str): Directory of the job directories.
+            max_attempts (int, optional): Failures after which a job is abandoned.
+            retry_delay_seconds (float, optional): Wait before a failed job is retried.
+            shared (bool, optional): Other processes write to the journal too.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._max_attempts = max_attempts
+        self._retry_delay_seconds = retry_delay_seconds
+        self._shared = shared
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        for job_id in [] if shared else sorted(os.listdir(directory)):
+            path = os.path.join(directory, job_id, "job.json")
+            if os.path.exists(path):
+                with open(path, "r") as f:
+                    self._jobs[job_id] = json.load(f)
+                # Running when the process stopped: resumable right away
+                self._jobs[job_id]["status"] = "pending"
+
+    def create(self, **fields: Any) -> str:
+        """
+        Starts journaling a new job.
+
+        Args:
+            **fields: Initial checkpointed fields.
+
+        Returns:
+            str: ID of the job.
+        """
+        job_id = uuid.uuid4().hex
+        os.makedirs(os.path.join(self._directory, job_id))
+        record = {
+            "job_id": job_id,
+            "created_at": time.time(),
+            "status": "running",
+            "attempts": 0,
+            **fields,
+        }
+        with self._lock:
+            if not self._shared:
+                self._jobs[job_id] = record
+            self._save(record)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the checkpointed fields of a job.
+
+        Args:
+            job_id (str): ID of the job.
+
+        Returns:
+            Optional[Dict[str, Any]]: Copy of the fields, None if the job is finished.
+        """
+        with self._lock:
+            record = self._record(job_id)
+            return dict(record) if record is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """
+        Checkpoints fields of a job.
+
+        Args:
+            job_id (str): ID of the job.
+            **fields: Fields to set.
+        """
+        with self._lock:
+            record = self._record(job_id)
+            if record is None:
+                return  # finished meanwhile
+            record.update(fields)
+            self._save(record)
+
+    def write_file(self, job_id: str, name: str, data: bytes) -> str:
+        """
+        Stores a file produced by a job (atomically).
+
+        Args:
+            job_id (str): ID of the job.
+            name (str): File name within the job directory.
+            data (bytes): Contents.
+
+        Returns:
+            str: Path of the file.
+        """
+        path = self.file_path(job_id, name)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+        return path
+
+    def file_path(self, job_id: str, name: str) -> str:
+        return os.path.join(self._directory, job_id, name)
+
+    def remove_file(self, job_id: str, name: str) -> None:
+        path = self.file_path(job_id, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def fail(self, job_id: str, error: str) -> None:
+        """
+        Records a failed attempt; the job is abandoned after `max_attempts` failures.
+
+        Args:
+            job_id (str): ID of the job.
+            error (str): What went wrong.
+        """
+        with self._lock:
+            record = self._record(job_id)
+            if record is None:
+                return
+            record["attempts"] += 1
+            record["status"] = "failed"
+            record["error"] = error
+            record["failed_at"] = time.time()
+            abandoned = not self._shared and record["attempts"] >= self._max_attempts
+            if not abandoned:
+                self._save(record)
+        if abandoned:
+            print(f"Abandoning job {job_id} after {self._max_attempts} attempts: {error}")
+            self.finish(job_id)
+
+    def finish(self, job_id: str) -> None:
+        """
+        Deletes a job that was completed or dropped.
+
+        Args:
+            job_id (str): ID of the job.
+        """
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        shutil.rmtree(os.path.join(self._directory, job_id), ignore_errors=True)
+
+    def take_resumable(self) -> List[Dict[str, Any]]:
+        """
+        Hands out the jobs to resume: unfinished on startup or failed long enough ago.
+
+        Returns:
+            List[Dict[str, Any]]: Copies of their fields, oldest first; they count as running again.
+        """
+        now = time.time()
+        with self._lock:
+            records = [
+                x
+                for x in self._jobs.values()
+                if x["status"] == "pending"
+                or (
+                    x["status"] == "failed"
+                    and now - x["failed_at"] >= self._retry_delay_seconds
+                )
+            ]
+            for record in records:
+                record["status"] = "running"
+            return [dict(x) for x in sorted(records, key=lambda x: x["created_at"])]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def _record(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The job's fields (read from disk if shared), None if it is finished."""
+        if not self._shared:
+            return self._jobs.get(job_id)
+        path = self.file_path(job_id, "job.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def _save(self, record: Dict[str, Any]) -> None:
+        """Writes a job's fields (atomically, so a crash never leaves a partial file)."""
+        path = self.file_path(record["job_id"], "job.json")
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(record, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def unload(self) -> None:
+        pass
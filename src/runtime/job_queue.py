@@ -0,0 +1,379 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import threading
+import sqlite3
+import time
+import os
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    stage TEXT,
+    status TEXT NOT NULL,
+    text TEXT NOT NULL DEFAULT '',
+    lease_owner TEXT,
+    lease_expires_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_by_stage ON jobs (status, stage, created_at);
+"""
+
+
+@dataclass(frozen=True)
+class Lease:
+    """A job handed to one worker for one stage."""
+
+    job_id: str
+    stage: str
+    attempts: int  # failed attempts so far
+
+
+class JobQueue(ABC):
+    """Queue of article jobs shared by workers, each job leased by one worker at a time."""
+
+    @abstractmethod
+    def put(self, job_id: str, stage: str) -> None:
+        """
+        Adds a job, ready for its first stage.
+
+        Args:
+            job_id (str): ID of the job.
+            stage (str): Stage the job needs next.
+        """
+        pass
+
+    @abstractmethod
+    def lease(self, stages: List[str], worker_id: str) -> Optional[Lease]:
+        """
+        Leases the oldest job ready for one of the stages (or whose lease expired).
+
+        Args:
+            stages (List[str]): Stages the worker runs.
+            worker_id (str): ID of the worker.
+
+        Returns:
+            Optional[Lease]: The lease, None if no job is ready.
+        """
+        pass
+
+    @abstractmethod
+    def heartbeat(self, lease: Lease, worker_id: str) -> bool:
+        """
+        Extends a lease.
+
+        Args:
+            lease (Lease): The lease.
+            worker_id (str): ID of the worker holding it.
+
+        Returns:
+            bool: False if the lease was lost (expired and taken by another worker).
+        """
+        pass
+
+    @abstractmethod
+    def advance(
+        self,
+        lease: Lease,
+        worker_id: str,
+        next_stage: Optional[str],
+        text: Optional[str] = None,
+    ) -> bool:
+        """
+        Completes the leased stage and makes the job ready for the next one.
+
+        Args:
+            lease (Lease): The lease.
+            worker_id (str): ID of the worker holding it.
+            next_stage (str, optional): Stage the job needs next, None if it is done.
+            text (str, optional): Idea / title of the job, compared against by other workers.
+
+        Returns:
+            bool: False if the lease was lost, so the result must be discarded.
+        """
+        pass
+
+    @abstractmethod
+    def drop(self, lease: Lease, worker_id: str) -> None:
+        """
+        Removes a job that will not be published (e.g. duplicate or NSFW).
+
+        Args:
+            lease (Lease): The lease.
+            worker_id (str): ID of the worker holding it.
+        """
+        pass
+
+    @abstractmethod
+    def release(self, lease: Lease, worker_id: str, error: str) -> bool:
+        """
+        Records a failed attempt and makes the job ready for the same stage again.
+
+        Args:
+            lease (Lease): The lease.
+            worker_id (str): ID of the worker holding it.
+            error (str): What went wrong.
+
+        Returns:
+            bool: False if the job was abandoned after too many failed attempts.
+        """
+        pass
+
+    @abstractmethod
+    def take_abandoned(self) -> List[str]:
+        """
+        Returns the jobs this queue abandoned in `lease()` (their lease expired too often).
+
+        Each job is returned once, to the worker whose `lease()` abandoned it,
+        which cleans up after it.
+
+        Returns:
+            List[str]: IDs of the jobs.
+        """
+        pass
+
+    @abstractmethod
+    def texts(self) -> Dict[str, str]:
+        """
+        Returns the ideas / titles of all jobs that were not dropped.
+
+        Returns:
+            Dict[str, str]: Text by job ID.
+        """
+        pass
+
+    @abstractmethod
+    def counts(self) -> Dict[str, int]:
+        """
+        Returns the number of jobs per stage and status.
+
+        Returns:
+            Dict[str, int]: E.g. {"drafts/ready": 2, "images/leased": 1, "done": 10}.
+        """
+        pass
+
+    @abstractmethod
+    def unfinished(self) -> int:
+        """
+        Returns the number of jobs not yet done, dropped or abandoned.
+
+        Returns:
+            int: Ready and leased jobs.
+        """
+        pass
+
+    @abstractmethod
+    def unload(self) -> None:
+        """
+        Releases the queue.
+        """
+        pass
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Job queue in a SQLite database, shared by worker processes on one host
+    or, through a filesystem with working locks, on several.
+
+    Every state change is a single transaction, so two workers never lease
+    the same job. A lease expires unless it is renewed by `heartbeat()`, and
+    an expired job is handed to the next worker asking for its stage.
+    """
+
+    def __init__(
+        self, path: str, lease_seconds: float = 120, max_attempts: int = 3
+    ) -> None:
+        """
+        Opens (or creates) the queue.
+
+        Args:
+            path (str): Path of the SQLite database.
+            lease_seconds (float, optional): A lease not renewed for this long expires.
+            max_attempts (int, optional): Failed attempts after which a job is abandoned.
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lease_seconds = lease_seconds
+        self._max_attempts = max_attempts
+        self._db = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._abandoned: List[str] = []
+
+    def put(self, job_id: str, stage: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, stage, status, created_at, updated_at)"
+                " VALUES (?, ?, 'ready', ?, ?)",
+                (job_id, stage, now, now),
+            )
+
+    def lease(self, stages: List[str], worker_id: str) -> Optional[Lease]:
+        now = time.time()
+        placeholders = ",".join("?" for _ in stages)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")  # takes the write lock before reading
+            try:
+                # An expired lease counts as a failed attempt (the worker died or hung)
+                expired = " WHERE status = 'leased' AND lease_expires_at < ? AND attempts + 1 >= ?"
+                abandoned = self._db.execute(
+                    "SELECT job_id FROM jobs" + expired, (now, self._max_attempts)
+                ).fetchall()
+                self._db.execute(
+                    "UPDATE jobs SET status = 'abandoned', error = 'Lease expired.',"
+                    " lease_owner = NULL, updated_at = ?" + expired,
+                    (now, now, self._max_attempts),
+                )
+                row = self._db.execute(
+                    "SELECT job_id, stage, attempts + (status = 'leased') FROM jobs"
+                    f" WHERE stage IN ({placeholders})"
+                    " AND (status = 'ready' OR (status = 'leased' AND lease_expires_at < ?))"
+                    " ORDER BY created_at LIMIT 1",
+                    (*stages, now),
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'leased', attempts = ?, lease_owner = ?,"
+                        " lease_expires_at = ?, updated_at = ? WHERE job_id = ?",
+                        (row[2], worker_id, now + self._lease_seconds, now, row[0]),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._abandoned.extend(x[0] for x in abandoned)
+        return Lease(job_id=row[0], stage=row[1], attempts=row[2]) if row else None
+
+    def heartbeat(self, lease: Lease, worker_id: str) -> bool:
+        now = time.time()
+        return self._update_leased(
+            lease,
+            worker_id,
+            "lease_expires_at = ?, updated_at = ?",
+            (now + self._lease_seconds, now),
+        )
+
+    def advance(
+        self,
+        lease: Lease,
+        worker_id: str,
+        next_stage: Optional[str],
+        text: Optional[str] = None,
+    ) -> bool:
+        return self._update_leased(
+            lease,
+            worker_id,
+            "stage = ?, status = ?, text = COALESCE(?, text), lease_owner = NULL,"
+            " lease_expires_at = NULL, updated_at = ?",
+            (next_stage, "ready" if next_stage else "done", text, time.time()),
+        )
+
+    def drop(self, lease: Lease, worker_id: str) -> None:
+        self._update_leased(
+            lease,
+            worker_id,
+            "status = 'dropped', lease_owner = NULL, lease_expires_at = NULL, updated_at = ?",
+            (time.time(),),
+        )
+
+    def release(self, lease: Lease, worker_id: str, error: str) -> bool:
+        abandoned = lease.attempts + 1 >= self._max_attempts
+        self._update_leased(
+            lease,
+            worker_id,
+            "status = ?, attempts = attempts + 1, error = ?, lease_owner = NULL,"
+            " lease_expires_at = NULL, updated_at = ?",
+            ("abandoned" if abandoned else "ready", error, time.time()),
+        )
+        return not abandoned
+
+    def take_abandoned(self) -> List[str]:
+        with self._lock:
+            abandoned, self._abandoned = self._abandoned, []
+        return abandoned
+
+    def texts(self) -> Dict[str, str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id, text FROM jobs WHERE text != ''"
+                " AND status NOT IN ('dropped', 'abandoned')"
+            ).fetchall()
+        return dict(rows)
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT CASE WHEN status IN ('ready', 'leased') THEN stage || '/' || status"
+                " ELSE status END, COUNT(*) FROM jobs GROUP BY 1 ORDER BY 1"
+            ).fetchall()
+        return dict(rows)
+
+    def unfinished(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN ('ready', 'leased')"
+            ).fetchone()
+        return count
+
+    def _update_leased(
+        self, lease: Lease, worker_id: str, assignments: str, values: tuple
+    ) -> bool:
+        """Updates the job if the worker still holds its lease for the stage."""
+        with self._lock:
+            cursor = self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = ? AND stage = ?"
+                " AND status = 'leased' AND lease_owner = ?",
+                (*values, lease.job_id, lease.stage, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def unload(self) -> None:
+        self._db.close()
+
+
+class LeaseKeeper:
+    """Renews a lease from a background thread while the stage runs."""
+
+    def __init__(
+        self, job_queue: JobQueue, lease: Lease, worker_id: str, interval_seconds: float
+    ) -> None:
+        """
+        Initializes the keeper (use as a context manager).
+
+        Args:
+            job_queue (JobQueue): Queue the lease is from.
+            lease (Lease): The lease.
+            worker_id (str): ID of the worker holding it.
+            interval_seconds (float): Time between heartbeats (well below the lease duration).
+        """
+        self._job_queue = job_queue
+        self._lease = lease
+        self._worker_id = worker_id
+        self._interval_seconds = interval_seconds
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self.lost = False
+
+    def __enter__(self) -> "LeaseKeeper":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self._interval_seconds):
+            try:
+                if not self._job_queue.heartbeat(self._lease, self._worker_id):
+                    self.lost = True
+                    print(f"Lost the lease on job {self._lease.job_id}.")
+                    return
+            except Exception as e:  # e.g. database briefly locked, retried next beat
+                print(f"Error renewing lease on job {self._lease.job_id}: {e}")
@@ -0,0 +1,265 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import threading
+import requests
+
+
+class ComponentFailed(Exception):
+    """Raised by a component that is broken and must be re-initialized."""
+
+
+@dataclass
+class _Component:
+    """Registered component and its loaded instance (if resident)."""
+
+    loader: Callable[[], Any]
+    memory_gb: float
+    instance: Optional[Any] = None
+    in_use: int = 0
+    loading: bool = False
+    stale: bool = False  # failed while pinned, unloaded once released
+
+
+class ModelManager:
+    """
+    Keeps models and clients resident between articles.
+
+    Components are loaded lazily on first use and kept warm afterwards. When
+    loading a component would exceed the memory budget, the least recently
+    used resident components are unloaded (via their `unload()` method) until
+    it fits; components currently held through `use()` are never evicted, so
+    callers wait for them to be released instead. Components load and unload
+    outside the manager's lock (their memory is reserved first), so a slow
+    load or teardown does not hold up callers of other components.
+
+    A component that failed while in use (`ComponentFailed`, out of memory or
+    a connection error) is dropped so that only it is re-initialized on its
+    next use; other errors, e.g. rejected content, leave it loaded.
+    """
+
+    def __init__(self, memory_budget_gb: float) -> None:
+        """
+        Initializes the model manager.
+
+        Args:
+            memory_budget_gb (float): Total memory (GB) resident components may use.
+        """
+        self._memory_budget_gb = memory_budget_gb
+        self._components: Dict[str, _Component] = {}
+        self._resident: "OrderedDict[str, None]" = OrderedDict()  # LRU order
+        self._lock = threading.RLock()
+        self._released = threading.Condition(self._lock)
+        self._unloading_gb = 0.0  # detached components still being unloaded
+
+    def register(
+        self, name: str, loader: Callable[[], Any], memory_gb: float = 0.0
+    ) -> None:
+        """
+        Registers a component.
+
+        Args:
+            name (str): Name to look the component up by.
+            loader (Callable[[], Any]): Creates the component.
+            memory_gb (float, optional): Estimated memory the component holds once loaded.
+        """
+        with self._lock:
+            assert name not in self._components, f"'{name}' is already registered."
+            assert (
+                memory_gb <= self._memory_budget_gb
+            ), f"'{name}' ({memory_gb} GB) does not fit in the memory budget."
+            self._components[name] = _Component(loader=loader, memory_gb=memory_gb)
+
+    def get(self, name: str) -> Any:
+        """
+        Returns a resident component, loading it (and evicting others) if needed.
+
+        Args:
+            name (str): Name of the component.
+
+        Returns:
+            Any: The loaded component.
+        """
+        return self._get(name, pin=False)
+
+    def peek(self, name: str) -> Optional[Any]:
+        """
+        Returns a component if it is resident, without loading it or touching LRU order.
+
+        Args:
+            name (str): Name of the component.
+
+        Returns:
+            Optional[Any]: The loaded component, None if not resident.
+        """
+        with self._lock:
+            return self._components[name].instance
+
+    @contextmanager
+    def use(self, name: str) -> Iterator[Any]:
+        """
+        Yields a resident component and drops it if it failed while in use.
+
+        Args:
+            name (str): Name of the component.
+
+        Yields:
+            Any: The loaded component.
+        """
+        instance = self._get(name, pin=True)
+        try:
+            yield instance
+        except Exception as e:
+            self._release(name)
+            if self._is_component_failure(e):
+                self.invalidate(name)
+            raise
+        else:
+            self._release(name)
+
+    def invalidate(self, name: str) -> None:
+        """
+        Unloads a component so that it is re-initialized on its next use
+        (once the last caller holding it through `use()` releases it).
+
+        Args:
+            name (str): Name of the component.
+        """
+        with self._lock:
+            component = self._components[name]
+            if component.in_use > 0:
+                component.stale = component.instance is not None
+                return
+            instance = self._detach(name, reserved=False)
+        self._unload(name, instance, reserved=False)
+
+    def unload_all(self) -> None:
+        """Unloads every resident component."""
+        with self._lock:
+            detached = [
+                (x, self._detach(x, reserved=False)) for x in list(self._resident)
+            ]
+        for name, instance in detached:
+            self._unload(name, instance, reserved=False)
+
+    def resident_memory_gb(self) -> float:
+        """Returns the estimated memory used by resident components (and ones being unloaded)."""
+        with self._lock:
+            return self._unloading_gb + sum(
+                self._components[x].memory_gb for x in self._resident
+            )
+
+    def _get(self, name: str, pin: bool) -> Any:
+        """Returns a component (pinned against eviction if `pin`), loading it without holding the lock."""
+        with self._lock:
+            component = self._components[name]
+            while component.loading or component.stale:  # (re)loaded by another thread
+                self._released.wait()
+            if component.instance is not None:
+                self._resident[name] = None
+                self._resident.move_to_end(name)
+                component.in_use += pin
+                return component.instance
+            evicted = self._make_room(component.memory_gb, keep=name)
+            # Reserve its memory (in place of the evicted) and pin it while it loads
+            component.loading = True
+            component.in_use += 1
+            self._resident[name] = None
+        for evicted_name, instance in evicted:
+            self._unload(evicted_name, instance, reserved=True)
+        try:
+            print(f"Loading component: {name}")
+            instance = component.loader()
+        except BaseException:
+            with self._lock:
+                component.loading = False
+                component.in_use -= 1
+                self._resident.pop(name, None)
+                self._released.notify_all()
+            raise
+        with self._lock:
+            component.instance = instance
+            component.loading = False
+            component.in_use -= not pin
+            self._resident[name] = None
+            self._resident.move_to_end(name)
+            self._released.notify_all()
+            return instance
+
+    @staticmethod
+    def _is_component_failure(e: BaseException) -> bool:
+        """Whether an error (or one it was raised from) means the component itself is broken."""
+        while e is not None:
+            if isinstance(
+                e,
+                (
+                    ComponentFailed,
+                    MemoryError,
+                    ConnectionError,
+                    requests.exceptions.ConnectionError,
+                ),
+            ) or (isinstance(e, RuntimeError) and "out of memory" in str(e).lower()):
+                return True
+            e = e.__cause__
+        return False
+
+    def _release(self, name: str) -> None:
+        """Unpins a component taken through `use()`; the last release unloads a stale one."""
+        with self._lock:
+            component = self._components[name]
+            component.in_use -= 1
+            instance = None
+            if component.stale and component.in_use == 0:
+                instance = self._detach(name, reserved=False)
+            self._released.notify_all()
+        if instance is not None:
+            self._unload(name, instance, reserved=False)
+
+    def _make_room(self, memory_gb: float, keep: str) -> List[Tuple[str, Any]]:
+        """Detaches least recently used components until `memory_gb` fits; the caller unloads them."""
+        evicted = []
+        while self.resident_memory_gb() + memory_gb > self._memory_budget_gb:
+            evictable = [
+                x
+                for x in self._resident
+                if x != keep
+                and self._components[x].memory_gb > 0
+                and self._components[x].in_use == 0
+            ]
+            if evictable:
+                instance = self._detach(evictable[0], reserved=True)
+                evicted.append((evictable[0], instance))
+            else:
+                self._released.wait()
+        return evicted
+
+    def _detach(self, name: str, reserved: bool) -> Optional[Any]:
+        """
+        Removes a component's instance (under the lock) for `_unload()` to release outside it.
+
+        Its memory counts as used until unloaded, unless `reserved` by the component replacing it.
+        """
+        component = self._components[name]
+        self._resident.pop(name, None)
+        instance, component.instance = component.instance, None
+        component.stale = False
+        if instance is not None and not reserved:
+            self._unloading_gb += component.memory_gb
+        return instance
+
+    def _unload(self, name: str, instance: Optional[Any], reserved: bool) -> None:
+        """Unloads a detached instance (without the lock), ignoring errors from the component itself."""
+        if instance is None:
+            return
+        print(f"Unloading component: {name}")
+        unload = getattr(instance, "unload", None)
+        if callable(unload):
+            try:
+                unload()
+            except Exception as e:
+                print(f"Error unloading '{name}': {e}")
+        if not reserved:
+            with self._lock:
+                self._unloading_gb -= self._components[name].memory_gb
+                self._released.notify_all()
@@ -0,0 +1,273 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+import threading
+import queue
+import time
+
+_STOP = object()  # end-of-stream marker passed down the queues
+
+
+@dataclass
+class Stage:
+    """
+    A pipeline stage.
+
+    `fn` maps an item from the previous stage to an item for the next one.
+    Returning None drops the item (e.g. rejected by moderation). The stage's
+    output queue is named after the stage.
+
+    With `batch_size` > 1, `fn` instead receives a list of up to `batch_size`
+    items and returns a list of the same length. A worker takes whatever is
+    already queued and waits at most `batch_timeout_seconds` for the rest.
+    """
+
+    name: str
+    fn: Callable[[Any], Optional[Any]]
+    workers: int = 1
+    queue_size: int = 2
+    batch_size: int = 1
+    batch_timeout_seconds: float = 0.0
+
+
+@dataclass
+class StageStats:
+    """Counters for a single pipeline stage."""
+
+    name: str
+    processed: int = 0
+    dropped: int = 0
+    failed: int = 0
+    busy_seconds: float = 0.0
+    queue_depth: int = 0
+    throughput_per_min: float = 0.0
+    utilization: float = 0.0
+
+
+@dataclass
+class _StageState:
+    stage: Stage
+    output: "queue.Queue[Any]"
+    stats: StageStats
+    alive_workers: int = 0
+
+
+class Pipeline:
+    """
+    Runs stages concurrently with bounded queues between them.
+
+    Each stage has its own worker threads, so while one item is in the
+    diffusion stage the next one can already be written by the LLM and the
+    previous one uploaded. Bounded queues apply backpressure so a fast stage
+    never runs far ahead of a slow one.
+    """
+
+    def __init__(
+        self, stages: List[Stage], report_interval_seconds: Optional[float] = None
+    ) -> None:
+        """
+        Initializes the pipeline.
+
+        Args:
+            stages (List[Stage]): Stages in execution order.
+            report_interval_seconds (float, optional): Print `report()` this often while running.
+        """
+        assert len(stages) > 0, "Pipeline needs at least one stage."
+        self._states = [
+            _StageState(
+                stage=x,
+                output=queue.Queue(maxsize=x.queue_size),
+                stats=StageStats(name=x.name),
+            )
+            for x in stages
+        ]
+        self._input: "queue.Queue[Any]" = queue.Queue(maxsize=stages[0].queue_size)
+        self._report_interval_seconds = report_interval_seconds
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._started_at: Optional[float] = None
+        self._threads: List[threading.Thread] = []
+
+    def start(self, source: Iterable[Any]) -> None:
+        """
+        Starts all stage workers and feeds them from `source`.
+
+        Args:
+            source (Iterable[Any]): Items for the first stage (may be infinite).
+        """
+        assert self._started_at is None, "Pipeline already started."
+        self._started_at = time.monotonic()
+        inputs = [self._input] + [x.output for x in self._states[:-1]]
+        for index, (state, input_queue) in enumerate(zip(self._states, inputs)):
+            state.alive_workers = state.stage.workers
+            for worker in range(state.stage.workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(index, input_queue),
+                    name=f"{state.stage.name}-{worker}",
+                    daemon=True,
+                )
+                self._threads.append(thread)
+        self._threads.append(
+            threading.Thread(target=self._feed, args=(source,), daemon=True)
+        )
+        if self._report_interval_seconds:
+            self._threads.append(threading.Thread(target=self._report, daemon=True))
+        for thread in self._threads:
+            thread.start()
+
+    def results(self) -> Iterator[Any]:
+        """
+        Yields items emitted by the last stage until the source is exhausted.
+
+        Yields:
+            Any: Output of the last stage.
+        """
+        output = self._states[-1].output
+        while True:
+            try:
+                item = output.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopped.is_set():  # stop() found the queue full
+                    return
+                continue
+            if item is _STOP:
+                self._stopped.set()
+                return
+            yield item
+
+    def stop(self) -> None:
+        """Asks workers to exit after their current item (idle ones exit right away)."""
+        self._stopped.set()
+        # Wake workers blocked on an empty queue; a full queue's workers are busy
+        inputs = [self._input] + [x.output for x in self._states[:-1]]
+        workers = [x.stage.workers for x in self._states]
+        for input_queue, count in zip(inputs, workers):
+            for _ in range(count):
+                try:
+                    input_queue.put_nowait(_STOP)
+                except queue.Full:
+                    break
+
+    def stats(self) -> List[StageStats]:
+        """
+        Returns a snapshot of per-stage counters.
+
+        Returns:
+            List[StageStats]: Stats in stage order.
+        """
+        elapsed = max(time.monotonic() - (self._started_at or time.monotonic()), 1e-9)
+        with self._lock:
+            snapshot = []
+            for state in self._states:
+                stats = StageStats(**vars(state.stats))
+                stats.queue_depth = state.output.qsize()
+                stats.throughput_per_min = 60 * stats.processed / elapsed
+                stats.utilization = stats.busy_seconds / (
+                    elapsed * state.stage.workers
+                )
+                snapshot.append(stats)
+            return snapshot
+
+    def report(self) -> str:
+        """
+        Formats `stats()` as a table; the busiest stage is the bottleneck.
+
+        Returns:
+            str: Human readable report.
+        """
+        lines = [
+            f"{'stage':<12}{'done':>6}{'drop':>6}{'fail':>6}{'/min':>10}{'busy':>7}{'queue':>7}"
+        ]
+        for x in self.stats():
+            lines.append(
+                f"{x.name:<12}{x.processed:>6}{x.dropped:>6}{x.failed:>6}"
+                f"{x.throughput_per_min:>10.2f}{x.utilization:>7.0%}{x.queue_depth:>7}"
+            )
+        return "\n".join(lines)
+
+    def _feed(self, source: Iterable[Any]) -> None:
+        """Pushes source items into the first stage."""
+        try:
+            for item in source:
+                if self._stopped.is_set():
+                    break
+                self._put(self._input, item)
+        finally:
+            for _ in range(self._states[0].stage.workers):
+                self._put(self._input, _STOP)
+
+    def _work(self, index: int, input_queue: "queue.Queue[Any]") -> None:
+        """Worker loop for a stage."""
+        state = self._states[index]
+        exhausted = False
+        while not exhausted and not self._stopped.is_set():
+            batch, exhausted = self._take(input_queue, state.stage)
+            if not batch:
+                continue
+            started_at = time.monotonic()
+            try:
+                if state.stage.batch_size > 1:
+                    results = state.stage.fn(batch)
+                    assert len(results) == len(batch), "Batch stage changed batch size."
+                else:
+                    results = [state.stage.fn(batch[0])]
+            except Exception as e:
+                print(f"[{state.stage.name}] {e}")
+                results, failed = [None] * len(batch), True
+            else:
+                failed = False
+            with self._lock:
+                state.stats.busy_seconds += time.monotonic() - started_at
+                for result in results:
+                    if failed:
+                        state.stats.failed += 1
+                    elif result is None:
+                        state.stats.dropped += 1
+                    else:
+                        state.stats.processed += 1
+            for result in results:
+                if result is not None:
+                    self._put(state.output, result)
+        with self._lock:
+            state.alive_workers -= 1
+            last_worker = state.alive_workers == 0
+        if last_worker:
+            next_workers = (
+                self._states[index + 1].stage.workers
+                if index + 1 < len(self._states)
+                else 1
+            )
+            for _ in range(next_workers):
+                self._put(state.output, _STOP)
+
+    def _put(self, output: "queue.Queue[Any]", item: Any) -> None:
+        """Puts an item, giving up once the pipeline is stopped (its consumers may be gone)."""
+        while not self._stopped.is_set():
+            try:
+                output.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    @staticmethod
+    def _take(input_queue: "queue.Queue[Any]", stage: Stage) -> Tuple[List[Any], bool]:
+        """Takes the next batch of items; also returns whether the input has ended."""
+        item = input_queue.get()
+        if item is _STOP:
+            return [], True
+        batch = [item]
+        deadline = time.monotonic() + stage.batch_timeout_seconds
+        while len(batch) < stage.batch_size:
+            try:
+                item = input_queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _report(self) -> None:
+        """Periodically prints the stats table."""
+        while not self._stopped.wait(self._report_interval_seconds):
+            print(self.report())
@@ -0,0 +1,188 @@
+"""
+Article Worker Leasing Jobs from the Shared Job Queue
+
+Run any number of workers, on one host or several sharing JOB_QUEUE_PATH and
+JOB_JOURNAL_DIR; each job stage is run by exactly one of them:
+    python worker.py                         (all stages)
+    python worker.py --roles llm             (ideas and drafts only)
+    python worker.py --roles diffusion       (header images and moderation only)
+    python worker.py --roles publish         (encoding and upload only)
+
+Workers running the "ideas" stage start new jobs while fewer than
+WORKER_MAX_UNFINISHED_JOBS are queued. Header images are not rendered while
+writing (EARLY_HEADER_RENDER), since the render could not be handed to
+another worker.
+
+Show the queue:
+    python worker.py --status
+"""
+from config import *
+from classifiers.near_duplicate import MinHashLSHIndex
+from runtime.job_queue import Lease, LeaseKeeper
+from runtime.model_manager import ModelManager
+from typing import Callable, List, Optional, Set
+import argparse
+import socket
+import time
+import os
+import main as generator
+
+
+def run_worker(stages: List[str], worker_id: str) -> None:
+    """Leases and Runs Jobs for the Given Stages Indefinitely"""
+    manager = generator.initialize_apis(worker=True)
+    stage_fns = {**dict(generator.article_stages()), "drafts": write_article}
+    order = [x for x, _ in generator.article_stages()]
+    queued_ideas = MinHashLSHIndex(threshold=DUPLICATE_THRESHOLD or 1.0)
+    indexed_ids: Set[str] = set()
+    print(f"Worker {worker_id} running stages: {', '.join(stages)}")
+    while True:
+        with manager.use("job_queue") as job_queue:
+            lease = job_queue.lease(stages, worker_id)
+            start_new = (
+                lease is None
+                and order[0] in stages
+                and job_queue.unfinished() < WORKER_MAX_UNFINISHED_JOBS
+            )
+            abandoned = job_queue.take_abandoned()
+        for job_id in abandoned:  # its lease expired too often (worker died or hung)
+            print(f"Abandoning job {job_id} after {JOB_MAX_ATTEMPTS} attempts.")
+            with manager.use("job_journal") as job_journal:
+                job_journal.finish(job_id)
+        if start_new:
+            try:
+                job = generator.new_article_job(manager)
+            except Exception as e:
+                print(str(e))
+                time.sleep(WORKER_POLL_SECONDS)
+                continue
+            with manager.use("job_queue") as job_queue:
+                job_queue.put(job.job_id, order[0])
+            continue
+        if lease is None:
+            time.sleep(WORKER_POLL_SECONDS)
+            continue
+        position = order.index(lease.stage)
+        next_stage = order[position + 1] if position + 1 < len(order) else None
+        run_stage(
+            manager,
+            lease,
+            worker_id,
+            stage_fns[lease.stage],
+            next_stage,
+            is_duplicate=lambda x: is_queued_duplicate(manager, queued_ideas, indexed_ids, x),
+        )
+
+
+def run_stage(
+    manager: ModelManager,
+    lease: Lease,
+    worker_id: str,
+    stage: Callable[..., Optional[generator.ArticleJob]],
+    next_stage: Optional[str],
+    is_duplicate: Callable[[generator.ArticleJob], bool],
+) -> None:
+    """Runs One Leased Stage and Hands the Job to the Next Stage (or drops / retries it)"""
+    with manager.use("job_queue") as job_queue:
+        with manager.use("job_journal") as job_journal:
+            record = job_journal.get(lease.job_id)
+        if record is None:  # finished by a worker whose lease had expired
+            job_queue.drop(lease, worker_id)
+            return
+        print(f"[{lease.stage}] job {lease.job_id} (attempt {lease.attempts + 1})")
+        with LeaseKeeper(job_queue, lease, worker_id, JOB_LEASE_SECONDS / 3) as keeper:
+            try:
+                # Once the lease is lost, the job's journal belongs to another worker
+                job = generator.journaled(stage, owned=lambda: not keeper.lost)(
+                    manager,
+                    generator.resume_job(
+                        manager,
+                        record,
+                        with_categories=lease.stage in generator.CATEGORY_STAGES,
+                    ),
+                )
+                if job is not None and lease.stage == "ideas" and is_duplicate(job):
+                    with manager.use("job_journal") as job_journal:
+                        job_journal.finish(job.job_id)
+                    job = None
+            except Exception as e:
+                print(f"[{lease.stage}] {e}")
+                if not job_queue.release(lease, worker_id, f"{lease.stage}: {e}"):
+                    print(f"Abandoning job {lease.job_id} after {JOB_MAX_ATTEMPTS} attempts.")
+                    with manager.use("job_journal") as job_journal:
+                        job_journal.finish(lease.job_id)
+                return
+        if keeper.lost:
+            return  # another worker has the job now
+        if job is None:
+            job_queue.drop(lease, worker_id)
+            return
+        text = job.article["title"] if job.article else job.idea
+        if job_queue.advance(lease, worker_id, next_stage, text=text) and next_stage is None:
+            print(f"Published: {job.published.title}")
+
+
+def write_article(
+    manager: ModelManager, job: generator.ArticleJob
+) -> Optional[generator.ArticleJob]:
+    """Stage: Write the Article (without an early header render, it could not be handed over)"""
+    return generator.write_article(manager, job, early_header_render=False)
+
+
+def is_queued_duplicate(
+    manager: ModelManager,
+    queued_ideas: MinHashLSHIndex,
+    indexed_ids: Set[str],
+    job: generator.ArticleJob,
+) -> bool:
+    """Whether Another Queued (or published) Job Has a Near-Duplicate Idea"""
+    if not DUPLICATE_THRESHOLD:
+        return False
+    with manager.use("job_queue") as job_queue:
+        texts = job_queue.texts()
+    for job_id, text in texts.items():
+        if job_id not in indexed_ids and job_id != job.job_id:
+            queued_ideas.add(job_id, text)
+            indexed_ids.add(job_id)
+    match = queued_ideas.find_similar(job.idea)
+    if match is None:
+        return False
+    print(f"'{job.idea}' is a near-duplicate of queued job {match[0]} ({match[1]:.2f}).")
+    return True
+
+
+def print_status() -> None:
+    manager = generator.initialize_apis(worker=True)
+    with manager.use("job_queue") as job_queue:
+        for name, count in job_queue.counts().items():
+            print(f"{name:<20}{count:>6}")
+    manager.unload_all()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument(
+        "--roles",
+        default="",
+        help=f"comma-separated roles among {', '.join(WORKER_ROLES)} (default: all stages)",
+    )
+    parser.add_argument("--id", default=f"{socket.gethostname()}-{os.getpid()}")
+    parser.add_argument("--status", action="store_true", help="print the queue and exit")
+    args = parser.parse_args()
+    if args.status:
+        print_status()
+        return
+    assert JOB_JOURNAL_DIR, "Workers hand jobs over through the job journal (JOB_JOURNAL_DIR)."
+    roles = [x for x in args.roles.split(",") if x]
+    for role in roles:
+        assert role in WORKER_ROLES, f"Unknown role '{role}'."
+    stages = (
+        [x for role in roles for x in WORKER_ROLES[role]]
+        if roles
+        else [x for x, _ in generator.article_stages()]
+    )
+    run_worker(stages, args.id)
+
+
+if __name__ == "__main__":
+    main()